@@ -0,0 +1,89 @@
+import logging
+from dataclasses import dataclass
+from typing import Optional
+from constants import (
+    ABR_MIN_KBPS, ABR_STEP_DOWN, ABR_STEP_UP_KBPS, ABR_STEP_UP_AFTER,
+    ABR_COOLDOWN_SECONDS, ABR_MIN_SPEED, ABR_QUEUE_THRESHOLD
+)
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class OutputHealth:
+    """One observation of an adaptive destination's encoder and output path"""
+    encode_speed: Optional[float]  # Encoder speed over the last ABR_SPEED_SECONDS
+    output_speed: Optional[float]  # Speed of the stream-copy push to the platform, over the same span
+    queued: int  # Relay messages waiting to be pushed
+    dropped_frames: int  # Encoder frame drops, cumulative
+    dropped_messages: int  # Relay messages skipped for the pusher, cumulative
+
+class BitrateController:
+    """
+    Steps one destination's bitrate between bounds from its health.
+
+    Congestion (a slow encode or push, a growing relay queue, or new
+    drops) cuts the bitrate multiplicatively; a sustained clean period
+    raises it additively. Changes are followed by a cooldown so the
+    replacement encoder settles before its effect is judged.
+    """
+
+    def __init__(self, start_kbps: int, max_kbps: int, min_kbps: int = ABR_MIN_KBPS):
+        self.min_kbps = min(min_kbps, max_kbps)
+        self.max_kbps = max_kbps
+        self.bitrate_kbps = max(self.min_kbps, min(start_kbps, max_kbps))
+        self.reason = ''
+        self.changes = 0
+        self._previous: Optional[OutputHealth] = None
+        self._changed_at = float('-inf')
+        self._healthy_since: Optional[float] = None
+
+    def congestion(self, health: OutputHealth) -> Optional[str]:
+        """Why the destination looks congested compared with the last observation, if it does."""
+        previous = self._previous
+        if health.encode_speed is not None and health.encode_speed < ABR_MIN_SPEED:
+            return f"encode speed {health.encode_speed:.2f}x"
+        if health.output_speed is not None and health.output_speed < ABR_MIN_SPEED:
+            return f"push speed {health.output_speed:.2f}x"
+        if previous is None:
+            return None
+        if health.queued > ABR_QUEUE_THRESHOLD and health.queued > previous.queued:
+            return f"output queue growing ({health.queued} messages)"
+        if health.dropped_messages > previous.dropped_messages:
+            return f"{health.dropped_messages - previous.dropped_messages} messages skipped"
+        if health.dropped_frames > previous.dropped_frames:
+            return f"{health.dropped_frames - previous.dropped_frames} frames dropped"
+        return None
+
+    def update(self, health: OutputHealth, now: float) -> Optional[int]:
+        """Feed one observation; returns the new bitrate when it should change."""
+        reason = self.congestion(health)
+        self._previous = health
+        if reason:
+            self._healthy_since = None
+        elif self._healthy_since is None:
+            self._healthy_since = now
+
+        if now - self._changed_at < ABR_COOLDOWN_SECONDS:
+            return None
+        if reason:
+            target = max(self.min_kbps, int(self.bitrate_kbps * ABR_STEP_DOWN))
+            return self._change(target, now, reason)
+        if now - self._healthy_since >= ABR_STEP_UP_AFTER:
+            target = min(self.max_kbps, self.bitrate_kbps + ABR_STEP_UP_KBPS)
+            return self._change(target, now, f"clean for {now - self._healthy_since:.0f}s")
+        return None
+
+    def _change(self, target: int, now: float, reason: str) -> Optional[int]:
+        if target == self.bitrate_kbps:
+            return None
+        logger.info(f"Bitrate {self.bitrate_kbps} -> {target} kbps: {reason}")
+        self.bitrate_kbps = target
+        self.reason = reason
+        self.changes += 1
+        self._changed_at = now
+        self._healthy_since = None
+        return target
+
+    def revert(self, bitrate_kbps: int) -> None:
+        """Go back to a bitrate after a change could not be applied."""
+        self.bitrate_kbps = bitrate_kbps
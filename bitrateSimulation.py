@@ -0,0 +1,151 @@
+import argparse
+import asyncio
+import subprocess
+import sys
+import time
+from typing import (
+    Optional,
+    List,
+    Tuple
+)
+import ffmpeg
+from streamForward import Destination
+from rtmpRelay import RtmpRelay
+from forwardSupervisor import AdaptiveForwarder
+from harnessTools import spawn, stop_process, format_optional
+from constants import (
+    VIDEO_CODEC, AUDIO_CODEC, AUDIO_BITRATE,
+    ABR_SIMULATION_PORT, ABR_SIMULATION_PLATFORM, ABR_SIMULATION_PHASES
+)
+
+PROXY_CHUNK_BYTES = 16384
+
+class ThrottledProxy:
+    """TCP proxy whose upstream throughput can be capped while it runs"""
+
+    def __init__(self, listen_port: int, target_port: int):
+        self.listen_port = listen_port
+        self.target_port = target_port
+        self.rate_kbps: Optional[int] = None
+        self.server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        self.server = await asyncio.start_server(self._handle, '127.0.0.1', self.listen_port)
+
+    async def stop(self) -> None:
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            target_reader, target_writer = await asyncio.open_connection('127.0.0.1', self.target_port)
+        except OSError:
+            writer.close()
+            return
+        await asyncio.gather(self._pipe(reader, target_writer, throttled=True),
+                             self._pipe(target_reader, writer, throttled=False),
+                             return_exceptions=True)
+
+    async def _pipe(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                    throttled: bool) -> None:
+        """Copy one direction, pacing it to the current rate limit."""
+        try:
+            while True:
+                data = await reader.read(PROXY_CHUNK_BYTES)
+                if not data:
+                    break
+                writer.write(data)
+                await writer.drain()
+                if throttled and self.rate_kbps:
+                    await asyncio.sleep(len(data) * 8 / (self.rate_kbps * 1000))
+        finally:
+            writer.close()
+
+def start_publisher(url: str) -> subprocess.Popen:
+    """Publish a live test pattern to url, standing in for OBS."""
+    video = ffmpeg.input("testsrc2=size=1280x720:rate=30", f='lavfi', re=None)
+    audio = ffmpeg.input("sine=frequency=440:sample_rate=48000", f='lavfi', re=None)
+    return spawn(ffmpeg.output(video, audio, url, vcodec=VIDEO_CODEC, preset='ultrafast',
+                                g=30, video_bitrate='4M', pix_fmt='yuv420p', acodec=AUDIO_CODEC,
+                                audio_bitrate=AUDIO_BITRATE, format='flv'))
+
+def start_sink(url: str) -> subprocess.Popen:
+    """Stand in for the platform, discarding whatever it receives."""
+    return spawn(ffmpeg.output(ffmpeg.input(url, f='flv', listen=1), '-', format='null', c='copy'))
+
+async def simulate(phases: List[Tuple[float, Optional[int]]],
+                   platform: str = ABR_SIMULATION_PLATFORM) -> None:
+    """Run an adaptive destination through a throttled link, printing its state every second."""
+    relay = RtmpRelay('127.0.0.1', ABR_SIMULATION_PORT)
+    proxy = ThrottledProxy(ABR_SIMULATION_PORT + 1, ABR_SIMULATION_PORT + 2)
+    await relay.start()
+    await proxy.start()
+
+    sink = start_sink(f"rtmp://127.0.0.1:{ABR_SIMULATION_PORT + 2}/live/sink")
+    publisher = start_publisher(relay.url('live/landscape'))
+    destination = Destination(platform, 'landscape',
+                              f"rtmp://127.0.0.1:{ABR_SIMULATION_PORT + 1}/live/", 'sink')
+    forwarder = AdaptiveForwarder(destination, relay, input_url=relay.url('live/landscape'))
+    await asyncio.sleep(1)  # Let the sink bind and the publisher connect
+    forwarder.start()
+
+    print(f"{'Time':>6}{'Limit kbps':>12}{'Bitrate':>9}{'State':>10}{'Encode':>8}"
+          f"{'Push':>8}{'Queued':>8}{'Dropped':>9}")
+    started_at = time.monotonic()
+    try:
+        for duration, limit in phases:
+            proxy.rate_kbps = limit
+            phase_end = time.monotonic() + duration
+            while time.monotonic() < phase_end:
+                await asyncio.sleep(1)
+                health = forwarder.health()
+                print(f"{time.monotonic() - started_at:>6.0f}{limit or '-':>12}"
+                      f"{forwarder.controller.bitrate_kbps:>9}{forwarder.state:>10}"
+                      f"{format_optional(health.encode_speed, '{:.2f}x'):>8}"
+                      f"{format_optional(health.output_speed, '{:.2f}x'):>8}"
+                      f"{health.queued:>8}{health.dropped_messages:>9}")
+    finally:
+        await forwarder.stop()
+        for process in (publisher, sink):
+            await asyncio.to_thread(stop_process, process)
+        await proxy.stop()
+        await relay.stop()
+    print(f"Bitrate changes: {forwarder.controller.changes}")
+
+def parse_phases(text: str) -> List[Tuple[float, Optional[int]]]:
+    """Parse 'seconds:kbps' pairs, where a kbps of 0 means unthrottled."""
+    phases = []
+    for item in text.split(','):
+        seconds, kbps = item.split(':')
+        phases.append((float(seconds), int(kbps) or None))
+    return phases
+
+def main():
+    """
+    Watch the adaptive bitrate controller react to a throttled uplink.
+    Usage: python bitrateSimulation.py [--phases 20:0,60:1500,60:0] [--platform kick]
+    """
+    parser = argparse.ArgumentParser(description="Adaptive bitrate simulation")
+    parser.add_argument('--phases', default=ABR_SIMULATION_PHASES,
+                        help="Comma separated seconds:kbps link limits, 0 for unthrottled")
+    parser.add_argument('--platform', default=ABR_SIMULATION_PLATFORM,
+                        help="Platform whose rendition is adapted")
+    args = parser.parse_args()
+
+    try:
+        phases = parse_phases(args.phases)
+    except ValueError:
+        print(f"Invalid phases: {args.phases}")
+        sys.exit(1)
+
+    try:
+        asyncio.run(simulate(phases, args.platform))
+    except OSError as e:
+        print(f"Could not listen on ports {ABR_SIMULATION_PORT}-{ABR_SIMULATION_PORT + 2}: {str(e)}")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        print("\nSimulation interrupted by user")
+
+if __name__ == "__main__":
+    main()
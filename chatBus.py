@@ -0,0 +1,146 @@
+import asyncio
+import inspect
+import logging
+import time
+from typing import (
+    Optional,
+    List,
+    Callable,
+    Any
+)
+from constants import (
+    CHAT_OVERFLOW_DROP_OLDEST, CHAT_OVERFLOW_DROP_NEWEST, CHAT_OVERFLOW_BLOCK,
+    CHAT_OVERFLOW_POLICY, CHAT_SUBSCRIBER_QUEUE
+)
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = (CHAT_OVERFLOW_DROP_OLDEST, CHAT_OVERFLOW_DROP_NEWEST, CHAT_OVERFLOW_BLOCK)
+
+class Subscription:
+    """One listener's queue and the task that feeds it messages"""
+
+    def __init__(self, callback: Callable[[Any], Any], name: str,
+                 policy: str = CHAT_OVERFLOW_POLICY, maxsize: int = CHAT_SUBSCRIBER_QUEUE):
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy {policy!r}, expected one of {', '.join(OVERFLOW_POLICIES)}")
+        self.callback = callback
+        self.name = name
+        self.policy = policy
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.delivered = 0
+        self.dropped = 0
+        self.errors = 0
+        self.lag_seconds = 0.0  # Publish to delivery time of the latest message
+        self.max_lag_seconds = 0.0
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def backlog(self) -> int:
+        return self.queue.qsize()
+
+    async def offer(self, message: Any) -> None:
+        """Queue a message, applying the overflow policy when the queue is full."""
+        item = (time.monotonic(), message)
+        if self.policy == CHAT_OVERFLOW_BLOCK:
+            await self.queue.put(item)
+            return
+        if self.queue.full():
+            self.dropped += 1
+            if self.policy == CHAT_OVERFLOW_DROP_NEWEST:
+                return
+            self.queue.get_nowait()
+            self.queue.task_done()
+        self.queue.put_nowait(item)
+
+    def start(self) -> None:
+        if self.task is None:
+            self.task = asyncio.create_task(self._run(), name=f"chat listener {self.name}")
+
+    async def stop(self) -> None:
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def _run(self) -> None:
+        while True:
+            published_at, message = await self.queue.get()
+            try:
+                if inspect.iscoroutinefunction(self.callback):
+                    await self.callback(message)
+                else:
+                    # Plain callbacks may block (terminal output, locks), so keep them off the loop
+                    result = await asyncio.to_thread(self.callback, message)
+                    if inspect.isawaitable(result):
+                        await result
+                self.delivered += 1
+            except Exception as e:
+                self.errors += 1
+                logger.debug(f"Chat listener {self.name} failed: {str(e)}")
+            finally:
+                self.queue.task_done()
+            self.lag_seconds = time.monotonic() - published_at
+            self.max_lag_seconds = max(self.max_lag_seconds, self.lag_seconds)
+
+    def describe(self) -> str:
+        return (f"{self.name}: {self.delivered} delivered, {self.dropped} dropped, "
+                f"{self.backlog} queued, lag {self.lag_seconds * 1000:.0f}ms "
+                f"(max {self.max_lag_seconds * 1000:.0f}ms)")
+
+class MessageBus:
+    """
+    Fans chat messages out from the connectors to every listener.
+
+    publish() only queues, so a connector goes straight back to reading
+    while each listener works through its own bounded queue. Coroutine
+    callbacks are awaited on the loop; plain callbacks run in a worker
+    thread, one message at a time, so a slow one never holds up the loop. A full
+    queue drops its oldest or newest message, or with the block policy
+    holds the publishing connector until there is room.
+    """
+
+    def __init__(self):
+        self.subscriptions: List[Subscription] = []
+        self.published = 0
+
+    def subscribe(self, callback: Callable[[Any], Any], name: Optional[str] = None,
+                  policy: str = CHAT_OVERFLOW_POLICY,
+                  maxsize: int = CHAT_SUBSCRIBER_QUEUE) -> Subscription:
+        """Add a listener; its queue is drained once the event loop is running."""
+        subscription = Subscription(callback, name or getattr(callback, '__name__', 'listener'),
+                                    policy, maxsize)
+        self.subscriptions.append(subscription)
+        try:
+            asyncio.get_running_loop()
+            subscription.start()
+        except RuntimeError:
+            pass  # Started by the first publish instead
+        return subscription
+
+    def unsubscribe(self, callback: Callable[[Any], Any]) -> None:
+        """Remove a listener, dropping whatever it still had queued."""
+        for subscription in [s for s in self.subscriptions if s.callback == callback]:
+            self.subscriptions.remove(subscription)
+            if subscription.task:
+                subscription.task.cancel()
+
+    async def publish(self, message: Any) -> None:
+        self.published += 1
+        for subscription in list(self.subscriptions):
+            subscription.start()
+            await subscription.offer(message)
+
+    async def drain(self) -> None:
+        """Wait until every queued message has been delivered."""
+        await asyncio.gather(*(subscription.queue.join() for subscription in self.subscriptions))
+
+    async def stop(self) -> None:
+        for subscription in self.subscriptions:
+            await subscription.stop()
+
+    def describe(self) -> str:
+        return '; '.join(subscription.describe() for subscription in self.subscriptions)
@@ -0,0 +1,59 @@
+import time
+from collections import OrderedDict
+from typing import (
+    Optional,
+    Hashable
+)
+from constants import CHAT_DEDUP_CAPACITY, CHAT_DEDUP_WINDOW
+
+class RecentIds:
+    """
+    Message ids a polled chat source has already returned, bounded in size and age.
+
+    Polls return the same recent backlog over and over, so an id that
+    shows up again is refreshed rather than forgotten: it only ages out
+    once polls stop returning it. Ids are kept in last-seen order, so
+    both expiry and the capacity limit drop from the oldest end, and
+    every operation is O(1) amortized.
+    """
+
+    def __init__(self, capacity: int = CHAT_DEDUP_CAPACITY, window: float = CHAT_DEDUP_WINDOW):
+        self.capacity = capacity
+        self.window = window
+        self.hits = 0  # Ids that were already known
+        self.evictions = 0  # Ids dropped to stay under capacity while still in the window
+        self.expirations = 0  # Ids dropped for not being seen within the window
+        self._seen: OrderedDict = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def __contains__(self, message_id: Hashable) -> bool:
+        seen_at = self._seen.get(message_id)
+        return seen_at is not None and time.monotonic() - seen_at <= self.window
+
+    def seen(self, message_id: Hashable, now: Optional[float] = None) -> bool:
+        """Record an id, returning whether it was already known."""
+        now = time.monotonic() if now is None else now
+        self._expire(now)
+        known = message_id in self._seen
+        if known:
+            self.hits += 1
+            self._seen.move_to_end(message_id)
+        self._seen[message_id] = now
+        if len(self._seen) > self.capacity:
+            self._seen.popitem(last=False)
+            self.evictions += 1
+        return known
+
+    def _expire(self, now: float) -> None:
+        while self._seen:
+            oldest, seen_at = next(iter(self._seen.items()))
+            if now - seen_at <= self.window:
+                break
+            del self._seen[oldest]
+            self.expirations += 1
+
+    def describe(self) -> str:
+        return (f"{len(self._seen)}/{self.capacity} ids, {self.hits} duplicates, "
+                f"{self.evictions} evicted, {self.expirations} expired")
@@ -5,6 +5,13 @@ import time
 import os
 from datetime import datetime
 from colorama import init, Fore, Style, Cursor, AnsiToWin32
+import ffmpeg
+from replayBuffer import export_replay
+from constants import (
+    FORWARDER_LIVE, FORWARDER_STARTING, FORWARDER_STALLED,
+    FORWARDER_BACKOFF, FORWARDER_STOPPED, FORWARDER_NO_INPUT, FORWARD_MODE_REPLAY,
+    REPLAY_EXPORT_KEY, REPLAY_EXPORT_MINUTES, BEHIND_SPEED_SECONDS
+)
 
 import sys
 
@@ -36,22 +43,45 @@ PLATFORM_FORMATS = {
     }
 }
 
+# Forwarder state indicators
+STATE_ICONS = {
+    FORWARDER_LIVE: '🟢',
+    FORWARDER_STARTING: '🟡',
+    FORWARDER_STALLED: '🟡',
+    FORWARDER_BACKOFF: '🟡',
+    FORWARDER_NO_INPUT: '⚪',
+    FORWARDER_STOPPED: '🔴'
+}
+
 class ChatDisplay:
-    def __init__(self, stream1_process=None, stream2_process=None):
+    def __init__(self, supervisor=None):
         self.message_queue = queue.Queue()
         self.running = False
         self.chat_thread = None
         self.header_thread = None
         self.input_thread = None
-        self.stream1_process = stream1_process
-        self.stream2_process = stream2_process
-        self.messages_start_line = 9  # Reserve lines for header
+        self.supervisor = supervisor
         self.message_history = []
         self.max_messages = 100  # Maximum messages to keep in history
         # Get terminal size
         self.terminal_height = os.get_terminal_size().lines
         self.terminal_width = os.get_terminal_size().columns
+        self.status_lines = 0
+        self._fit_header(self._forwarders())
+
+    def _forwarders(self):
+        # Forwarders keep being added while destinations are attached, so read the live list
+        return list(self.supervisor.forwarders) if self.supervisor else []
+
+    def _fit_header(self, forwarders):
+        """Give each forwarder a status line, moving the messages below; True if the header changed."""
+        status_lines = max(1, len(forwarders))
+        if status_lines == self.status_lines:
+            return False
+        self.status_lines = status_lines
+        self.messages_start_line = 9 + self.status_lines  # Reserve lines for header
         self.visible_messages = self.terminal_height - self.messages_start_line - 1
+        return True
 
     def _wrap_text(self, text, start_width):
         """Wrap text to fit within terminal width, accounting for starting width."""
@@ -148,9 +178,38 @@ class ChatDisplay:
         print(f"{debug_info}Queue size: {self.message_queue.qsize()}{Style.RESET_ALL}")
         stdout.flush()
 
+    def _format_forwarder_status(self, forwarder):
+        """Format one forwarder's state and latest encode telemetry."""
+        icon = STATE_ICONS.get(forwarder.state, '🔴')
+        status = f"{icon} {forwarder.state:<8} {forwarder.name}"
+
+        sample = forwarder.telemetry.latest
+        if forwarder.state != FORWARDER_LIVE or sample is None:
+            return status
+
+        bitrate = f"{sample.bitrate_kbps:.0f}kbps" if sample.bitrate_kbps is not None else "N/A"
+        # ffmpeg's speed field is cumulative, so show the speed over the last few seconds
+        recent_speed = forwarder.telemetry.recent_speed(BEHIND_SPEED_SECONDS)
+        if recent_speed is None:
+            recent_speed = sample.speed
+        speed = f"{recent_speed:.2f}x" if recent_speed is not None else "N/A"
+        # Highlight encoders that have run below real time over those seconds
+        speed_color = Fore.RED if forwarder.telemetry.is_behind() else Fore.GREEN
+        # Drops and dups over the telemetry window, so a forwarder that is dropping now stands out
+        dropped = forwarder.telemetry.dropped_in_window()
+        drop_color = Fore.RED if dropped else Fore.GREEN
+        cpu = f" cpu {forwarder.cpu.percent:.0f}%" if forwarder.cpu.percent is not None else ""
+        return (f"{status}  {sample.fps:.0f}fps {bitrate} "
+                f"{speed_color}{speed}{Style.RESET_ALL} "
+                f"dup {forwarder.telemetry.duplicated_in_window()} "
+                f"{drop_color}drop {dropped}{Style.RESET_ALL}{cpu}")
+
     def display_header(self):
         """Display the chat window header with stream status."""
         with self.header_lock:
+            forwarders = self._forwarders()
+            resized = self._fit_header(forwarders)
+
             # Build complete header in a buffer
             header_width = 80
             output = []
@@ -170,32 +229,39 @@ class ChatDisplay:
             output.append("\033[1;0H" + "=" * header_width)
             output.append("\033[2;0H" + f"{Fore.CYAN}Multi-Platform Chat Display{Style.RESET_ALL}".center(header_width))
 
-            # Stream status - only show if processes were passed in
-            status_line = ""
-            if self.stream1_process is not None or self.stream2_process is not None:
-                stream1_status = "🟢 LIVE" if (self.stream1_process and self.stream1_process.poll() is None) else "🔴 OFFLINE"
-                stream2_status = "🟢 LIVE" if (self.stream2_process and self.stream2_process.poll() is None) else "🔴 OFFLINE"
-                if self.stream1_process is not None and self.stream2_process is not None:
-                    status_line = f"Stream 1: {stream1_status}    Stream 2: {stream2_status}"
-                elif self.stream1_process is not None:
-                    status_line = f"Stream 1: {stream1_status}"
+            # Stream status - only show if forwarders are being supervised
+            for i in range(self.status_lines):
+                if i < len(forwarders):
+                    status_line = self._format_forwarder_status(forwarders[i])
                 else:
-                    status_line = f"Stream 2: {stream2_status}"
-                output.append("\033[3;0H" + status_line.center(header_width))
-            else:
-                output.append("\033[3;0H" + " " * header_width)  # Empty line if no streams
+                    status_line = " " * header_width  # Empty line if no streams
+                output.append(f"\033[{3 + i};0H" + status_line)
+
+            # What OBS is delivering, so a dead input is not mistaken for dead forwarders
+            ingest = self.supervisor.ingest if self.supervisor else None
+            ingest_line = ingest.describe() if ingest else "Ingest: not monitored"
+            output.append(f"\033[{3 + self.status_lines};0H" + f"{ingest_line:<{header_width}}")
 
-            output.append("\033[4;0H" + f"{Fore.YELLOW}Press 'q' to quit{Style.RESET_ALL}".center(header_width))
-            output.append("\033[5;0H" + "=" * header_width)
+            row = 4 + self.status_lines
+            if self._replay_orientations():
+                controls = f"Press '{REPLAY_EXPORT_KEY}' to clip the last {REPLAY_EXPORT_MINUTES:g} min, 'q' to quit"
+            else:
+                controls = "Press 'q' to quit"
+            slated = self.supervisor.slate.active if self.supervisor and self.supervisor.slate else []
+            if slated:
+                # OBS is gone; the platforms are being sent the slate meanwhile
+                controls = f"No input on {', '.join(slated)}, showing the slate | {controls}"
+            output.append(f"\033[{row};0H" + f"{Fore.YELLOW}{controls}{Style.RESET_ALL}".center(header_width))
+            output.append(f"\033[{row + 1};0H" + "=" * header_width)
 
             # Platform legend
             legend_line = "Platform Legend: "
             for platform, format_data in PLATFORM_FORMATS.items():
                 legend_line += f"{format_data['color']}{format_data['prefix']}{Style.RESET_ALL} "
-            output.append("\033[6;0H" + f"{legend_line:<{header_width}}")
+            output.append(f"\033[{row + 2};0H" + f"{legend_line:<{header_width}}")
 
-            output.append("\033[7;0H" + "=" * header_width)
-            output.append("\033[8;0H" + " " * header_width)  # Empty line for spacing
+            output.append(f"\033[{row + 3};0H" + "=" * header_width)
+            output.append(f"\033[{row + 4};0H" + " " * header_width)  # Empty line for spacing
 
             # Calculate cursor position for messages
             current_pos = self.messages_start_line
@@ -210,6 +276,10 @@ class ChatDisplay:
             print(''.join(output), end='', file=stdout)
             stdout.flush()
 
+            # The message area moved, so draw it again at its new place
+            if resized:
+                self._refresh_messages()
+
     def _update_header(self):
         """Continuously update the header."""
         while self.running:
@@ -259,6 +329,8 @@ class ChatDisplay:
                         char = msvcrt.getch().decode('utf-8').lower()
                         if char == 'q':
                             self.cleanup_and_exit()
+                        elif char == REPLAY_EXPORT_KEY:
+                            self.export_clips()
                 else:
                     import tty
                     import termios
@@ -269,6 +341,8 @@ class ChatDisplay:
                         char = sys.stdin.read(1).lower()
                         if char == 'q':
                             self.cleanup_and_exit()
+                        elif char == REPLAY_EXPORT_KEY:
+                            self.export_clips()
                     finally:
                         termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
                 time.sleep(0.1)
@@ -276,17 +350,35 @@ class ChatDisplay:
                 time.sleep(0.1)
                 continue
 
+    def _replay_orientations(self):
+        """Inputs the supervisor is recording into the replay buffer."""
+        forwarders = self.supervisor.forwarders if self.supervisor else []
+        return [f.job.orientation for f in forwarders if f.job.mode == FORWARD_MODE_REPLAY]
+
+    def export_clips(self):
+        """Save the last minutes of every replay buffer without blocking input."""
+        orientations = self._replay_orientations()
+        if orientations:
+            threading.Thread(target=self._export_clips, args=(orientations,), daemon=True).start()
+
+    def _export_clips(self, orientations):
+        for orientation in orientations:
+            try:
+                path = export_replay(orientation, REPLAY_EXPORT_MINUTES)
+                result = f"Saved {path}"
+            except FileNotFoundError as e:
+                result = str(e)
+            except ffmpeg.Error as e:
+                result = f"Clip export failed: {e.stderr.decode() if e.stderr else str(e)}"
+            self.message_queue.put(('replay', orientation, result))
+
     def cleanup_and_exit(self):
         """Clean up and exit the program."""
         self.running = False
 
-        # Stop stream processes
-        if self.stream1_process and self.stream1_process.poll() is None:
-            self.stream1_process.terminate()
-            self.stream1_process.wait(timeout=5)
-        if self.stream2_process and self.stream2_process.poll() is None:
-            self.stream2_process.terminate()
-            self.stream2_process.wait(timeout=5)
+        # Stop stream processes; this runs on the input thread, not the event loop
+        if self.supervisor:
+            self.supervisor.stop_threadsafe()
 
         # Clear screen and reset cursor
         print("\033[2J", end='')  # Clear screen
@@ -369,7 +461,7 @@ class ChatDisplay:
                 self.message_history.append(error_msg)
                 self._refresh_messages()
 
-def create_chat_display(stream1_process=None, stream2_process=None):
+def create_chat_display(supervisor=None):
     """Create and return a new ChatDisplay instance."""
-    return ChatDisplay(stream1_process, stream2_process)
+    return ChatDisplay(supervisor)
 
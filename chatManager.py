@@ -5,15 +5,24 @@ from typing import (
     List,
     Callable,
     Dict,
+    Tuple,
     Any
 )
 from datetime import datetime
 from dataclasses import dataclass
 from urllib.parse import urlparse, parse_qs
-import pytchat
 from aiohttp import ClientWebSocketResponse
 from kick import Client
 import websockets
+from twitchIrc import IrcLineParser, IrcMessage
+from chatDedup import RecentIds
+from chatBus import MessageBus, Subscription
+from youtubeChat import YouTubeChatPoller
+from chatScheduler import PollScheduler
+from constants import (
+    TWITCH_IRC_URL, CHAT_OVERFLOW_POLICY, CHAT_SUBSCRIBER_QUEUE, KICK_POLL_MIN_INTERVAL,
+    KICK_POLL_MAX_INTERVAL, INSTAGRAM_POLL_MIN_INTERVAL, INSTAGRAM_POLL_MAX_INTERVAL
+)
 
 # Configure logging
 logging.basicConfig(
@@ -45,10 +54,13 @@ class ChatManager:
 
     def __init__(self):
         """Initialize ChatManager"""
-        self.listeners: List[Callable[[ChatMessage], None]] = []
+        self.bus = MessageBus()
         self.running = False
         self.websockets: Dict[str, ClientWebSocketResponse] = {}
         self.active_tasks: Dict[str, asyncio.Task] = {}
+        self.recent_ids: Dict[str, RecentIds] = {}  # Per polled source, ids already broadcast
+        self.youtube_pollers: Dict[str, YouTubeChatPoller] = {}
+        self.poll_scheduler = PollScheduler()  # Poll interval and request rate of Kick and Instagram
 
         # Platform handlers mapping
         self.platform_handlers = {
@@ -60,7 +72,7 @@ class ChatManager:
 
         # Platform-specific WebSocket URLs
         self.ws_urls = {
-            'twitch.tv': 'wss://irc-ws.chat.twitch.tv:443',
+            'twitch.tv': TWITCH_IRC_URL,
 
         }
 
@@ -72,14 +84,18 @@ class ChatManager:
             'Cache-Control': 'no-cache',
         }
 
-    def add_listener(self, callback: Callable[[ChatMessage], None]) -> None:
-        """Add a message listener callback"""
-        self.listeners.append(callback)
-
-    def remove_listener(self, callback: Callable[[ChatMessage], None]) -> None:
+    def add_listener(
+        self,
+        callback: Callable[[ChatMessage], Any],
+        policy: str = CHAT_OVERFLOW_POLICY,
+        maxsize: int = CHAT_SUBSCRIBER_QUEUE
+    ) -> Subscription:
+        """Add a message listener callback, plain or async, fed from its own queue"""
+        return self.bus.subscribe(callback, policy=policy, maxsize=maxsize)
+
+    def remove_listener(self, callback: Callable[[ChatMessage], Any]) -> None:
         """Remove a message listener callback"""
-        if callback in self.listeners:
-            self.listeners.remove(callback)
+        self.bus.unsubscribe(callback)
 
     def _determine_platform(self, url: str) -> Optional[str]:
         """Determine chat platform from URL"""
@@ -92,12 +108,8 @@ class ChatManager:
         return None
 
     async def _broadcast_message(self, message: ChatMessage) -> None:
-        """Send message to all registered listeners"""
-        for listener in self.listeners:
-            try:
-                listener(message)
-            except Exception as e:
-                logger.debug(e)
+        """Queue message for all registered listeners"""
+        await self.bus.publish(message)
 
     def _create_twitch_message(self, item: dict) -> ChatMessage:
         """Create ChatMessage from Twitch chat data"""
@@ -131,30 +143,32 @@ class ChatManager:
     async def _process_instagram_messages(
         self,
         messages: dict,
-        seen_ids: set,
+        seen_ids: RecentIds,
         last_ts: int
-    ) -> int:
-        """Process Instagram messages and return updated timestamp"""
+    ) -> Tuple[int, int]:
+        """Process Instagram messages and return updated timestamp and new message count"""
         if not messages or 'comments' not in messages:
-            return last_ts
+            return last_ts, 0
 
+        new_messages = 0
         for item in messages['comments']:
-            if item['pk'] in seen_ids:
+            if seen_ids.seen(item['pk']):
                 continue
 
-            seen_ids.add(item['pk'])
             last_ts = max(last_ts, item['created_at'])
 
             msg = self._create_instagram_message(item)
             await self._broadcast_message(msg)
+            new_messages += 1
 
-        return last_ts
+        return last_ts, new_messages
 
     async def _handle_instagram_connection(self, client) -> None:
         """Handle Instagram live chat using authenticated client"""
         last_ts = 0
-        poll_interval = 3  # Standardized polling interval
-        seen_message_ids = set()
+        schedule = self.poll_scheduler.source(
+            'instagram', INSTAGRAM_POLL_MIN_INTERVAL, INSTAGRAM_POLL_MAX_INTERVAL)
+        seen_message_ids = self.recent_ids.setdefault('instagram', RecentIds())
 
         try:
             broadcast_id = client.username
@@ -169,19 +183,19 @@ class ChatManager:
                         last_comment_ts=last_ts
                     )
 
-                    last_ts = await self._process_instagram_messages(
+                    last_ts, new_messages = await self._process_instagram_messages(
                         messages,
                         seen_message_ids,
                         last_ts
                     )
-
-                    if len(seen_message_ids) > 1000:
-                        seen_message_ids.clear()
+                    # Only comments after last_ts come back, so there is no backlog to compare with
+                    schedule.record_poll(new_messages)
 
                 except Exception as e:
                     logger.error(f"Error polling Instagram chat: {str(e)}")
+                    schedule.record_error(e)
 
-                await asyncio.sleep(poll_interval)
+                await asyncio.sleep(schedule.interval)
 
         except Exception as e:
             logger.error(f"Error in Instagram chat connection: {str(e)}")
@@ -201,30 +215,32 @@ class ChatManager:
     async def _process_kick_messages(
         self,
         messages: list,
-        seen_ids: set,
+        seen_ids: RecentIds,
         is_first_batch: bool = False
-    ) -> None:
-        """Process new Kick messages"""
+    ) -> int:
+        """Process new Kick messages and return how many were broadcast"""
         now = datetime.now()
         cutoff_time = now.timestamp() - 120  # 2 minutes ago
+        new_messages = 0
 
         for item in reversed(messages):
-            if item.id in seen_ids:
+            if seen_ids.seen(item.id):
                 continue
 
             # Skip old messages in first batch
             if is_first_batch and item.created_at.timestamp() < cutoff_time:
-                seen_ids.add(item.id)
                 continue
 
-            seen_ids.add(item.id)
             msg = self._create_kick_message(item)
             await self._broadcast_message(msg)
+            new_messages += 1
+
+        return new_messages
 
     async def _handle_kick_connection(self, client) -> None:
         """Handle Kick chat using authenticated client"""
-        seen_ids = set()
-        poll_interval = 15  # Standardized polling interval
+        seen_ids = self.recent_ids.setdefault('kick', RecentIds())
+        schedule = self.poll_scheduler.source('kick', KICK_POLL_MIN_INTERVAL, KICK_POLL_MAX_INTERVAL)
         first_batch = True
 
         try:
@@ -236,16 +252,16 @@ class ChatManager:
             while self.running:
                 try:
                     msgs = await client.get_messages(user.channel_id)
-                    await self._process_kick_messages(msgs, seen_ids, first_batch)
+                    new_messages = await self._process_kick_messages(msgs, seen_ids, first_batch)
+                    # The first batch is mostly history, not a sign of a busy chat
+                    schedule.record_poll(new_messages, None if first_batch else len(msgs))
                     first_batch = False
 
-                    if len(seen_ids) > 1000:
-                        seen_ids.clear()
-
                 except Exception as e:
                     logger.error(f"Error polling Kick chat: {str(e)}")
+                    schedule.record_error(e)
 
-                await asyncio.sleep(poll_interval)
+                await asyncio.sleep(schedule.interval)
 
         except Exception as e:
             logger.error(f"Error in Kick chat connection: {str(e)}")
@@ -253,6 +269,7 @@ class ChatManager:
     async def _handle_twitch_connection(self, url: str) -> None:
         """Handle Twitch WebSocket connection"""
         channel = url.split('popout/')[1].split('/chat')[0]
+        parser = IrcLineParser()
         try:
             async with websockets.connect(self.ws_urls['twitch.tv']) as websocket:
                 self.websockets[url] = websocket
@@ -268,18 +285,17 @@ class ChatManager:
 
                 while self.running:
                     try:
-                        message = await websocket.recv()
-                        logger.debug(f"Raw Twitch message received: {message}")
-
-                        if message.startswith('PING'):
-                            await websocket.send('PONG :tmi.twitch.tv')
-                            continue
-
-                        # Parse IRC message
-                        if 'PRIVMSG' in message:
-                            chat_message = self._parse_twitch_message(message)
-                            if chat_message:
-                                await self._broadcast_message(chat_message)
+                        frame = await websocket.recv()
+                        logger.debug(f"Raw Twitch frame received: {frame}")
+
+                        # One frame can carry many lines when chat is busy
+                        for irc_message in parser.feed(frame):
+                            if irc_message.command == 'PING':
+                                await websocket.send(f'PONG :{irc_message.trailing or "tmi.twitch.tv"}')
+                            elif irc_message.command == 'PRIVMSG':
+                                chat_message = self._parse_twitch_message(irc_message)
+                                if chat_message:
+                                    await self._broadcast_message(chat_message)
 
                     except websockets.ConnectionClosed:
                         logger.error("Twitch WebSocket connection closed")
@@ -293,8 +309,22 @@ class ChatManager:
             if url in self.websockets:
                 del self.websockets[url]
 
+    def _create_youtube_message(self, chat_item) -> ChatMessage:
+        """Create ChatMessage from a pytchat chat item"""
+        return ChatMessage(
+            platform='youtube',
+            username=chat_item.author.name,
+            message=chat_item.message,
+            timestamp=datetime.fromtimestamp(chat_item.timestamp/1000),  # Convert from ms to seconds
+            message_id=chat_item.id,
+            user_id=chat_item.author.channelId,
+            is_moderator=chat_item.author.isChatModerator,
+            is_subscriber=chat_item.author.isChatSponsor,
+            badges=[]  # Could be populated from badgeUrl if needed
+        )
+
     async def _handle_youtube_connection(self, chat_url: str) -> None:
-        """Handle YouTube chat using pytchat"""
+        """Handle YouTube chat, polled off the event loop at YouTube's suggested interval"""
         try:
             # Extract video ID from URL
             video_id = parse_qs(urlparse(chat_url).query).get('v', [''])[0]
@@ -302,69 +332,40 @@ class ChatManager:
                 logger.error("No video ID found in YouTube URL")
                 return
 
-            # Create pytchat instance
-            chat = pytchat.create(video_id=video_id)
             logging.getLogger("httpx").setLevel(logging.WARNING)
+            poller = YouTubeChatPoller(video_id)
+            self.youtube_pollers[chat_url] = poller
 
-            while self.running and chat.is_alive():
+            async for chat_item in poller.items(lambda: self.running):
                 try:
-                    # Get new messages
-                    for chat_item in chat.get().sync_items():
-                        # Create standardized chat message
-                        chat_message = ChatMessage(
-                            platform='youtube',
-                            username=chat_item.author.name,
-                            message=chat_item.message,
-                            timestamp=datetime.fromtimestamp(chat_item.timestamp/1000),  # Convert from ms to seconds
-                            message_id=chat_item.id,
-                            user_id=chat_item.author.channelId,
-                            is_moderator=chat_item.author.isChatModerator,
-                            is_subscriber=chat_item.author.isChatSponsor,
-                            badges=[]  # Could be populated from badgeUrl if needed
-                        )
-
-                        # Broadcast the message
-                        await self._broadcast_message(chat_message)
-
+                    await self._broadcast_message(self._create_youtube_message(chat_item))
                 except Exception as e:
                     logger.error(f"Error processing YouTube message: {str(e)}")
 
-                # Standardized polling interval
-                await asyncio.sleep(15)
-
         except Exception as e:
             logger.error(f"Error in YouTube chat connection: {str(e)}")
-        finally:
-            if 'chat' in locals():
-                chat.terminate()
 
-    def _parse_twitch_message(self, irc_message: str) -> Optional[ChatMessage]:
-        """Parse Twitch IRC message into ChatMessage"""
+    def _parse_twitch_message(self, irc_message: IrcMessage) -> Optional[ChatMessage]:
+        """Create ChatMessage from a parsed Twitch PRIVMSG"""
         try:
-            # Basic IRC message parsing
-            tags_prefix = ''
-            if irc_message.startswith('@'):
-                tags_prefix, irc_message = irc_message[1:].split(' ', 1)
-
-            tags = dict(tag.split('=') for tag in tags_prefix.split(';')) if tags_prefix else {}
-
-            parts = irc_message.split(' ', 3)
-            if len(parts) < 4:
+            if len(irc_message.params) < 2:
                 return None
 
-            username = parts[0].split('!')[0][1:]
-            message_text = parts[3][1:] if len(parts) > 3 else ''
+            tags = irc_message.tags
+            badges = [badge for badge in tags.get('badges', '').split(',') if badge]
+            badge_names = {badge.split('/')[0] for badge in badges}
+            sent_at = tags.get('tmi-sent-ts', '')
 
             return ChatMessage(
                 platform='twitch',
-                username=tags.get('display-name', username),
-                message=message_text,
-                timestamp=datetime.now(),
+                username=tags.get('display-name') or irc_message.nick,
+                message=irc_message.trailing,
+                timestamp=datetime.fromtimestamp(int(sent_at) / 1000) if sent_at.isdigit() else datetime.now(),
                 message_id=tags.get('id', ''),
                 user_id=tags.get('user-id'),
-                is_moderator='moderator' in tags.get('badges', ''),
-                is_subscriber='subscriber' in tags.get('badges', ''),
-                badges=tags.get('badges', '').split(',')
+                is_moderator=tags.get('mod') == '1' or 'moderator' in badge_names or 'broadcaster' in badge_names,
+                is_subscriber=tags.get('subscriber') == '1' or 'subscriber' in badge_names,
+                badges=badges
             )
         except Exception as e:
             logger.error(f"Error parsing Twitch message: {str(e)}")
@@ -466,4 +467,15 @@ class ChatManager:
         self.active_tasks.clear()
         self.websockets.clear()
 
+        await self.bus.stop()
+        if self.bus.subscriptions:
+            logger.info(f"Chat listeners: {self.bus.describe()}")
+
+        if self.poll_scheduler.schedules:
+            logger.info(self.poll_scheduler.describe())
+        for url, poller in self.youtube_pollers.items():
+            logger.info(f"YouTube chat {url}: {poller.stats.describe()}")
+        for source, seen_ids in self.recent_ids.items():
+            logger.info(f"{source} chat dedup: {seen_ids.describe()}")
+
         logger.info("Stopped all chat connections")
@@ -0,0 +1,130 @@
+import time
+from collections import deque
+from typing import (
+    Optional,
+    Dict
+)
+from constants import (
+    CHAT_POLL_TARGET_MESSAGES, CHAT_POLL_RATE_SMOOTHING, CHAT_POLL_IDLE_GROWTH,
+    CHAT_POLL_ERROR_GROWTH, CHAT_POLL_RATE_LIMIT_COOLDOWN
+)
+
+# Exception names chat clients use for being throttled
+RATE_LIMIT_NAMES = ('ratelimit', 'throttl', 'pleasewait', 'toomanyrequests')
+
+def retry_after(error: Exception) -> Optional[float]:
+    """
+    Seconds a rate limited error asks to wait, 0 if it gives none, None if it is no rate limit.
+
+    Looks for an HTTP 429 status on the error or its response, and for
+    the throttling exceptions clients such as instagrapi raise.
+    """
+    response = getattr(error, 'response', None)
+    status = (getattr(error, 'status', None) or getattr(error, 'status_code', None)
+              or getattr(response, 'status', None) or getattr(response, 'status_code', None))
+    name = type(error).__name__.lower()
+    if status != 429 and not any(marker in name for marker in RATE_LIMIT_NAMES):
+        return None
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        return float(headers.get('Retry-After', 0))
+    except (TypeError, ValueError):
+        return 0.0
+
+class PollSchedule:
+    """
+    Poll interval of one chat source, following how fast its chat moves.
+
+    The interval aims for CHAT_POLL_TARGET_MESSAGES new messages per
+    poll at the smoothed message rate. It grows while the chat is quiet
+    and after errors, drops to the minimum when a backlog poll returned
+    only new messages (some may have scrolled past), and holds at the
+    maximum, or longer if asked, after a rate limit.
+    """
+
+    def __init__(self, name: str, min_interval: float, max_interval: float):
+        self.name = name
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = min_interval
+        self.message_rate = 0.0  # Smoothed new messages per second
+        self.errors = 0
+        self.rate_limits = 0
+        self._last_success: Optional[float] = None
+        self._cooldown_until = 0.0
+        self._requests: deque = deque()
+
+    def _clamp(self, interval: float) -> float:
+        return min(self.max_interval, max(self.min_interval, interval))
+
+    def _note_request(self, now: float) -> None:
+        self._requests.append(now)
+        while self._requests and now - self._requests[0] > 60:
+            self._requests.popleft()
+
+    @property
+    def requests_per_minute(self) -> int:
+        now = time.monotonic()
+        return sum(1 for requested_at in self._requests if now - requested_at <= 60)
+
+    def record_poll(self, new_messages: int, returned: Optional[int] = None,
+                    now: Optional[float] = None) -> float:
+        """
+        Adjust to a successful poll and return the next interval.
+
+        returned is how many messages the poll got back, for sources that
+        return their recent backlog; None for sources that only return
+        what is new.
+        """
+        now = time.monotonic() if now is None else now
+        self._note_request(now)
+        if self._last_success is not None and now > self._last_success:
+            rate = new_messages / (now - self._last_success)
+            # Follow a rising rate at once, so a burst is polled fast from the next poll on
+            if rate > self.message_rate:
+                self.message_rate = rate
+            else:
+                self.message_rate += CHAT_POLL_RATE_SMOOTHING * (rate - self.message_rate)
+        self._last_success = now
+
+        if now < self._cooldown_until:
+            return self.interval
+        if new_messages and returned is not None and new_messages >= returned:
+            self.interval = self.min_interval
+        elif not new_messages or self.message_rate <= 0:
+            self.interval = self._clamp(self.interval * CHAT_POLL_IDLE_GROWTH)
+        else:
+            self.interval = self._clamp(CHAT_POLL_TARGET_MESSAGES / self.message_rate)
+        return self.interval
+
+    def record_error(self, error: Exception, now: Optional[float] = None) -> float:
+        """Back off after a failed poll and return the next interval."""
+        now = time.monotonic() if now is None else now
+        self._note_request(now)
+        self.errors += 1
+        wait = retry_after(error)
+        if wait is None:
+            self.interval = self._clamp(self.interval * CHAT_POLL_ERROR_GROWTH)
+        else:
+            self.rate_limits += 1
+            self.interval = max(self.max_interval, wait)
+            self._cooldown_until = now + max(CHAT_POLL_RATE_LIMIT_COOLDOWN, wait)
+        return self.interval
+
+    def describe(self) -> str:
+        return (f"{self.name} every {self.interval:.1f}s, {self.requests_per_minute}/min, "
+                f"{self.message_rate * 60:.0f} msgs/min")
+
+class PollScheduler:
+    """Poll schedules of every polled chat source, by name"""
+
+    def __init__(self):
+        self.schedules: Dict[str, PollSchedule] = {}
+
+    def source(self, name: str, min_interval: float, max_interval: float) -> PollSchedule:
+        if name not in self.schedules:
+            self.schedules[name] = PollSchedule(name, min_interval, max_interval)
+        return self.schedules[name]
+
+    def describe(self) -> str:
+        return "Chat polling: " + " | ".join(schedule.describe() for schedule in self.schedules.values())
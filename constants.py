@@ -107,25 +107,7 @@ OAUTH_SCOPES = [
 
 # File names
 CREDS_FILENAME = 'twitchCreds.json'
-#!/bin/bash
-
-# Network settings
-RTMP_HOST="localhost"
-RTMP_PORT=1935
-
-# Stream settings
-VIDEO_CODEC="libx264"
-VIDEO_PRESET="veryfast"
-VIDEO_CRF=23
-VIDEO_BITRATE="2M"
-AUDIO_CODEC="aac" 
-AUDIO_BITRATE="128k"
-OUTPUT_FORMAT="flv"
-
-# Error messages
-ERR_USAGE="Usage: $0 <APP_NAME> <URL> <KEY>"
-ERR_FFMPEG="Error: ffmpeg is not installed"
-ERR_RTMP="Error: RTMP server not running on port 1935"
+
 # Terminal commands
 GNOME_TERMINAL = 'gnome-terminal'
 KONSOLE_TERMINAL = 'konsole'
@@ -135,7 +117,6 @@ TERMINAL_LIST = [GNOME_TERMINAL, KONSOLE_TERMINAL]
 # FFmpeg settings
 FFMPEG_PRESET = 'veryfast'
 FFMPEG_CRF = '23'
-VIDEO_BITRATE = '4M'
 AUDIO_CODEC = 'aac'
 AUDIO_BITRATE = '128k'
 VIDEO_CODEC = 'libx264'
@@ -144,6 +125,228 @@ RTMP_LOCAL_PORT = '1935'
 # Stream orientations
 PORTRAIT = "PORTRAIT"
 LANDSCAPE = "LANDSCAPE"
+
+# Forwarding modes
+FORWARD_MODE_SINGLE = 'single'  # One ffmpeg process per destination
+FORWARD_MODE_TEE = 'tee'  # One encode per orientation, fanned out with the tee muxer
+FORWARD_MODE = FORWARD_MODE_TEE
+TEE_SLAVE_OPTIONS = 'f=flv:onfail=ignore'
+
+# Passthrough settings (stream copy when the local input already fits a platform)
+ENABLE_PASSTHROUGH = True
+PROBE_TIMEOUT_US = 10000000  # ffprobe read timeout on the local input
+PROBE_WAIT_SECONDS = 30  # With the relay, time given to OBS to (re)connect before an input is probed
+PROBE_WAIT_POLL = 0.25
+PASSTHROUGH_VIDEO_CODECS = ['h264']
+PASSTHROUGH_AUDIO_CODECS = ['aac']
+PASSTHROUGH_VIDEO_PROFILES = ['Constrained Baseline', 'Baseline', 'Main', 'High']
+
+# Platform profiles (bitrate, ingest cap, keyframe interval, resolution and fps
+# cap per platform, validated at startup). Platforms whose profiles resolve to
+# the same encode share it; resolution and fps caps only ever scale down.
+PLATFORM_PROFILES_FILE = 'platformProfiles.json'
+PLATFORM_PROFILE_DEFAULT = 'default'  # Used for platforms without their own profile
+X264_PRESETS = ['ultrafast', 'superfast', 'veryfast', 'faster', 'fast',
+                'medium', 'slow', 'slower', 'veryslow']
+MAX_KEYFRAME_SECONDS = 10
+MAX_PROFILE_FPS = 240
+RENDITION_COPY = 'copy'  # Plan key of destinations that get the input stream-copied
+
+# Portrait derivation (crop portrait destinations out of the landscape input
+# so OBS only has to publish one stream)
+DERIVE_PORTRAIT = False
+DERIVED_PORTRAIT_SOURCE = 'landscape'
+PORTRAIT_CROP_WIDTH = 'trunc(ih*9/16/2)*2'  # Centered 9:16 window, even width for yuv420p
+
+# Latency profiles (applied to every encode a forwarder runs)
+# low: zerolatency tuning, no B-frames, keyframes forced on the same
+# timestamps in every rendition and no muxer buffering
+LATENCY_NORMAL = 'normal'
+LATENCY_LOW = 'low'
+LATENCY_PROFILE = LATENCY_NORMAL
+LOW_LATENCY_GOP_SECONDS = 1
+LATENCY_PROFILES = {
+    LATENCY_NORMAL: {'input': {}, 'encoder': {}, 'muxer': {}},
+    LATENCY_LOW: {
+        'input': {'fflags': 'nobuffer', 'flags': 'low_delay'},
+        'encoder': {'tune': 'zerolatency', 'bf': 0, 'sc_threshold': 0,
+                    'force_key_frames': f'expr:gte(t,n_forced*{LOW_LATENCY_GOP_SECONDS})'},
+        'muxer': {'flush_packets': 1, 'muxdelay': 0, 'muxpreload': 0},
+    },
+}
+
+# In-process RTMP relay (replaces the external nginx-rtmp hop when enabled)
+ENABLE_RTMP_RELAY = True  # Falls back to an external server if RTMP_LOCAL_PORT is taken
+RTMP_RELAY_HOST = 'localhost'  # '0.0.0.0' to accept OBS from another machine
+RELAY_CHUNK_SIZE = 65536  # Outgoing chunk size; most packets go out as one chunk
+RELAY_WINDOW_ACK_SIZE = 5000000
+RELAY_SUBSCRIBER_QUEUE = 512  # Messages buffered per forwarder before it is skipped ahead
+RELAY_GOP_CACHE_MESSAGES = 1024  # Messages since the last keyframe replayed to new forwarders
+RELAY_KEYFRAME_HISTORY = 8  # Keyframe intervals kept per stream; the longest is its keyframe interval
+WARM_STREAM_APP = 'warm'  # Relay application shared encodes are published to while platforms are set up
+
+# Input slate (needs the RTMP relay)
+# When OBS stops sending, a looped pre-encoded slate is published into its
+# relay stream so every forwarder, and every platform connection, stays up.
+# OBS takes over again at its first keyframe once it is back.
+ENABLE_INPUT_SLATE = True
+SLATE_STALL_SECONDS = 3  # Input silent this long shows the slate; keep below STALL_TIMEOUT_SECONDS
+SLATE_QUERY = 'slate'  # Appended to the stream name the slate is published under, to tell it from OBS
+SLATE_DIR = './slate'  # Pre-encoded slates, one per source size and frame rate
+SLATE_IMAGE = None  # Picture to show, e.g. './brb.png'; a plain SLATE_COLOR frame otherwise
+SLATE_TEXT = 'Be right back'  # Drawn over the slate when ffmpeg has drawtext, '' for none
+SLATE_COLOR = '0x101820'
+SLATE_CLIP_SECONDS = 2  # Length of the looped clip, with a keyframe every second
+SLATE_VIDEO_BITRATE = '1000k'  # A still picture needs little
+SLATE_FALLBACK_SIZE = '1920x1080'  # Used when OBS's metadata has no size
+SLATE_FALLBACK_FPS = 30
+SLATE_SAMPLE_RATE = 48000  # Used when OBS's metadata has no sample rate
+
+# nginx-rtmp push (when an external nginx holds RTMP_LOCAL_PORT instead of the relay)
+# Destinations that take the source as-is are pushed by nginx itself, with no
+# ffmpeg process. Include NGINX_PUSH_CONFIG in the rtmp server block of nginx.conf.
+ENABLE_NGINX_PUSH = False
+NGINX_PUSH_CONFIG = './nginx-push.conf'
+NGINX_PUSH_APP = 'live'  # Application OBS publishes to
+NGINX_TEST_COMMAND = ['nginx', '-t']
+NGINX_RELOAD_COMMAND = ['nginx', '-s', 'reload']
+NGINX_CONTROL_URL = None  # e.g. 'http://127.0.0.1:8080/control' to have OBS reconnect into new pushes
+NGINX_COMMAND_TIMEOUT = 10
+RESTREAM_YOUTUBE = False  # Send YouTube the local stream instead of having OBS stream to it directly
+
+# Adaptive bitrate (re-encoded destinations only, needs the RTMP relay)
+# Each adaptive destination is encoded into the relay and pushed out by a
+# stream-copy forwarder, so the encoder can be replaced at another bitrate
+# without touching the platform connection.
+ADAPTIVE_BITRATE_PLATFORMS = []  # e.g. [PLATFORM_KICK, PLATFORM_TWITCH]
+ABR_STREAM_APP = 'abr'  # Relay application the adaptive encodes are published to
+ABR_MIN_KBPS = 1000  # The rendition's bitrate is the ceiling
+ABR_STEP_DOWN = 0.7  # Multiplier applied on congestion
+ABR_STEP_UP_KBPS = 500  # Added after ABR_STEP_UP_AFTER seconds without congestion
+ABR_STEP_UP_AFTER = 30
+ABR_COOLDOWN_SECONDS = 10  # Signals are ignored this long after a change
+ABR_CHECK_INTERVAL = 1.0
+ABR_MIN_SPEED = 0.95  # Encode or push speed below this counts as congestion
+ABR_SPEED_SECONDS = 5  # Span the encode and push speeds are measured over
+ABR_QUEUE_THRESHOLD = 60  # Relay messages waiting for the pusher before growth counts
+ABR_SWITCH_TIMEOUT = 15  # Give up on a replacement encoder that never takes over
+
+# Adaptive bitrate simulation (bitrateSimulation.py)
+ABR_SIMULATION_PORT = 19550  # Relay; the throttled proxy and sink take the next two ports
+ABR_SIMULATION_PLATFORM = 'kick'
+ABR_SIMULATION_PHASES = '20:0,60:1500,60:0'  # seconds:kbps link limits, 0 for unthrottled
+
+# Ingest monitor (what OBS is delivering to each input, from the relay or nginx-rtmp's /stat)
+ENABLE_INGEST_MONITOR = True
+INGEST_STAT_URL = 'http://127.0.0.1:8080/stat'  # nginx-rtmp stat page, read without the relay; None to skip
+INGEST_POLL_INTERVAL = 1.0
+INGEST_STALL_SECONDS = 3  # No media for this long means OBS stopped sending
+INGEST_STAT_TIMEOUT = 2
+
+# Forwarder supervisor
+SUPERVISOR_POLL_INTERVAL = 0.5  # Seconds between health checks
+STALL_TIMEOUT_SECONDS = 10  # Restart a forwarder whose out_time stops advancing
+RESTART_BACKOFF_BASE = 1  # Seconds before the first restart
+RESTART_BACKOFF_MAX = 60
+RESTART_RESET_SECONDS = 60  # Live this long and the backoff starts over
+FORWARDER_STOP_TIMEOUT = 5
+
+# Forwarder telemetry
+TELEMETRY_WINDOW_SIZE = 60  # Progress samples kept per forwarder (ffmpeg reports every 0.5s)
+REALTIME_SPEED = 1.0  # Encode speed below this means the forwarder is falling behind
+BEHIND_SPEED_SECONDS = 10  # Span the behind-real-time check measures speed over
+BEHIND_SPEED_TOLERANCE = 0.03  # Jitter in progress reports allowed below real time
+FORWARDER_LOG_LINES = 200  # stderr lines kept in memory per forwarder process
+FORWARDER_LOG_LINE_BYTES = 4096  # Longer lines are dropped so memory stays bounded
+FORWARDER_LOG_TAIL = 20  # Lines logged when a forwarder exits or stalls
+
+# CPU budget (Linux; encoders are pinned to the cores OBS is not given)
+ENABLE_CPU_BUDGET = True
+OBS_RESERVED_CORES = 2  # Lowest numbered cores left to OBS and the desktop
+FORWARDER_NICE = 10  # Added niceness of every forwarder, 0 to leave it alone
+FORWARDER_SCHED_BATCH = True  # Mark forwarders CPU-bound so they never preempt OBS
+CPU_SAMPLE_INTERVAL = 2.0  # Seconds between per-forwarder CPU usage samples
+
+# Forwarder states
+FORWARDER_STARTING = 'STARTING'
+FORWARDER_LIVE = 'LIVE'
+FORWARDER_STALLED = 'STALLED'
+FORWARDER_BACKOFF = 'BACKOFF'
+FORWARDER_STOPPED = 'STOPPED'
+FORWARDER_NO_INPUT = 'NO INPUT'  # Output stalled because OBS stopped sending, not restarted
+FORWARDER_PUSHED = 'PUSHED'  # Pushed by nginx, no forwarder of ours
+
+# Replay buffer (stream-copies the OBS encode into a ring of segments, no extra encode)
+ENABLE_REPLAY_BUFFER = False
+FORWARD_MODE_REPLAY = 'replay'  # Job mode of the replay recorders
+REPLAY_PLATFORM = 'replay'  # Name the recorders show up under in the status header
+REPLAY_BUFFER_DIR = './replay'  # Point at a tmpfs such as /dev/shm to keep the ring in memory
+REPLAY_SEGMENT_SECONDS = 4  # Segments are cut on the next keyframe after this
+REPLAY_BUFFER_SECONDS = 600  # Oldest segments are overwritten beyond this
+REPLAY_EXPORT_DIR = './clips'
+REPLAY_EXPORT_MINUTES = 2  # Length of a clip saved from the chat display
+REPLAY_EXPORT_KEY = 'c'
+
+# Restream benchmark (streamBenchmark.py)
+BENCHMARK_DURATION_SECONDS = 30  # Forwarding time measured per run
+BENCHMARK_MAX_DESTINATIONS = 6
+BENCHMARK_PLATFORM = 'twitch'  # Rendition every benchmark destination is encoded for
+BENCHMARK_SOURCE_SIZE = '1920x1080'
+BENCHMARK_SOURCE_FPS = 30
+BENCHMARK_SOURCE_BITRATE = '6M'
+BENCHMARK_STANDIN_PORT = 19350  # First port of the local RTMP stand-ins, one per forwarder
+BENCHMARK_STANDIN_STARTUP = 1.0  # Seconds for the stand-ins to start listening
+BENCHMARK_SINK_POLL_INTERVAL = 0.01
+
+# Preset calibration (python streamForward.py calibrate)
+CALIBRATION_PRESETS = X264_PRESETS[:X264_PRESETS.index('medium') + 1]  # Tried fastest first
+CALIBRATION_MIN_SPEED = 1.2  # The slowest preset every encode keeps above this is written to the profiles
+CALIBRATION_SECONDS = 10  # Wall time each preset is measured for
+CALIBRATION_ENCODES = None  # Concurrent encodes per run, None for one per distinct profile rendition
+
+# Glass-to-glass latency meter (latencyMeter.py)
+LATENCY_METER_DURATION = 30  # Seconds measured after the warm-up
+LATENCY_METER_WARMUP = 5
+LATENCY_METER_PLATFORM = 'kick'
+LATENCY_METER_SIZE = '1280x720'
+LATENCY_METER_FPS = 30
+LATENCY_METER_PORT = 19450  # Ingest stand-in; the sink listens on the next port
+LATENCY_STAMP_BITS = 24  # Frame number bits drawn into the top-left corner
+LATENCY_STAMP_BLOCK = 16  # Pixel size of one bit
+
+# Twitch chat (anonymous IRC over websocket)
+TWITCH_IRC_URL = 'wss://irc-ws.chat.twitch.tv:443'
+TWITCH_IRC_MAX_LINE = 8704  # Characters an unfinished line may hold: 8191 of tags plus 512 of message
+IRC_BENCHMARK_MESSAGES = 200000  # Messages parsed when no capture is given
+IRC_BENCHMARK_ROUNDS = 5  # The best round is reported
+IRC_RECORD_SECONDS = 60  # Length of a recorded capture
+
+# Polled chat (Kick and Instagram return their recent backlog on every poll)
+CHAT_DEDUP_CAPACITY = 5000  # Message ids remembered per source; must exceed the backlog one poll returns
+CHAT_DEDUP_WINDOW = 600  # Seconds an id is remembered after a poll last returned it
+
+# Chat message bus (each listener reads its own queue, so a slow one never stalls a connector)
+CHAT_OVERFLOW_DROP_OLDEST = 'drop-oldest'  # Make room by dropping the oldest queued message
+CHAT_OVERFLOW_DROP_NEWEST = 'drop-newest'  # Drop the message being published
+CHAT_OVERFLOW_BLOCK = 'block'  # Hold the connector until the listener catches up
+CHAT_OVERFLOW_POLICY = CHAT_OVERFLOW_DROP_OLDEST
+CHAT_SUBSCRIBER_QUEUE = 1000  # Messages queued per listener
+
+# YouTube chat (pytchat runs off the event loop and says when to poll next)
+YOUTUBE_CHAT_MIN_INTERVAL = 1.0  # Seconds; lower bound on YouTube's suggested timeoutMs
+YOUTUBE_CHAT_MAX_INTERVAL = 10.0  # Seconds; upper bound on YouTube's suggested timeoutMs
+YOUTUBE_CHAT_ERROR_BACKOFF = 5.0  # Seconds before retrying a failed poll
+
+# Adaptive chat polling (Kick and Instagram; busy chat is polled faster, quiet chat slower)
+KICK_POLL_MIN_INTERVAL = 2.0  # Seconds
+KICK_POLL_MAX_INTERVAL = 15.0
+INSTAGRAM_POLL_MIN_INTERVAL = 2.0
+INSTAGRAM_POLL_MAX_INTERVAL = 10.0
+CHAT_POLL_TARGET_MESSAGES = 5  # New messages aimed for per poll at the current message rate
+CHAT_POLL_RATE_SMOOTHING = 0.3  # Weight of the latest poll in the smoothed message rate
+CHAT_POLL_IDLE_GROWTH = 1.5  # Interval multiplier after a poll with no new messages
+CHAT_POLL_ERROR_GROWTH = 2.0  # Interval multiplier after a failed poll
+CHAT_POLL_RATE_LIMIT_COOLDOWN = 60  # Seconds held at the max interval after a rate limit response
 # Kick streaming constants
 RTMPS_PREFIX = 'rtmps://'
 APP_PATH = '/app/'
@@ -181,6 +384,12 @@ PLATFORM_MAP = {
     5: PLATFORM_INSTAGRAM
 }
 
+# Orientation each restreamed platform is set up with (Twitch and YouTube get OBS directly)
+PLATFORM_ORIENTATIONS = {
+    PLATFORM_KICK: STREAM_MODE,
+    PLATFORM_INSTAGRAM: PORTRAIT_MODE,
+}
+
 # Default platform selection
 DEFAULT_PLATFORM_SELECTION = "1, 2"
 
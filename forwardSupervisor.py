@@ -0,0 +1,788 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from asyncio.subprocess import DEVNULL, PIPE, Process
+from typing import (
+    Optional,
+    List,
+    Dict
+)
+import streamForward
+from streamForward import Destination, ForwardJob, SourceInfo
+from forwardTelemetry import ProgressParser, ProgressSample, ProgressWindow, OutputRing, CpuMeter
+from rtmpRelay import RtmpRelay, RelayStream
+import nginxPush
+from nginxPush import NginxPushError
+from ingestMonitor import IngestMonitor
+from inputSlate import SlateFormat, source_format, render_slate, slate_command
+from replayBuffer import replay_job
+from bitrateController import BitrateController, OutputHealth
+from constants import (
+    FORWARD_MODE, FORWARD_MODE_SINGLE, ENABLE_PASSTHROUGH, ENABLE_RTMP_RELAY,
+    RTMP_LOCAL_PORT, SUPERVISOR_POLL_INTERVAL, STALL_TIMEOUT_SECONDS, RESTART_BACKOFF_BASE,
+    RESTART_BACKOFF_MAX, RESTART_RESET_SECONDS, FORWARDER_STOP_TIMEOUT, FORWARDER_STARTING,
+    FORWARDER_LIVE, FORWARDER_STALLED, FORWARDER_BACKOFF, FORWARDER_STOPPED,
+    FORWARDER_LOG_LINE_BYTES, FORWARDER_LOG_TAIL,
+    ADAPTIVE_BITRATE_PLATFORMS, ABR_STREAM_APP, ABR_CHECK_INTERVAL,
+    ABR_SPEED_SECONDS, ABR_SWITCH_TIMEOUT, ENABLE_REPLAY_BUFFER, WARM_STREAM_APP,
+    ENABLE_CPU_BUDGET, CPU_SAMPLE_INTERVAL, ENABLE_INPUT_SLATE, SLATE_STALL_SECONDS, SLATE_QUERY,
+    ENABLE_NGINX_PUSH, FORWARDER_PUSHED, ENABLE_INGEST_MONITOR, INGEST_STAT_URL, FORWARDER_NO_INPUT,
+    PROBE_WAIT_SECONDS, PROBE_WAIT_POLL, MAX_KEYFRAME_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+def backoff_delay(attempt: int) -> float:
+    """Jittered exponential delay before restart number attempt (0-based)."""
+    ceiling = min(RESTART_BACKOFF_MAX, RESTART_BACKOFF_BASE * 2 ** attempt)
+    # Spread restarts so forwarders that died together don't reconnect in lockstep
+    return random.uniform(ceiling / 2, ceiling)
+
+async def _read_lines(stream: asyncio.StreamReader):
+    """Yield decoded lines, skipping any longer than the reader's limit."""
+    while True:
+        try:
+            raw_line = await stream.readline()
+        except ValueError:
+            # The reader discards an overlong line; carry on with the next one
+            continue
+        if not raw_line:
+            return
+        yield raw_line.decode(errors='replace').rstrip()
+
+class Forwarder:
+    """Owns one ffmpeg process and restarts it when it exits or stalls"""
+
+    def __init__(self, job: ForwardJob, source: Optional[SourceInfo] = None):
+        self.job = job
+        self.source = source
+        self.state = FORWARDER_STOPPED
+        self.process: Optional[Process] = None
+        self.restarts = 0
+        self.last_exit_code: Optional[int] = None
+        self.out_time_us: Optional[int] = None
+        self.telemetry = ProgressWindow()
+        self.output = OutputRing()
+        self.cpu = CpuMeter()
+        self.last_failure_output: List[str] = []
+        self.ingest: Optional[IngestMonitor] = None
+        self._last_progress_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def name(self) -> str:
+        return self.job.name
+
+    def encoder_count(self) -> int:
+        return streamForward.count_encoders(self.job, self.source)
+
+    def apply_cpu_budget(self, cpus: List[int], threads: Optional[int]) -> None:
+        """
+        Pin the forwarder to cpus. A running process is moved at once;
+        the thread count takes effect when ffmpeg next starts.
+        """
+        self.job.cpus = cpus
+        self.job.threads = threads
+        if self.process and self.process.returncode is None:
+            streamForward.set_process_affinity(self.process.pid, cpus)
+
+    def start(self) -> None:
+        """Start the forwarder on the running event loop."""
+        self._task = asyncio.create_task(self._run(), name=f"forwarder {self.name}")
+
+    async def _run(self) -> None:
+        """Run ffmpeg until stopped, backing off between restarts."""
+        attempt = 0
+        while True:
+            started_at = time.monotonic()
+            await self._run_once()
+            if self.state == FORWARDER_STOPPED:
+                return
+            if time.monotonic() - started_at > RESTART_RESET_SECONDS:
+                attempt = 0
+            delay = backoff_delay(attempt)
+            attempt += 1
+            self.restarts += 1
+            self.state = FORWARDER_BACKOFF
+            logger.warning(f"Restarting forwarder {self.name} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    async def _run_once(self) -> None:
+        """Start ffmpeg and wait for it to exit or stall."""
+        self.state = FORWARDER_STARTING
+        self.out_time_us = None
+        self.telemetry.clear()
+        self.cpu.reset()
+        self.output = OutputRing()
+        self._last_progress_at = time.monotonic()
+        try:
+            self.process = await asyncio.create_subprocess_exec(
+                *streamForward.job_command(self.job, self.source),
+                stdin=DEVNULL,
+                stdout=PIPE,
+                stderr=PIPE,
+                limit=FORWARDER_LOG_LINE_BYTES
+            )
+        except Exception as e:
+            logger.error(f"Failed to start forwarder {self.name}: {str(e)}")
+            self.process = None
+            return
+        if ENABLE_CPU_BUDGET and os.name == 'posix':
+            streamForward.limit_process(self.process.pid, self.job.cpus)
+
+        # Drain both pipes continuously so ffmpeg never blocks on a full pipe
+        process = self.process
+        helpers = [
+            asyncio.create_task(self._read_progress(process)),
+            asyncio.create_task(self._read_output(process, self.output)),
+            asyncio.create_task(self._watch_stall(process)),
+            asyncio.create_task(self._measure_cpu(process)),
+        ]
+        try:
+            exit_code = await process.wait()
+            await asyncio.gather(*helpers[:2])
+        finally:
+            for helper in helpers:
+                helper.cancel()
+
+        self.last_exit_code = exit_code
+        if self.state == FORWARDER_STOPPED:
+            return
+        # Say whether OBS had stopped sending, so an input outage is not taken for a crash
+        no_input = " while OBS was not sending" if self._input_receiving() is False else ""
+        if self.state == FORWARDER_STALLED:
+            self._record_failure(f"stalled, out_time stuck at {self.out_time_us}us{no_input}")
+        else:
+            self._record_failure(f"exited with code {exit_code}{no_input}")
+
+    async def _read_output(self, process: Process, output: OutputRing) -> None:
+        """Keep the most recent stderr lines of a process in its ring buffer."""
+        async for line in _read_lines(process.stderr):
+            output.append(line)
+
+    async def _read_progress(self, process: Process) -> None:
+        """Parse ffmpeg's -progress output into telemetry samples."""
+        parser = ProgressParser()
+        async for line in _read_lines(process.stdout):
+            sample = parser.feed(line)
+            if sample:
+                self._on_progress(sample)
+
+    def _on_progress(self, sample: ProgressSample) -> None:
+        """Record a progress sample and mark the forwarder live once output advances."""
+        self.telemetry.add(sample)
+        out_time_us = sample.out_time_us
+        if out_time_us is None:
+            return
+        if self.out_time_us is None or out_time_us > self.out_time_us:
+            self.out_time_us = out_time_us
+            self._last_progress_at = time.monotonic()
+            if self.state in (FORWARDER_STARTING, FORWARDER_NO_INPUT):
+                self.state = FORWARDER_LIVE
+
+    def _input_receiving(self) -> Optional[bool]:
+        """Whether OBS is delivering to this forwarder's input, None if unknown."""
+        return self.ingest.receiving(self.job.orientation) if self.ingest else None
+
+    async def _watch_stall(self, process: Process) -> None:
+        """
+        Terminate a live process whose output stopped advancing.
+
+        If the input itself went quiet the process is left running: a
+        restart cannot bring OBS back, and ffmpeg resumes on its own once
+        OBS does. It only counts as stalled if the input is back and its
+        output still does not move.
+        """
+        while True:
+            await asyncio.sleep(SUPERVISOR_POLL_INTERVAL)
+            if self.state == FORWARDER_NO_INPUT:
+                if self._input_receiving() is not False:
+                    self.state = FORWARDER_LIVE
+                    self._last_progress_at = time.monotonic()
+                continue
+            # A process still waiting for its input is not stalled, only
+            # one that was live and stopped producing output
+            if (self.state == FORWARDER_LIVE
+                    and time.monotonic() - self._last_progress_at > STALL_TIMEOUT_SECONDS):
+                if self._input_receiving() is False:
+                    self.state = FORWARDER_NO_INPUT
+                    logger.warning(f"Forwarder {self.name} has no output because OBS stopped sending")
+                    continue
+                self.state = FORWARDER_STALLED
+                await self._terminate(process)
+                return
+
+    async def _measure_cpu(self, process: Process) -> None:
+        """Sample the process's CPU usage for status output."""
+        while True:
+            self.cpu.sample(process.pid)
+            await asyncio.sleep(CPU_SAMPLE_INTERVAL)
+
+    def _record_failure(self, reason: str) -> None:
+        """Keep and log the last output of a process that exited or stalled."""
+        self.last_failure_output = self.output.tail()
+        logger.warning(f"Forwarder {self.name} {reason}")
+        for line in self.last_failure_output[-FORWARDER_LOG_TAIL:]:
+            logger.warning(f"  {line}")
+
+    @staticmethod
+    async def _terminate(process: Process) -> None:
+        """Stop a process, killing it if it ignores SIGTERM."""
+        if process.returncode is not None:
+            return
+        try:
+            process.terminate()
+            try:
+                await asyncio.wait_for(process.wait(), FORWARDER_STOP_TIMEOUT)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+        except ProcessLookupError:
+            # Exited between the returncode check and the signal
+            pass
+
+    async def stop(self) -> None:
+        """Stop the forwarder for good."""
+        self.state = FORWARDER_STOPPED
+        # Terminate while the readers still drain the pipes; ffmpeg
+        # cannot exit while blocked writing its final progress
+        if self.process:
+            await self._terminate(self.process)
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def destination_states(self) -> Dict[str, str]:
+        """State of every destination served by this forwarder."""
+        return {destination.platform: self.state for destination in self.job.destinations}
+
+class AdaptiveForwarder:
+    """
+    Serves one destination at a bitrate that follows its health.
+
+    An encoder publishes the destination's rendition into the relay and
+    a stream-copy pusher carries it to the platform. A bitrate change
+    starts a replacement encoder; the relay switches to it at its first
+    keyframe, so the platform connection is never interrupted.
+    """
+
+    def __init__(self, destination: Destination, relay: RtmpRelay, input_url: Optional[str] = None):
+        self.destination = destination
+        self.relay = relay
+        self.source: Optional[SourceInfo] = None
+        self.job = ForwardJob(streamForward.input_orientation(destination), [destination],
+                              FORWARD_MODE_SINGLE, input_url=input_url)
+        self.stream_name = f"{ABR_STREAM_APP}/{destination.platform}"
+
+        ceiling = streamForward.rendition_for(destination.platform).video_bitrate_kbps
+        self.controller = BitrateController(ceiling, ceiling)
+        self.cpus: Optional[List[int]] = None
+        self.threads: Optional[int] = None
+        self._ingest: Optional[IngestMonitor] = None
+        self.encoder = self._encoder(self.controller.bitrate_kbps)
+        self.pusher = Forwarder(ForwardJob(self.job.orientation, [destination], FORWARD_MODE_SINGLE,
+                                           input_url=relay.url(self.stream_name), copy=True))
+        self._task: Optional[asyncio.Task] = None
+
+    def _encoder(self, bitrate_kbps: int) -> Forwarder:
+        """Forwarder encoding the destination's rendition into the relay."""
+        target = Destination(self.destination.platform, self.destination.orientation,
+                             self.relay.url(ABR_STREAM_APP), self.destination.platform)
+        encoder = Forwarder(ForwardJob(self.job.orientation, [target], FORWARD_MODE_SINGLE,
+                                       input_url=self.job.input_url, video_bitrate=bitrate_kbps,
+                                       cpus=self.cpus, threads=self.threads))
+        encoder.ingest = self.ingest
+        return encoder
+
+    @property
+    def name(self) -> str:
+        return f"{self.job.name} {self.controller.bitrate_kbps}kbps"
+
+    @property
+    def state(self) -> str:
+        # The destination is only as live as the weaker half
+        if self.pusher.state != FORWARDER_LIVE:
+            return self.pusher.state
+        return self.encoder.state
+
+    @property
+    def telemetry(self) -> ProgressWindow:
+        return self.encoder.telemetry
+
+    @property
+    def ingest(self) -> Optional[IngestMonitor]:
+        return self._ingest
+
+    @ingest.setter
+    def ingest(self, monitor: Optional[IngestMonitor]) -> None:
+        """Share the ingest monitor with the encoder, the pusher and later encoders."""
+        self._ingest = monitor
+        self.encoder.ingest = monitor
+        self.pusher.ingest = monitor
+
+    @property
+    def cpu(self) -> CpuMeter:
+        return self.encoder.cpu
+
+    def encoder_count(self) -> int:
+        return 1
+
+    def apply_cpu_budget(self, cpus: List[int], threads: Optional[int]) -> None:
+        """Pin the encoder, and every replacement, to cpus."""
+        self.cpus = cpus
+        self.threads = threads
+        self.encoder.apply_cpu_budget(cpus, threads)
+
+    def start(self) -> None:
+        """Start encoding, pushing and adjusting on the running event loop."""
+        self.encoder.start()
+        self.pusher.start()
+        self._task = asyncio.create_task(self._control(), name=f"bitrate {self.name}")
+
+    def health(self) -> OutputHealth:
+        """Observe the encoder, the pusher and the relay queue between them."""
+        stream = self.relay.streams.get(self.stream_name)
+        subscribers = stream.subscribers if stream else []
+        latest = self.encoder.telemetry.latest
+        return OutputHealth(
+            encode_speed=self.encoder.telemetry.recent_speed(ABR_SPEED_SECONDS),
+            output_speed=self.pusher.telemetry.recent_speed(ABR_SPEED_SECONDS),
+            queued=sum(s.queue.qsize() for s in subscribers),
+            dropped_frames=latest.drop_frames if latest else 0,
+            dropped_messages=sum(s.dropped for s in subscribers)
+        )
+
+    async def _control(self) -> None:
+        """Check health periodically and apply the controller's decisions."""
+        while True:
+            await asyncio.sleep(ABR_CHECK_INTERVAL)
+            if self.encoder.state != FORWARDER_LIVE or self.pusher.state != FORWARDER_LIVE:
+                continue
+            target = self.controller.update(self.health(), time.monotonic())
+            if target:
+                await self._switch(target)
+
+    async def _switch(self, bitrate_kbps: int) -> None:
+        """Replace the encoder with one at the new bitrate once the relay has switched to it."""
+        previous_kbps = self.encoder.job.video_bitrate
+        stream = self.relay.stream(self.stream_name)
+        handovers = stream.handovers
+        replacement = self._encoder(bitrate_kbps)
+        replacement.start()
+
+        deadline = time.monotonic() + ABR_SWITCH_TIMEOUT
+        while stream.handovers == handovers and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        if stream.handovers == handovers:
+            logger.warning(f"Encoder for {self.destination.platform} at {bitrate_kbps}kbps never took over")
+            await replacement.stop()
+            self.controller.revert(previous_kbps)
+            return
+
+        previous, self.encoder = self.encoder, replacement
+        await previous.stop()
+
+    async def stop(self) -> None:
+        """Stop adjusting, then stop the encoder and the pusher together."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await asyncio.gather(self.encoder.stop(), self.pusher.stop())
+
+    def destination_states(self) -> Dict[str, str]:
+        return {self.destination.platform: self.state}
+
+class SlateSwitcher:
+    """
+    Publishes a looped slate into an input's relay stream while OBS is gone.
+
+    An input that has been live and has forwarders playing it switches to
+    the slate once nothing has arrived for SLATE_STALL_SECONDS. The relay
+    hands its players over to the slate, so no forwarder exits and no
+    platform connection drops. When OBS publishes again it takes over at
+    its first keyframe, which disconnects the slate.
+    """
+
+    def __init__(self, relay: RtmpRelay):
+        self.relay = relay
+        self.formats: Dict[str, SlateFormat] = {}
+        self.slates: Dict[str, Process] = {}
+        self.switches = 0
+        self._renders: Dict[SlateFormat, asyncio.Task] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def active(self) -> List[str]:
+        """Inputs currently showing the slate."""
+        return [name.split('/', 1)[1] for name, process in self.slates.items()
+                if process.returncode is None]
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._watch(), name="slate switcher")
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(SUPERVISOR_POLL_INTERVAL)
+            for name, stream in list(self.relay.streams.items()):
+                if name.startswith('live/'):
+                    await self._check(name, stream)
+
+    def _render(self, slate_format: SlateFormat) -> asyncio.Task:
+        """Start rendering a format's slate in the background, once."""
+        if slate_format not in self._renders:
+            self._renders[slate_format] = asyncio.create_task(
+                asyncio.to_thread(render_slate, slate_format))
+        return self._renders[slate_format]
+
+    async def _check(self, name: str, stream: RelayStream) -> None:
+        publisher = stream.publisher
+        from_obs = publisher is not None and publisher.query != SLATE_QUERY
+        if from_obs and stream.metadata:
+            # Render while OBS is still live so the slate is ready when it is needed
+            slate_format = source_format(stream)
+            if self.formats.get(name) != slate_format:
+                self.formats[name] = slate_format
+                self._render(slate_format)
+
+        process = self.slates.get(name)
+        if process:
+            if process.returncode is None:
+                return
+            del self.slates[name]
+            if from_obs:
+                logger.info(f"{name} is back, the slate was replaced by OBS")
+                return
+
+        quiet = stream.received_at is None or time.monotonic() - stream.received_at > SLATE_STALL_SECONDS
+        if name in self.formats and stream.subscribers and quiet:
+            await self._show(name)
+
+    async def _show(self, name: str) -> None:
+        """Publish the slate for an input; the relay switches to it at its first keyframe."""
+        try:
+            path = await self._render(self.formats[name])
+        except Exception as e:
+            logger.error(f"No slate for {name}: {str(e)}")
+            del self.formats[name]
+            return
+        try:
+            self.slates[name] = await asyncio.create_subprocess_exec(
+                *slate_command(path, f"{self.relay.url(name)}?{SLATE_QUERY}"),
+                stdin=DEVNULL,
+                stdout=DEVNULL,
+                stderr=DEVNULL
+            )
+        except Exception as e:
+            logger.error(f"Failed to start the slate for {name}: {str(e)}")
+            return
+        self.switches += 1
+        logger.warning(f"{name} stopped sending for {SLATE_STALL_SECONDS}s, showing the slate")
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        await asyncio.gather(*(Forwarder._terminate(process) for process in self.slates.values()))
+        self.slates = {}
+
+class ForwardSupervisor:
+    """Starts every forwarder and keeps them running for the whole show"""
+
+    def __init__(self, destinations: List[Destination], mode=FORWARD_MODE):
+        self.destinations = destinations
+        self.mode = mode
+        self.forwarders = [Forwarder(job) for job in streamForward.plan_jobs(destinations, mode)]
+        self.relay: Optional[RtmpRelay] = None
+        self.slate: Optional[SlateSwitcher] = None
+        self.pushed: List[Destination] = []
+        self.ingest: Optional[IngestMonitor] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._warmups: Dict[str, asyncio.Task] = {}
+        self._sources: Dict[str, Optional[SourceInfo]] = {}  # Latest probe of each input
+        self._encoders: Dict[str, Forwarder] = {}
+
+    async def _start_relay(self) -> None:
+        """Accept the OBS publish in-process unless another RTMP server holds the port."""
+        relay = RtmpRelay()
+        try:
+            await relay.start()
+        except OSError as e:
+            print(f"Port {RTMP_LOCAL_PORT} is in use ({str(e)}), forwarding from the external RTMP server")
+            return
+        self.relay = relay
+        if ENABLE_INPUT_SLATE:
+            self.slate = SlateSwitcher(relay)
+            self.slate.start()
+
+    async def start(self) -> None:
+        """Start the relay, probe each input once and start all forwarders."""
+        self.loop = asyncio.get_running_loop()
+        if ENABLE_RTMP_RELAY and self.forwarders:
+            await self._start_relay()
+        orientations = list(dict.fromkeys(
+            streamForward.input_orientation(d) for d in self.destinations))
+        # Probe every input at once, each as soon as OBS publishes it
+        probes = await asyncio.gather(*(self._probe(o) for o in orientations))
+        sources = dict(zip(orientations, probes))
+
+        pushable = [d for d in self.destinations
+                    if self._can_push(d, sources[streamForward.input_orientation(d)])]
+        self.destinations = [d for d in self.destinations if d not in pushable]
+        self.forwarders = self._plan(sources)
+        self._start_ingest_monitor()
+        for forwarder in self.forwarders:
+            forwarder.source = sources[forwarder.job.orientation]
+            forwarder.ingest = self.ingest
+        self.rebalance_cpus()
+        for forwarder in self.forwarders:
+            streamForward.describe_plan(forwarder.job, forwarder.source)
+            forwarder.start()
+        if pushable:
+            await self._push(pushable, sources)
+
+    def _publishing(self, orientation: str) -> Optional[bool]:
+        """Whether OBS is publishing an input to the relay, None without the relay."""
+        if not self.relay:
+            return None
+        stream = self.relay.streams.get(f"live/{orientation}")
+        return bool(stream and stream.publisher and stream.publisher.query != SLATE_QUERY)
+
+    async def _probe(self, orientation: str) -> Optional[SourceInfo]:
+        """
+        Probe an input off the event loop, None when it cannot be stream-copied.
+
+        A relay that was just started has no publisher until OBS
+        reconnects, and probing it then would only time out, so OBS is
+        given PROBE_WAIT_SECONDS to publish first. ffprobe can't report
+        the keyframe interval, so it is taken from the relay.
+        """
+        if not ENABLE_PASSTHROUGH:
+            return None
+        if self.relay and not self._publishing(orientation):
+            deadline = time.monotonic() + PROBE_WAIT_SECONDS
+            while not self._publishing(orientation):
+                if time.monotonic() >= deadline:
+                    print(f"OBS is not publishing {orientation} yet, probing it again when a destination is added")
+                    return None
+                await asyncio.sleep(PROBE_WAIT_POLL)
+        source = await asyncio.to_thread(streamForward.probe_input, orientation)
+        if source is not None:
+            await self._measure_keyframes(orientation, source)
+        self._sources[orientation] = source
+        return source
+
+    async def _measure_keyframes(self, orientation: str, source: SourceInfo) -> None:
+        """Fill in the keyframe interval the relay measured, waiting for two keyframes at most."""
+        stream = self.relay.streams.get(f"live/{orientation}") if self.relay else None
+        if stream is None:
+            return
+        deadline = time.monotonic() + MAX_KEYFRAME_SECONDS
+        while stream.keyframe_seconds is None and time.monotonic() < deadline:
+            await asyncio.sleep(PROBE_WAIT_POLL)
+        source.keyframe_seconds = stream.keyframe_seconds
+
+    async def _current_source(self, orientation: str) -> Optional[SourceInfo]:
+        """The input's probe, probed again if the last attempt found nothing."""
+        source = await self._warmups[orientation]
+        source = self._sources.get(orientation, source)
+        if source is None and ENABLE_PASSTHROUGH and self._publishing(orientation) is not False:
+            source = await asyncio.to_thread(streamForward.probe_input, orientation)
+            if source is not None:
+                await self._measure_keyframes(orientation, source)
+            self._sources[orientation] = source
+        return source
+
+    def _is_adaptive(self, destination: Destination, source: Optional[SourceInfo]) -> bool:
+        """Whether a destination gets its bitrate adapted; stream copies never do."""
+        if not self.relay or destination.platform not in ADAPTIVE_BITRATE_PLATFORMS:
+            return False
+        return (streamForward.is_derived(destination)
+                or not streamForward.can_passthrough(source, destination.platform))
+
+    def _can_push(self, destination: Destination, source: Optional[SourceInfo]) -> bool:
+        """Whether the external nginx can push a destination instead of a forwarder."""
+        return ENABLE_NGINX_PUSH and not self.relay and nginxPush.is_pushable(destination, source)
+
+    async def _push(self, destinations: List[Destination],
+                    sources: Dict[str, Optional[SourceInfo]]) -> None:
+        """Have nginx push to destinations, forwarding to them instead if it will not."""
+        try:
+            await asyncio.to_thread(nginxPush.apply_push_config, self.pushed + destinations)
+        except NginxPushError as e:
+            print(f"Could not set up nginx push, forwarding instead: {str(e)}")
+            for destination in destinations:
+                forwarder = Forwarder(ForwardJob(destination.orientation, [destination], FORWARD_MODE_SINGLE))
+                forwarder.source = sources[destination.orientation]
+                self._add(forwarder)
+            return
+        self.pushed += destinations
+        for destination in destinations:
+            print(f"{destination.platform}: pushed by nginx from {destination.orientation}, no forwarder needed")
+
+    def _plan(self, sources: Dict[str, Optional[SourceInfo]]) -> list:
+        """
+        Give adaptive destinations their own forwarder, plan the rest as
+        usual and add a replay recorder per input when enabled.
+        """
+        adaptive = [d for d in self.destinations
+                    if self._is_adaptive(d, sources[streamForward.input_orientation(d)])]
+        regular = [d for d in self.destinations if d not in adaptive]
+        forwarders = [Forwarder(job) for job in streamForward.plan_jobs(regular, self.mode)]
+        forwarders += [AdaptiveForwarder(d, self.relay) for d in adaptive]
+        if ENABLE_REPLAY_BUFFER:
+            forwarders += [Forwarder(replay_job(orientation)) for orientation in sources]
+        return forwarders
+
+    async def prewarm(self, destinations: List[Destination]) -> None:
+        """
+        Start getting ready to forward while the platforms are still being set up.
+
+        Only the platform and orientation of each destination are used:
+        the relay is started, each input is probed and, through the relay,
+        the encodes those platforms need are started, so attach() only has
+        to start a stream-copy push once a URL and key exist.
+        """
+        self.loop = asyncio.get_running_loop()
+        groups = {orientation: group
+                  for orientation, group in streamForward.group_by_orientation(destinations).items()
+                  if orientation not in self._warmups}
+        # Nothing to forward, so leave the RTMP port and the ingest stats alone
+        if not groups:
+            return
+        if ENABLE_RTMP_RELAY and not self.relay:
+            await self._start_relay()
+        self._start_ingest_monitor()
+        for orientation, group in groups.items():
+            self._warmups[orientation] = asyncio.create_task(
+                self._warm_up(orientation, group), name=f"warm-up {orientation}")
+
+    async def _warm_up(self, orientation: str, destinations: List[Destination]) -> Optional[SourceInfo]:
+        """
+        Probe an input and start the encodes its destinations will share.
+
+        Without a probe there is nothing to tell which destinations need
+        an encode, so those are left to attach().
+        """
+        source = await self._probe(orientation)
+        if ENABLE_REPLAY_BUFFER:
+            self._add(Forwarder(replay_job(orientation)))
+        if source is None and ENABLE_PASSTHROUGH:
+            return None
+        for destination in destinations:
+            if self._needs_shared_encode(destination, source):
+                self._shared_encoder(destination)
+        return source
+
+    def _needs_shared_encode(self, destination: Destination, source: Optional[SourceInfo]) -> bool:
+        if not self.relay or self._is_adaptive(destination, source):
+            return False
+        return (streamForward.is_derived(destination)
+                or not streamForward.can_passthrough(source, destination.platform))
+
+    def _shared_encoder(self, destination: Destination) -> str:
+        """Relay stream carrying a destination's rendition, starting its encoder if needed."""
+        orientation = streamForward.input_orientation(destination)
+        rendition = streamForward.rendition_for(destination.platform)
+        suffix = '-crop' if streamForward.is_derived(destination) else ''
+        key = f"{orientation}-{rendition}{suffix}"
+        if key not in self._encoders:
+            target = Destination(destination.platform, destination.orientation,
+                                 self.relay.url(WARM_STREAM_APP), key)
+            encoder = Forwarder(ForwardJob(orientation, [target], FORWARD_MODE_SINGLE,
+                                           label=f"{orientation}:{rendition}{suffix} encode"))
+            self._encoders[key] = encoder
+            self._add(encoder)
+        return f"{WARM_STREAM_APP}/{key}"
+
+    async def attach(self, destination: Destination) -> None:
+        """Start forwarding to a destination as soon as its URL and key are known."""
+        orientation = streamForward.input_orientation(destination)
+        if orientation not in self._warmups:
+            await self.prewarm([destination])
+        source = await self._current_source(orientation)
+        if self._can_push(destination, source):
+            await self._push([destination], {orientation: source})
+            return
+        streamForward.describe_plan(ForwardJob(orientation, [destination], FORWARD_MODE_SINGLE), source)
+
+        if self._is_adaptive(destination, source):
+            forwarder = AdaptiveForwarder(destination, self.relay)
+        elif self._needs_shared_encode(destination, source):
+            stream_name = self._shared_encoder(destination)
+            forwarder = Forwarder(ForwardJob(orientation, [destination], FORWARD_MODE_SINGLE,
+                                             input_url=self.relay.url(stream_name), copy=True))
+        else:
+            forwarder = Forwarder(ForwardJob(orientation, [destination], FORWARD_MODE_SINGLE))
+            forwarder.source = source
+        self._add(forwarder)
+
+    def _start_ingest_monitor(self) -> None:
+        """Watch the inputs through the relay, or nginx's stat page without it."""
+        if self.ingest or not ENABLE_INGEST_MONITOR or not (self.relay or INGEST_STAT_URL):
+            return
+        self.ingest = IngestMonitor(self.relay)
+        self.ingest.start()
+
+    def _add(self, forwarder) -> None:
+        forwarder.ingest = self.ingest
+        self.forwarders.append(forwarder)
+        self.rebalance_cpus()
+        forwarder.start()
+
+    def rebalance_cpus(self) -> None:
+        """Give every forwarder its share of the cores left over for encoding."""
+        if not ENABLE_CPU_BUDGET:
+            return
+        counts = [forwarder.encoder_count() for forwarder in self.forwarders]
+        budget = streamForward.plan_cpu_budget(counts)
+        for forwarder, count, (cpus, threads) in zip(self.forwarders, counts, budget):
+            forwarder.apply_cpu_budget(cpus, threads)
+            if count:
+                logger.info(f"{forwarder.name}: {count} encoder(s) on cores {cpus}, "
+                            f"{threads} thread(s) each")
+
+    async def stop(self) -> None:
+        """Terminate every forwarder concurrently, then close the relay."""
+        for warmup in self._warmups.values():
+            warmup.cancel()
+        await asyncio.gather(*(forwarder.stop() for forwarder in self.forwarders))
+        if self.slate:
+            await self.slate.stop()
+            self.slate = None
+        if self.ingest:
+            await self.ingest.stop()
+            self.ingest = None
+        if self.pushed:
+            # Don't leave nginx pushing to this show's keys
+            try:
+                await asyncio.to_thread(nginxPush.apply_push_config, [])
+            except NginxPushError as e:
+                logger.error(f"Could not remove the nginx pushes: {str(e)}")
+            self.pushed = []
+        if self.relay:
+            await self.relay.stop()
+            self.relay = None
+
+    def stop_threadsafe(self) -> None:
+        """Stop every forwarder from a thread other than the event loop's."""
+        if not self.loop or self.loop.is_closed():
+            return
+        future = asyncio.run_coroutine_threadsafe(self.stop(), self.loop)
+        future.result(FORWARDER_STOP_TIMEOUT * 2)
+
+    def destination_states(self) -> Dict[str, str]:
+        """State of every destination, keyed by platform."""
+        states = {destination.platform: FORWARDER_PUSHED for destination in self.pushed}
+        for forwarder in self.forwarders:
+            states.update(forwarder.destination_states())
+        return states
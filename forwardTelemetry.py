@@ -0,0 +1,186 @@
+import os
+import time
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import (
+    Optional,
+    List,
+    Dict
+)
+from constants import (
+    TELEMETRY_WINDOW_SIZE, REALTIME_SPEED, BEHIND_SPEED_SECONDS, BEHIND_SPEED_TOLERANCE,
+    FORWARDER_LOG_LINES
+)
+
+@dataclass
+class ProgressSample:
+    """One block of ffmpeg -progress output"""
+    frame: int
+    fps: float
+    bitrate_kbps: Optional[float]
+    total_size: int
+    out_time_us: Optional[int]
+    dup_frames: int
+    drop_frames: int
+    speed: Optional[float]
+    received_at: float
+
+def _parse_int(value: Optional[str]) -> Optional[int]:
+    """Parse an integer field, None for N/A or missing."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def _parse_float(value: Optional[str], suffix: str = '') -> Optional[float]:
+    """Parse a float field with an optional unit suffix, None for N/A or missing."""
+    if value is None:
+        return None
+    value = value.strip()
+    if suffix and value.endswith(suffix):
+        value = value[:-len(suffix)]
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+def _build_sample(fields: Dict[str, str]) -> ProgressSample:
+    """Convert the key=value pairs of one progress block into a sample."""
+    return ProgressSample(
+        frame=_parse_int(fields.get('frame')) or 0,
+        fps=_parse_float(fields.get('fps')) or 0.0,
+        bitrate_kbps=_parse_float(fields.get('bitrate'), 'kbits/s'),
+        total_size=_parse_int(fields.get('total_size')) or 0,
+        out_time_us=_parse_int(fields.get('out_time_us')),
+        dup_frames=_parse_int(fields.get('dup_frames')) or 0,
+        drop_frames=_parse_int(fields.get('drop_frames')) or 0,
+        speed=_parse_float(fields.get('speed'), 'x'),
+        received_at=time.monotonic()
+    )
+
+class ProgressParser:
+    """Incremental parser for the key=value stream written by -progress"""
+
+    def __init__(self):
+        self._fields: Dict[str, str] = {}
+
+    def feed(self, line: str) -> Optional[ProgressSample]:
+        """Consume one line, returning a sample when a block is complete."""
+        key, sep, value = line.strip().partition('=')
+        if not sep:
+            return None
+        # Every block ends with progress=continue or progress=end
+        if key != 'progress':
+            self._fields[key] = value
+            return None
+        sample = _build_sample(self._fields)
+        self._fields = {}
+        return sample
+
+class ProgressWindow:
+    """Rolling window of the most recent progress samples of one forwarder"""
+
+    def __init__(self, size: int = TELEMETRY_WINDOW_SIZE):
+        self.samples = deque(maxlen=size)
+
+    def add(self, sample: ProgressSample) -> None:
+        self.samples.append(sample)
+
+    def clear(self) -> None:
+        self.samples.clear()
+
+    @property
+    def latest(self) -> Optional[ProgressSample]:
+        return self.samples[-1] if self.samples else None
+
+    def average_speed(self) -> Optional[float]:
+        """Mean encode speed over the window, 1.0 being real time."""
+        speeds = [s.speed for s in self.samples if s.speed is not None]
+        return sum(speeds) / len(speeds) if speeds else None
+
+    def recent_speed(self, seconds: float) -> Optional[float]:
+        """
+        Speed over roughly the last few seconds, from out_time progress.
+
+        ffmpeg's own speed field averages over the whole run and reacts
+        slowly, so this compares output time with wall time instead.
+        """
+        samples = [s for s in self.samples if s.out_time_us is not None]
+        if len(samples) < 2:
+            return None
+        newest = samples[-1]
+        oldest = next((s for s in samples if newest.received_at - s.received_at <= seconds), newest)
+        elapsed = newest.received_at - oldest.received_at
+        if elapsed <= 0:
+            return None
+        return (newest.out_time_us - oldest.out_time_us) / 1e6 / elapsed
+
+    def dropped_in_window(self) -> int:
+        """Frames dropped between the oldest and newest sample."""
+        if len(self.samples) < 2:
+            return 0
+        return self.samples[-1].drop_frames - self.samples[0].drop_frames
+
+    def duplicated_in_window(self) -> int:
+        """Frames duplicated between the oldest and newest sample."""
+        if len(self.samples) < 2:
+            return 0
+        return self.samples[-1].dup_frames - self.samples[0].dup_frames
+
+    def is_behind(self, seconds: float = BEHIND_SPEED_SECONDS) -> bool:
+        """Whether the encoder has run below real time over the last seconds."""
+        speed = self.recent_speed(seconds)
+        return speed is not None and speed < REALTIME_SPEED - BEHIND_SPEED_TOLERANCE
+
+class OutputRing:
+    """Fixed-size buffer of the most recent lines a process wrote"""
+
+    def __init__(self, size: int = FORWARDER_LOG_LINES):
+        self.lines = deque(maxlen=size)
+        self.total_lines = 0
+        self._lock = threading.Lock()
+
+    def append(self, line: str) -> None:
+        with self._lock:
+            self.lines.append(line)
+            self.total_lines += 1
+
+    def tail(self, count: Optional[int] = None) -> List[str]:
+        """Return the last count lines, or everything still buffered."""
+        with self._lock:
+            lines = list(self.lines)
+        return lines[-count:] if count else lines
+
+def read_cpu_seconds(pid: int) -> Optional[float]:
+    """User plus system CPU time of a process from /proc, None where unavailable."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            stat = f.read()
+    except OSError:
+        return None
+    # The command name may contain spaces, so count fields after its closing paren
+    fields = stat[stat.rindex(')') + 2:].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+class CpuMeter:
+    """CPU usage of one process between consecutive samples"""
+
+    def __init__(self):
+        self.percent: Optional[float] = None  # 100 is one full core
+        self._last: Optional[tuple] = None
+
+    def reset(self) -> None:
+        self.percent = None
+        self._last = None
+
+    def sample(self, pid: int, now: Optional[float] = None) -> Optional[float]:
+        """Read the process's CPU time and update percent from the previous reading."""
+        cpu_seconds = read_cpu_seconds(pid)
+        if cpu_seconds is None:
+            return None
+        now = time.monotonic() if now is None else now
+        if self._last and now > self._last[0]:
+            self.percent = 100 * (cpu_seconds - self._last[1]) / (now - self._last[0])
+        self._last = (now, cpu_seconds)
+        return self.percent
@@ -0,0 +1,56 @@
+import os
+import subprocess
+import time
+from dataclasses import dataclass
+from typing import Optional
+import ffmpeg
+from forwardTelemetry import ProgressParser, ProgressWindow
+from constants import FORWARDER_STOP_TIMEOUT
+
+@dataclass
+class ProcessUsage:
+    """Resources a finished child process used, as reported by wait4"""
+    cpu_seconds: float
+    max_rss_kb: int
+
+def spawn(stream, stdout=subprocess.DEVNULL) -> subprocess.Popen:
+    """Start an ffmpeg graph with its log silenced."""
+    args = ffmpeg.compile(
+        stream.global_args('-hide_banner', '-loglevel', 'error'),
+        overwrite_output=True
+    )
+    return subprocess.Popen(args, stdin=subprocess.DEVNULL, stdout=stdout,
+                            stderr=subprocess.DEVNULL)
+
+def stop_process(process: subprocess.Popen) -> None:
+    """Terminate a child, killing it if it hangs."""
+    process.terminate()
+    try:
+        process.wait(timeout=FORWARDER_STOP_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+def read_progress(process: subprocess.Popen, window: ProgressWindow) -> None:
+    """Collect a forwarder's progress samples."""
+    parser = ProgressParser()
+    for raw_line in iter(process.stdout.readline, b''):
+        sample = parser.feed(raw_line.decode(errors='replace'))
+        if sample:
+            window.add(sample)
+
+def reap(process: subprocess.Popen) -> ProcessUsage:
+    """Wait for a child and return its resource usage, killing it if it hangs."""
+    deadline = time.monotonic() + FORWARDER_STOP_TIMEOUT
+    while True:
+        pid, status, usage = os.wait4(process.pid, os.WNOHANG)
+        if pid:
+            process.returncode = os.waitstatus_to_exitcode(status)
+            return ProcessUsage(usage.ru_utime + usage.ru_stime, usage.ru_maxrss)
+        if time.monotonic() > deadline:
+            process.kill()
+            deadline = float('inf')
+        time.sleep(0.05)
+
+def format_optional(value: Optional[float], template: str) -> str:
+    return template.format(value) if value is not None else 'N/A'
@@ -0,0 +1,197 @@
+import asyncio
+import logging
+import time
+import urllib.error
+import urllib.request
+import xml.etree.ElementTree as ElementTree
+from dataclasses import dataclass
+from typing import (
+    Optional,
+    Dict
+)
+from rtmpRelay import RtmpRelay
+from constants import (
+    INGEST_STAT_URL, INGEST_POLL_INTERVAL, INGEST_STALL_SECONDS, INGEST_STAT_TIMEOUT,
+    NGINX_PUSH_APP, SLATE_QUERY
+)
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class IngestStats:
+    """What one input is receiving from OBS"""
+    name: str  # Orientation, the stream name OBS publishes under
+    publishing: bool  # OBS is connected and publishing, not the slate
+    bitrate_kbps: Optional[float]
+    fps: Optional[float]
+    clients: int  # Forwarders and other players reading the input
+    uptime_seconds: Optional[float]
+    bytes_in: int = 0
+    received_at: Optional[float] = None  # Monotonic time media was last seen arriving
+
+def _child_text(element: ElementTree.Element, path: str) -> Optional[str]:
+    child = element.find(path)
+    return child.text if child is not None and child.text else None
+
+def _child_number(element: ElementTree.Element, path: str) -> Optional[float]:
+    text = _child_text(element, path)
+    try:
+        return float(text) if text is not None else None
+    except ValueError:
+        return None
+
+def parse_nginx_stat(xml_text: str, app: str = NGINX_PUSH_APP) -> Dict[str, IngestStats]:
+    """
+    Streams of one application in nginx-rtmp's /stat XML, keyed by name.
+
+    nginx reports the incoming bandwidth itself; the frame rate is the
+    one OBS put in its metadata. Raises ElementTree.ParseError on
+    malformed XML.
+    """
+    root = ElementTree.fromstring(xml_text)
+    streams = {}
+    for application in root.iter('application'):
+        if _child_text(application, 'name') != app:
+            continue
+        for stream in application.iter('stream'):
+            name = _child_text(stream, 'name')
+            if not name:
+                continue
+            bandwidth = _child_number(stream, 'bw_in')
+            uptime_ms = _child_number(stream, 'time')
+            players = [client for client in stream.findall('client')
+                       if client.find('publishing') is None]
+            streams[name] = IngestStats(
+                name=name,
+                publishing=stream.find('publishing') is not None,
+                bitrate_kbps=bandwidth / 1000 if bandwidth is not None else None,
+                fps=_child_number(stream, 'meta/video/frame_rate'),
+                clients=len(players),
+                uptime_seconds=uptime_ms / 1000 if uptime_ms is not None else None,
+                bytes_in=int(_child_number(stream, 'bytes_in') or 0)
+            )
+    return streams
+
+class IngestMonitor:
+    """
+    Polls what OBS is delivering to each input, from the relay or nginx-rtmp.
+
+    With the built-in relay the counts come straight from its streams.
+    Otherwise nginx-rtmp's stat page is read, if INGEST_STAT_URL is set.
+    receiving() is what tells "OBS stopped sending" apart from "the
+    forwarder died".
+    """
+
+    def __init__(self, relay: Optional[RtmpRelay] = None, stat_url: Optional[str] = INGEST_STAT_URL):
+        self.relay = relay
+        self.stat_url = stat_url
+        self.inputs: Dict[str, IngestStats] = {}
+        self.available = False  # Whether the last poll got an answer
+        self._counters: Dict[str, tuple] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run(), name="ingest monitor")
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            if self.relay:
+                self._poll_relay()
+            elif self.stat_url:
+                await self._poll_nginx()
+            await asyncio.sleep(INGEST_POLL_INTERVAL)
+
+    def _rates(self, name: str, now: float, bytes_in: float, frames: Optional[int]) -> tuple:
+        """Bitrate and frame rate since the previous poll, None on the first."""
+        previous = self._counters.get(name)
+        self._counters[name] = (now, bytes_in, frames)
+        if not previous or now <= previous[0] or bytes_in < previous[1]:
+            return None, None
+        elapsed = now - previous[0]
+        bitrate_kbps = (bytes_in - previous[1]) * 8 / elapsed / 1000
+        fps = (frames - previous[2]) / elapsed if frames is not None and previous[2] is not None else None
+        return bitrate_kbps, fps
+
+    def _poll_relay(self) -> None:
+        now = time.monotonic()
+        inputs = {}
+        for stream_name, stream in self.relay.streams.items():
+            app, _, name = stream_name.partition('/')
+            if app != 'live':
+                continue
+            bitrate_kbps, fps = self._rates(name, now, stream.bytes, stream.video_frames)
+            publisher = stream.publisher
+            inputs[name] = IngestStats(
+                name=name,
+                publishing=publisher is not None and publisher.query != SLATE_QUERY,
+                bitrate_kbps=bitrate_kbps,
+                fps=fps,
+                clients=len(stream.subscribers),
+                uptime_seconds=now - stream.published_at if stream.published_at else None,
+                bytes_in=stream.bytes,
+                received_at=stream.received_at
+            )
+        self.inputs = inputs
+        self.available = True
+
+    def _fetch_stat(self) -> str:
+        with urllib.request.urlopen(self.stat_url, timeout=INGEST_STAT_TIMEOUT) as response:
+            return response.read().decode(errors='replace')
+
+    async def _poll_nginx(self) -> None:
+        try:
+            streams = parse_nginx_stat(await asyncio.to_thread(self._fetch_stat))
+        except (urllib.error.URLError, OSError, ElementTree.ParseError) as e:
+            if self.available:
+                logger.warning(f"Could not read {self.stat_url}: {str(e)}")
+            self.available = False
+            return
+
+        now = time.monotonic()
+        for name, stats in streams.items():
+            previous = self._counters.get(name)
+            # nginx has no arrival time, so note when bytes_in last grew
+            grew = previous is None or stats.bytes_in > previous[1]
+            stats.received_at = now if grew else self.inputs.get(name, stats).received_at
+            self._counters[name] = (now, stats.bytes_in, None)
+        self.inputs = streams
+        self.available = True
+
+    def receiving(self, name: str) -> Optional[bool]:
+        """
+        Whether media reached an input within INGEST_STALL_SECONDS.
+
+        None when there is nothing to go on, i.e. the stat page could not
+        be read; an input that is not published at all is not receiving.
+        """
+        if not self.available:
+            return None
+        stats = self.inputs.get(name)
+        if stats is None or stats.received_at is None:
+            return False
+        return time.monotonic() - stats.received_at <= INGEST_STALL_SECONDS
+
+    def describe(self) -> str:
+        """One-line summary of every input for the status header."""
+        if not self.available:
+            return "Ingest: no statistics"
+        parts = []
+        for name, stats in sorted(self.inputs.items()):
+            if not stats.publishing:
+                parts.append(f"{name} not sending")
+                continue
+            bitrate = f"{stats.bitrate_kbps:.0f}kbps" if stats.bitrate_kbps is not None else "N/A"
+            fps = f"{stats.fps:.0f}fps" if stats.fps is not None else "N/A"
+            uptime = time.strftime('%H:%M:%S', time.gmtime(stats.uptime_seconds or 0))
+            state = "" if self.receiving(name) else " stalled"
+            parts.append(f"{name} {bitrate} {fps} {stats.clients} clients up {uptime}{state}")
+        return "Ingest: " + (" | ".join(parts) if parts else "waiting for OBS")
@@ -0,0 +1,121 @@
+import logging
+import os
+import struct
+from dataclasses import dataclass
+from typing import (
+    Optional,
+    List
+)
+import ffmpeg
+from rtmpRelay import RelayStream, amf_decode
+from constants import (
+    VIDEO_CODEC, AUDIO_CODEC, AUDIO_BITRATE, SLATE_DIR, SLATE_IMAGE, SLATE_TEXT,
+    SLATE_COLOR, SLATE_CLIP_SECONDS, SLATE_VIDEO_BITRATE, SLATE_FALLBACK_SIZE,
+    SLATE_FALLBACK_FPS, SLATE_SAMPLE_RATE
+)
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class SlateFormat:
+    """Size, frame rate and sample rate a slate is encoded at to match its source"""
+    width: int
+    height: int
+    fps: float
+    sample_rate: int
+
+    @property
+    def name(self) -> str:
+        return f"{self.width}x{self.height}-{self.fps:g}fps-{self.sample_rate}"
+
+def _even(value) -> int:
+    return max(2, int(value) // 2 * 2)
+
+def source_format(stream: RelayStream) -> SlateFormat:
+    """
+    Format of a relay stream's publisher, read from its onMetaData.
+
+    Matching it keeps re-encoding forwarders from reconfiguring when the
+    slate takes over. Anything the publisher left out falls back to the
+    SLATE_FALLBACK_* settings.
+    """
+    properties = {}
+    if stream.metadata:
+        try:
+            values = amf_decode(stream.metadata.payload)
+        except (ValueError, IndexError, struct.error):
+            values = []
+        properties = next((value for value in values if isinstance(value, dict)), {})
+    width, _, height = SLATE_FALLBACK_SIZE.partition('x')
+    if properties.get('width') and properties.get('height'):
+        width, height = properties['width'], properties['height']
+    return SlateFormat(
+        width=_even(width),
+        height=_even(height),
+        fps=float(properties.get('framerate') or SLATE_FALLBACK_FPS),
+        sample_rate=int(properties.get('audiosamplerate') or SLATE_SAMPLE_RATE)
+    )
+
+def slate_path(slate_format: SlateFormat, slate_dir: str = SLATE_DIR) -> str:
+    return os.path.join(slate_dir, f"slate-{slate_format.name}.flv")
+
+def _slate_video(slate_format: SlateFormat, text: str):
+    """Still picture, or a plain frame, at the slate's size with optional text."""
+    width, height, rate = slate_format.width, slate_format.height, f"{slate_format.fps:g}"
+    if SLATE_IMAGE:
+        video = (
+            ffmpeg.input(SLATE_IMAGE, loop=1, framerate=rate)
+            .filter('scale', width, height, force_original_aspect_ratio='decrease')
+            .filter('pad', width, height, '(ow-iw)/2', '(oh-ih)/2', color=SLATE_COLOR)
+            .filter('setsar', 1)
+        )
+    else:
+        video = ffmpeg.input(f"color=c={SLATE_COLOR}:size={width}x{height}:rate={rate}", f='lavfi')
+    if text:
+        video = video.filter('drawtext', text=text, fontcolor='white', fontsize='h/12',
+                             x='(w-tw)/2', y='(h-th)/2')
+    return video
+
+def render_slate(slate_format: SlateFormat, slate_dir: str = SLATE_DIR) -> str:
+    """
+    Pre-encode the slate clip for a format and return its path.
+
+    Each format is only rendered once. The clip has a keyframe every
+    second and silent audio, so it loops with stream copy. Text is left
+    out if this ffmpeg has no drawtext. Raises ffmpeg.Error if the clip
+    cannot be encoded at all.
+    """
+    path = slate_path(slate_format, slate_dir)
+    if os.path.exists(path):
+        return path
+    os.makedirs(slate_dir, exist_ok=True)
+    partial_path = f"{path}.part"
+    audio = ffmpeg.input(f"anullsrc=r={slate_format.sample_rate}:cl=stereo", f='lavfi')
+    texts: List[Optional[str]] = [SLATE_TEXT, None] if SLATE_TEXT else [None]
+    for text in texts:
+        try:
+            (
+                ffmpeg.output(_slate_video(slate_format, text), audio, partial_path,
+                              t=SLATE_CLIP_SECONDS, format='flv', vcodec=VIDEO_CODEC,
+                              preset='veryfast', pix_fmt='yuv420p', g=max(1, round(slate_format.fps)),
+                              video_bitrate=SLATE_VIDEO_BITRATE, acodec=AUDIO_CODEC,
+                              audio_bitrate=AUDIO_BITRATE)
+                .run(quiet=True, overwrite_output=True)
+            )
+            break
+        except ffmpeg.Error:
+            if text is None:
+                raise
+            logger.warning("Could not draw the slate text, rendering the slate without it")
+    os.replace(partial_path, path)
+    logger.info(f"Rendered slate {path}")
+    return path
+
+def slate_command(path: str, url: str) -> List[str]:
+    """ffmpeg arguments that publish a slate clip to url in a loop, in real time."""
+    stream = (
+        ffmpeg.input(path, re=None, stream_loop=-1)
+        .output(url, c='copy', format='flv')
+        .global_args('-hide_banner', '-loglevel', 'error')
+    )
+    return ffmpeg.compile(stream, overwrite_output=True)
@@ -2,7 +2,7 @@ import logging
 from instagrapi import Client
 import streamForward
 from constants import (
-    PORTRAIT_MODE
+    PORTRAIT_MODE, PLATFORM_INSTAGRAM
 )
 
 def setup_instagram_stream(creds, title):
@@ -18,6 +18,7 @@ def setup_instagram_stream(creds, title):
     url = response['upload_url'][:response['upload_url'].find('/rtmp/') + 6]
     stream_key = response['upload_url'][response['upload_url'].find('/rtmp/') + 6:]
 
-    process = streamForward.forward_stream(PORTRAIT_MODE, url, stream_key)
+    destination = streamForward.Destination(
+        PLATFORM_INSTAGRAM, PORTRAIT_MODE, url, stream_key)
     client.username=response['broadcast_id']
-    return client, process
+    return client, destination
@@ -1,7 +1,7 @@
 import asyncio
 import streamForward
 from kick import Client, Credentials
-from constants import RTMPS_PREFIX, APP_PATH, STREAM_MODE
+from constants import RTMPS_PREFIX, APP_PATH, STREAM_MODE, PLATFORM_KICK
 import logging
 
 
@@ -24,13 +24,13 @@ async def setup_kick_stream(creds, title, game=None):
     # stream title/category. You may need to extend this once that
     # functionality is documented
     # Get category search query
-    search_query = game if game else input("Please enter a Kick category: ")
+    search_query = game if game else await asyncio.to_thread(input, "Please enter a Kick category: ")
 
     while True:
         try:
             category_data = await client.search_categories(search_query)
             if not category_data.hits:
-                search_query = input("No categories found. Enter another category: ")
+                search_query = await asyncio.to_thread(input, "No categories found. Enter another category: ")
                 continue
 
             # Display up to 5 categories
@@ -40,7 +40,7 @@ async def setup_kick_stream(creds, title, game=None):
                 print(f"{i}. {doc.name}")
 
             try:
-                selection = input(f"Select a category (1-{max_display}): ")
+                selection = await asyncio.to_thread(input, f"Select a category (1-{max_display}): ")
                 selection_idx = int(selection) - 1
 
                 if 0 <= selection_idx < max_display:
@@ -53,7 +53,7 @@ async def setup_kick_stream(creds, title, game=None):
 
         except Exception as e:
             print(f"Search error: {e}")
-            search_query = input("Enter another category: ")
+            search_query = await asyncio.to_thread(input, "Enter another category: ")
 
     await client.set_stream_info(
         title,
@@ -65,6 +65,7 @@ async def setup_kick_stream(creds, title, game=None):
     streamInfo = await client.fetch_stream_url_and_key()
     url = streamInfo.stream_url
     key = streamInfo.stream_key
-    process = streamForward.forward_stream(STREAM_MODE, f"rtmps://{url}/app/", key)
-    return client, process
+    destination = streamForward.Destination(
+        PLATFORM_KICK, STREAM_MODE, f"rtmps://{url}/app/", key)
+    return client, destination
 
@@ -0,0 +1,165 @@
+import argparse
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from typing import (
+    List,
+    Dict
+)
+import ffmpeg
+import streamForward
+from streamForward import Destination
+from harnessTools import spawn, stop_process
+from constants import (
+    FORWARD_MODE, FORWARD_MODE_SINGLE, FORWARD_MODE_TEE, LATENCY_PROFILE,
+    LATENCY_PROFILES, VIDEO_CODEC, AUDIO_CODEC, AUDIO_BITRATE,
+    LATENCY_METER_DURATION, LATENCY_METER_WARMUP,
+    LATENCY_METER_PLATFORM, LATENCY_METER_SIZE, LATENCY_METER_FPS,
+    LATENCY_METER_PORT, LATENCY_STAMP_BITS, LATENCY_STAMP_BLOCK
+)
+
+STAMP_WIDTH = LATENCY_STAMP_BITS * LATENCY_STAMP_BLOCK
+STAMP_FRAME_BYTES = STAMP_WIDTH * LATENCY_STAMP_BLOCK
+
+def _stamp_expression() -> str:
+    """geq expression drawing the frame number as a row of black/white blocks."""
+    return f"255*mod(floor(N/pow(2,floor(X/{LATENCY_STAMP_BLOCK}))),2)"
+
+def _crop_stamp(video):
+    """Cut the stamp row out of a frame as 8-bit gray."""
+    return video.crop(0, 0, STAMP_WIDTH, LATENCY_STAMP_BLOCK).filter('format', 'gray')
+
+def decode_stamp(frame: bytes) -> int:
+    """Read the frame number back from a gray stamp row, sampling each block's centre."""
+    centre = LATENCY_STAMP_BLOCK // 2
+    row = centre * STAMP_WIDTH
+    number = 0
+    for bit in range(LATENCY_STAMP_BITS):
+        if frame[row + bit * LATENCY_STAMP_BLOCK + centre] > 127:
+            number |= 1 << bit
+    return number
+
+def start_publisher(url: str) -> subprocess.Popen:
+    """
+    Serve a stamped test pattern at url, standing in for OBS.
+
+    The stamp row of every frame is also written raw to stdout the
+    moment it is produced, which is the ingest time of that frame.
+    """
+    fps = LATENCY_METER_FPS
+    video = ffmpeg.input(f"testsrc2=size={LATENCY_METER_SIZE}:rate={fps}", f='lavfi', re=None)
+    audio = ffmpeg.input("sine=frequency=440:sample_rate=48000", f='lavfi', re=None)
+    stamp = (
+        ffmpeg.input(f"color=c=black:size={STAMP_WIDTH}x{LATENCY_STAMP_BLOCK}:rate={fps}",
+                     f='lavfi', re=None)
+        .filter('format', 'gray')
+        .filter('geq', lum=_stamp_expression())
+    )
+    split = video.overlay(stamp, x=0, y=0).filter_multi_output('split', 2)
+    published = ffmpeg.output(
+        split.stream(0), audio, url,
+        vcodec=VIDEO_CODEC,
+        preset='veryfast',
+        tune='zerolatency',
+        g=fps,
+        pix_fmt='yuv420p',
+        acodec=AUDIO_CODEC,
+        audio_bitrate=AUDIO_BITRATE,
+        format='flv',
+        listen=1
+    )
+    ingest = ffmpeg.output(_crop_stamp(split.stream(1)), 'pipe:1', format='rawvideo')
+    return spawn(ffmpeg.merge_outputs(published, ingest), stdout=subprocess.PIPE)
+
+def start_sink(url: str) -> subprocess.Popen:
+    """Receive the forwarded stream at url and decode the stamp rows to stdout."""
+    stream = ffmpeg.input(url, f='flv', listen=1, fflags='nobuffer', flags='low_delay')
+    return spawn(ffmpeg.output(_crop_stamp(stream.video), 'pipe:1', format='rawvideo'),
+                  stdout=subprocess.PIPE)
+
+def _read_stamps(process: subprocess.Popen, arrivals: Dict[int, float]) -> None:
+    """Record when each stamped frame came out of a process."""
+    while True:
+        frame = process.stdout.read(STAMP_FRAME_BYTES)
+        if len(frame) < STAMP_FRAME_BYTES:
+            return
+        arrivals.setdefault(decode_stamp(frame), time.time())
+
+def measure(latency: str = LATENCY_PROFILE, mode=FORWARD_MODE,
+            platform: str = LATENCY_METER_PLATFORM,
+            duration: float = LATENCY_METER_DURATION,
+            warmup: float = LATENCY_METER_WARMUP) -> List[float]:
+    """
+    Forward a stamped stream through one forwarder and return the
+    ingest-to-sink delay of every frame seen after the warm-up, in seconds.
+    """
+    ingest_url = f"rtmp://127.0.0.1:{LATENCY_METER_PORT}/live/landscape"
+    sink_url = f"rtmp://127.0.0.1:{LATENCY_METER_PORT + 1}/live/"
+    destination = Destination(platform, 'landscape', sink_url, 'sink')
+    job = streamForward.plan_jobs([destination], mode)[0]
+    job.input_url = ingest_url
+    job.latency = latency
+
+    ingested: Dict[int, float] = {}
+    received: Dict[int, float] = {}
+    sink = start_sink(destination.output_url)
+    publisher = start_publisher(ingest_url)
+    readers = [threading.Thread(target=_read_stamps, args=args, daemon=True)
+               for args in ((publisher, ingested), (sink, received))]
+    for reader in readers:
+        reader.start()
+
+    time.sleep(1)  # Let both listeners bind before the forwarder connects
+    forwarder = subprocess.Popen(streamForward.job_command(job), stdin=subprocess.DEVNULL,
+                                 stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        time.sleep(warmup)
+        first_measured = max(received, default=-1) + 1
+        time.sleep(duration)
+    finally:
+        for process in (forwarder, publisher, sink):
+            stop_process(process)
+
+    return [received[n] - ingested[n] for n in sorted(received)
+            if n >= first_measured and n in ingested]
+
+def _percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def main():
+    """
+    Measure the delay a forwarder adds between ingest and a local sink.
+    Usage: python latencyMeter.py [--latency low] [--mode tee] [--platform kick]
+    """
+    parser = argparse.ArgumentParser(description="Glass-to-glass latency meter")
+    parser.add_argument('--latency', default=LATENCY_PROFILE, choices=list(LATENCY_PROFILES),
+                        help="Latency profile to forward with")
+    parser.add_argument('--mode', default=FORWARD_MODE,
+                        choices=[FORWARD_MODE_SINGLE, FORWARD_MODE_TEE])
+    parser.add_argument('--platform', default=LATENCY_METER_PLATFORM,
+                        help="Platform whose rendition is encoded")
+    parser.add_argument('--duration', type=float, default=LATENCY_METER_DURATION)
+    args = parser.parse_args()
+
+    print(f"Measuring {args.latency} latency profile in {args.mode} mode for {args.duration:.0f}s...")
+    try:
+        delays = measure(args.latency, args.mode, args.platform, args.duration)
+    except KeyboardInterrupt:
+        print("\nMeasurement interrupted by user")
+        sys.exit(1)
+
+    if not delays:
+        print("No stamped frames reached the sink; is ffmpeg able to encode and listen on "
+              f"ports {LATENCY_METER_PORT}-{LATENCY_METER_PORT + 1}?")
+        sys.exit(1)
+
+    ms = [delay * 1000 for delay in delays]
+    print(f"Frames measured: {len(ms)}")
+    print(f"Delay min/median/p95/max: {min(ms):.0f} / {statistics.median(ms):.0f} / "
+          f"{_percentile(ms, 0.95):.0f} / {max(ms):.0f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -14,6 +14,9 @@ import youtubeSetup
 import instaSetup
 from chatManager import ChatManager, ChatMessage
 from chatDisplay import ChatDisplay, create_chat_display
+from forwardSupervisor import ForwardSupervisor
+from platformProfiles import ProfileError, load_profiles
+from streamForward import Destination
 from constants import *
 
 # Silence all logging
@@ -170,38 +173,64 @@ def setup_instagram(creds, title):
     save_creds(creds, "instagram")
     return instaSetup.setup_instagram_stream(creds["instagram"], title)
 
+def expected_destinations(creds):
+    """Destinations the selected platforms will need, before their URLs and keys exist."""
+    return [Destination(platform, orientation, "", "")
+            for platform, orientation in PLATFORM_ORIENTATIONS.items() if platform in creds]
+
 async def setup_platform_streams(creds):
     chat_urls = []
-    forward_processes = []
 
     title = input("Enter stream title: ")
     game = input("Enter Game title (Enter to skip): ")
 
-    if "twitch" in creds:
-        twitch_chat_url = setup_twitch(creds, title, game if game != "" else None)
-        chat_urls.append(twitch_chat_url)
-
-    if any("youtube" in key for key in creds):
-        youtube_urls = setup_youtube(creds, title, game if game != "" else None)
-        if youtube_urls:
-            for url in youtube_urls:
-                chat_urls.append(url)
-
-    if "kick" in creds:
-        kick_url, forward_process = await setup_kick(creds, title, game if game != "" else None)
-        if kick_url:
-            chat_urls.append(kick_url)
-        if forward_process:
-            forward_processes.append(forward_process)
-
-    if "instagram" in creds:
-        insta_url, forward_process = setup_instagram(creds, title)
-        if insta_url:
-            chat_urls.append(insta_url)
-        if forward_process:
-            forward_processes.append(forward_process)
+    # Probe the inputs and start the shared encodes while the platforms
+    # are set up; each destination is attached as soon as it is known
+    supervisor = ForwardSupervisor([])
+    instagram_setup = None
+    try:
+        await supervisor.prewarm(expected_destinations(creds))
+
+        # Instagram setup never prompts, so it runs alongside the others.
+        # Blocking setup calls go to threads to keep the relay serving OBS.
+        if "instagram" in creds:
+            instagram_setup = asyncio.create_task(asyncio.to_thread(setup_instagram, creds, title))
+
+        if "twitch" in creds:
+            twitch_chat_url = await asyncio.to_thread(
+                setup_twitch, creds, title, game if game != "" else None)
+            chat_urls.append(twitch_chat_url)
+
+        if any("youtube" in key for key in creds):
+            youtube_urls, youtube_destinations = await asyncio.to_thread(
+                setup_youtube, creds, title, game if game != "" else None)
+            if youtube_urls:
+                for url in youtube_urls:
+                    chat_urls.append(url)
+            if RESTREAM_YOUTUBE:
+                for destination in youtube_destinations:
+                    await supervisor.attach(destination)
+
+        if "kick" in creds:
+            kick_url, destination = await setup_kick(creds, title, game if game != "" else None)
+            if kick_url:
+                chat_urls.append(kick_url)
+            if destination:
+                await supervisor.attach(destination)
+
+        if instagram_setup:
+            insta_url, destination = await instagram_setup
+            if insta_url:
+                chat_urls.append(insta_url)
+            if destination:
+                await supervisor.attach(destination)
+    except BaseException:
+        if instagram_setup:
+            instagram_setup.cancel()
+        await supervisor.stop()
+        raise
 
-    return chat_urls, forward_processes
+    return chat_urls, supervisor
 
 def signal_handler(sig, frame):
     print("\nShutting down chat display...")
@@ -243,67 +272,71 @@ async def run_chat_manager(creds, chat_sources, chat_display):
 
 async def main():
     try:
+        # Check the platform profiles before anything is set up
+        try:
+            load_profiles()
+        except ProfileError as e:
+            print(f"Invalid platform profiles: {str(e)}")
+            return
+
         # Load credentials and setup streams
         creds = load_credentials()
 
-        # Ensure stream setup completes before continuing
+        # Ensure stream setup completes before continuing; a failed setup stops its own forwarders
         try:
-            chat_urls, forward_processes = await setup_platform_streams(creds)
-            if not chat_urls:
-                print("No chat URLs were returned from stream setup. Exiting...")
-                return
-            print("Stream setup complete")
+            chat_urls, supervisor = await setup_platform_streams(creds)
         except Exception as e:
             print(f"Failed to setup streams: {str(e)}")
             return
 
-        # Initialize chat display with stream processes for monitoring
-        process1 = forward_processes[0] if len(forward_processes) > 0 else None
-        process2 = forward_processes[1] if len(forward_processes) > 1 else None
-        chat_display = create_chat_display(process1, process2)
-        chat_display.start()
-        signal.signal(signal.SIGINT, signal_handler)
-
-        # Start chat manager and wait for all connections to be established
-        chat_manager, connection_tasks = await run_chat_manager(creds, chat_urls, chat_display)
-        if not connection_tasks:
-            print("No chat connections were established. Exiting...")
-            return
-        print("\nChat display initialized.")
-        if forward_processes:
-            print(f"Monitoring {len(forward_processes)} stream processes.")
-        print("Press Ctrl+C to exit.")
-
-        # Wait for connections and keep running
+        # Every way out from here has to stop the relay and the stream processes
         try:
-            while True:
-                await asyncio.sleep(0.1)
-        except KeyboardInterrupt:
-            print("\nShutting down...")
+            if not chat_urls:
+                print("No chat URLs were returned from stream setup. Exiting...")
+                return
+            print("Stream setup complete")
+
+            # Initialize chat display with the forwarder supervisor for monitoring
+            chat_display = create_chat_display(supervisor)
+            chat_display.start()
+            signal.signal(signal.SIGINT, signal_handler)
+
+            try:
+                # Start chat manager and wait for all connections to be established
+                chat_manager, connection_tasks = await run_chat_manager(creds, chat_urls, chat_display)
+                if not connection_tasks:
+                    print("No chat connections were established. Exiting...")
+                    await chat_manager.stop()
+                    return
+                print("\nChat display initialized.")
+                if supervisor.forwarders:
+                    print(f"Monitoring {len(supervisor.forwarders)} stream processes.")
+                print("Press Ctrl+C to exit.")
+
+                # Wait for connections and keep running
+                try:
+                    while True:
+                        await asyncio.sleep(0.1)
+                except KeyboardInterrupt:
+                    print("\nShutting down...")
+                finally:
+                    # Cleanup
+                    await chat_manager.stop()
+
+                    # Cancel any pending tasks
+                    for task in connection_tasks:
+                        if not task.done():
+                            task.cancel()
+                            try:
+                                await task
+                            except asyncio.CancelledError:
+                                pass
+            finally:
+                chat_display.stop()
+                print("Chat display stopped.")
         finally:
-            # Cleanup
-            await chat_manager.stop()
-            chat_display.stop()
-
-            # Terminate any running stream processes
-            for process in forward_processes:
-                if process and process.poll() is None:
-                    try:
-                        process.terminate()
-                        process.wait(timeout=5)  # Wait up to 5 seconds for graceful shutdown
-                    except:
-                        process.kill()  # Force kill if graceful shutdown fails
-
-            # Cancel any pending tasks
-            for task in connection_tasks:
-                if not task.done():
-                    task.cancel()
-                    try:
-                        await task
-                    except asyncio.CancelledError:
-                        pass
-
-            print("Chat display stopped.")
+            # Terminate every stream process at once
+            await supervisor.stop()
 
     except Exception as e:
         print(f"Error in main: {str(e)}")
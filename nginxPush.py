@@ -0,0 +1,175 @@
+import argparse
+import os
+import re
+import subprocess
+import sys
+import urllib.error
+import urllib.parse
+import urllib.request
+from typing import (
+    Optional,
+    List
+)
+import streamForward
+from streamForward import Destination, SourceInfo
+from constants import (
+    NGINX_PUSH_CONFIG, NGINX_PUSH_APP, NGINX_TEST_COMMAND, NGINX_RELOAD_COMMAND,
+    NGINX_CONTROL_URL, NGINX_COMMAND_TIMEOUT
+)
+
+# Characters that would end or escape an nginx directive argument
+UNSAFE_CHARACTERS = re.compile(r'[\s;{}"\'\\#$]')
+STREAM_NAME = re.compile(r'^[A-Za-z0-9_-]+$')
+
+class NginxPushError(RuntimeError):
+    """The push configuration is invalid or nginx would not load it"""
+
+def validate_destination(destination: Destination) -> List[str]:
+    """Every reason nginx-rtmp could not push to a destination."""
+    errors = []
+    label = destination.platform
+    parsed = urllib.parse.urlsplit(destination.url)
+    if parsed.scheme != 'rtmp':
+        # nginx-rtmp has no TLS client, rtmps needs a forwarder
+        errors.append(f"{label}: nginx-rtmp can only push to rtmp:// URLs, not {parsed.scheme or 'none'}")
+    if not parsed.hostname:
+        errors.append(f"{label}: URL has no host")
+    if not parsed.path.strip('/'):
+        errors.append(f"{label}: URL has no application")
+    if not destination.key:
+        errors.append(f"{label}: stream key is empty")
+    for field, value in (('URL', destination.url), ('stream key', destination.key)):
+        if UNSAFE_CHARACTERS.search(value):
+            errors.append(f"{label}: {field} contains characters nginx cannot take")
+    if not STREAM_NAME.match(destination.orientation):
+        errors.append(f"{label}: orientation {destination.orientation!r} is not a stream name")
+    return errors
+
+def is_pushable(destination: Destination, source: Optional[SourceInfo]) -> bool:
+    """Whether nginx can push the source to a destination unchanged."""
+    return (not streamForward.is_derived(destination)
+            and streamForward.can_passthrough(source, destination.platform)
+            and not validate_destination(destination))
+
+def push_directive(destination: Destination) -> str:
+    """push line binding the orientation's local stream to one destination."""
+    url = destination.url.rstrip('/')
+    return f"push {url} name={destination.orientation} playPath={destination.key};"
+
+def render_push_config(destinations: List[Destination], app: str = NGINX_PUSH_APP) -> str:
+    """
+    Build the application block OBS publishes to, with a push per destination.
+
+    Raises NginxPushError listing every problem, including a destination
+    being pushed twice.
+    """
+    errors = []
+    for destination in destinations:
+        errors += validate_destination(destination)
+    urls = [destination.output_url for destination in destinations]
+    errors += [f"{url.rsplit('/', 1)[0]}: pushed more than once"
+               for url in sorted(set(urls)) if urls.count(url) > 1]
+    if errors:
+        raise NginxPushError('; '.join(errors))
+
+    lines = [
+        "# Written by nginxPush.py; include it inside the rtmp server block",
+        f"application {app} {{",
+        "    live on;",
+        "    record off;",
+    ]
+    for destination in destinations:
+        lines.append(f"    # {destination.platform}")
+        lines.append(f"    {push_directive(destination)}")
+    lines.append("}")
+    return '\n'.join(lines) + '\n'
+
+def _run(command: List[str]) -> None:
+    try:
+        result = subprocess.run(command, capture_output=True, text=True, timeout=NGINX_COMMAND_TIMEOUT)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        raise NginxPushError(f"{' '.join(command)} failed: {str(e)}")
+    if result.returncode != 0:
+        raise NginxPushError(f"{' '.join(command)} failed: {result.stderr.strip()}")
+
+def reload_nginx() -> None:
+    """Check nginx's configuration, then reload it."""
+    _run(NGINX_TEST_COMMAND)
+    _run(NGINX_RELOAD_COMMAND)
+
+def drop_publishers(orientations: List[str], control_url: Optional[str] = NGINX_CONTROL_URL) -> None:
+    """
+    Disconnect OBS from the given streams through nginx's control module.
+
+    nginx-rtmp only applies new push lines to new publishes, so OBS has
+    to reconnect, which it does on its own. Does nothing without a
+    control URL.
+    """
+    if not control_url:
+        return
+    for orientation in orientations:
+        query = urllib.parse.urlencode({'app': NGINX_PUSH_APP, 'name': orientation})
+        try:
+            urllib.request.urlopen(f"{control_url.rstrip('/')}/drop/publisher?{query}",
+                                   timeout=NGINX_COMMAND_TIMEOUT).close()
+        except (urllib.error.URLError, OSError) as e:
+            raise NginxPushError(f"Could not make {orientation} republish: {str(e)}")
+
+def apply_push_config(destinations: List[Destination], path: str = NGINX_PUSH_CONFIG) -> None:
+    """
+    Write the push configuration and reload nginx.
+
+    The previous file is put back when nginx rejects the new one, so a
+    bad push never stops nginx from loading.
+    """
+    config = render_push_config(destinations)
+    previous = None
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            previous = f.read()
+        if previous == config:
+            return
+    with open(f"{path}.tmp", 'w') as f:
+        f.write(config)
+    os.replace(f"{path}.tmp", path)
+    try:
+        reload_nginx()
+    except NginxPushError:
+        if previous is None:
+            os.remove(path)
+        else:
+            with open(path, 'w') as f:
+                f.write(previous)
+        raise
+    drop_publishers(sorted({destination.orientation for destination in destinations}))
+
+def main():
+    """
+    Check or clear the generated nginx push configuration.
+    Usage: python nginxPush.py [--reload | --clear] [--config nginx-push.conf]
+    """
+    parser = argparse.ArgumentParser(description="nginx-rtmp push configuration")
+    parser.add_argument('--config', default=NGINX_PUSH_CONFIG)
+    action = parser.add_mutually_exclusive_group()
+    action.add_argument('--reload', action='store_true', help="Test and reload nginx")
+    action.add_argument('--clear', action='store_true', help="Remove every push and reload nginx")
+    args = parser.parse_args()
+
+    try:
+        if args.clear:
+            apply_push_config([], args.config)
+            print(f"Cleared {args.config}")
+        elif args.reload:
+            reload_nginx()
+            print("nginx reloaded")
+        elif os.path.exists(args.config):
+            with open(args.config, 'r') as f:
+                print(f.read(), end='')
+        else:
+            print(f"{args.config} has not been written yet")
+    except NginxPushError as e:
+        print(str(e))
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+import json
+import os
+from dataclasses import dataclass
+from typing import (
+    Optional,
+    List,
+    Dict
+)
+from constants import (
+    PLATFORM_PROFILES_FILE, PLATFORM_PROFILE_DEFAULT, PLATFORM_MAP,
+    FFMPEG_PRESET, X264_PRESETS, MAX_KEYFRAME_SECONDS, MAX_PROFILE_FPS
+)
+
+REQUIRED_FIELDS = ('video_bitrate_kbps', 'max_video_bitrate_kbps', 'keyframe_seconds',
+                   'max_resolution', 'max_fps')
+OPTIONAL_FIELDS = ('preset',)
+
+class ProfileError(ValueError):
+    """The platform profile file is missing or does not validate"""
+
+@dataclass(frozen=True)
+class Rendition:
+    """One encode; platforms whose profiles resolve to the same rendition share it"""
+    max_width: Optional[int]
+    max_height: Optional[int]
+    max_fps: Optional[int]
+    video_bitrate_kbps: int
+    keyframe_seconds: float
+    preset: str
+
+    @property
+    def name(self) -> str:
+        """Short URL-safe label such as 720p30-3000k."""
+        size = f"{self.max_height}p" if self.max_height else 'source'
+        fps = str(self.max_fps) if self.max_fps else ''
+        return f"{size}{fps}-{self.video_bitrate_kbps}k"
+
+    def __str__(self) -> str:
+        return self.name
+
+@dataclass(frozen=True)
+class PlatformProfile:
+    """Encoder settings and ingest caps of one platform"""
+    platform: str
+    max_video_bitrate_kbps: int  # Sources above this are re-encoded instead of copied
+    rendition: Rendition
+
+def profiles_path() -> str:
+    """Profile file next to the program, unless PLATFORM_PROFILES_FILE is absolute."""
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), PLATFORM_PROFILES_FILE)
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def _parse_resolution(value) -> Optional[tuple]:
+    """Parse 'WIDTHxHEIGHT' into even positive ints; returns None if malformed."""
+    if not isinstance(value, str):
+        return None
+    width, _, height = value.lower().partition('x')
+    if not (width.isdigit() and height.isdigit()):
+        return None
+    width, height = int(width), int(height)
+    if width <= 0 or height <= 0 or width % 2 or height % 2:
+        return None
+    return width, height
+
+def _validate(name: str, entry) -> List[str]:
+    """Every problem with one platform's entry."""
+    if not isinstance(entry, dict):
+        return [f"{name}: expected an object"]
+    errors = [f"{name}: missing {field}" for field in REQUIRED_FIELDS if field not in entry]
+    errors += [f"{name}: unknown field {field}" for field in entry
+               if field not in REQUIRED_FIELDS + OPTIONAL_FIELDS]
+
+    for field in ('video_bitrate_kbps', 'max_video_bitrate_kbps'):
+        value = entry.get(field)
+        if field in entry and not (isinstance(value, int) and not isinstance(value, bool) and value > 0):
+            errors.append(f"{name}: {field} must be a positive integer")
+    bitrate, cap = entry.get('video_bitrate_kbps'), entry.get('max_video_bitrate_kbps')
+    if isinstance(bitrate, int) and isinstance(cap, int) and bitrate > cap:
+        errors.append(f"{name}: video_bitrate_kbps {bitrate} exceeds max_video_bitrate_kbps {cap}")
+
+    keyframe = entry.get('keyframe_seconds')
+    if 'keyframe_seconds' in entry and not (_is_number(keyframe) and 0 < keyframe <= MAX_KEYFRAME_SECONDS):
+        errors.append(f"{name}: keyframe_seconds must be above 0 and at most {MAX_KEYFRAME_SECONDS}")
+
+    resolution = entry.get('max_resolution')
+    if resolution is not None and _parse_resolution(resolution) is None:
+        errors.append(f"{name}: max_resolution must be null or WIDTHxHEIGHT with even sides, "
+                      f"not {resolution!r}")
+
+    fps = entry.get('max_fps')
+    if fps is not None and not (isinstance(fps, int) and not isinstance(fps, bool)
+                                and 0 < fps <= MAX_PROFILE_FPS):
+        errors.append(f"{name}: max_fps must be null or an integer from 1 to {MAX_PROFILE_FPS}")
+
+    preset = entry.get('preset', FFMPEG_PRESET)
+    if preset not in X264_PRESETS:
+        errors.append(f"{name}: preset must be one of {', '.join(X264_PRESETS)}")
+    return errors
+
+def parse_profiles(data) -> Dict[str, PlatformProfile]:
+    """Validate decoded profile data, raising ProfileError that lists every problem."""
+    if not isinstance(data, dict):
+        raise ProfileError("expected an object keyed by platform")
+    known = set(PLATFORM_MAP.values()) | {PLATFORM_PROFILE_DEFAULT}
+    errors = [] if PLATFORM_PROFILE_DEFAULT in data else [f"missing the {PLATFORM_PROFILE_DEFAULT} profile"]
+    for name, entry in data.items():
+        if name not in known:
+            errors.append(f"{name}: unknown platform (expected one of {', '.join(sorted(known))})")
+        else:
+            errors += _validate(name, entry)
+    if errors:
+        raise ProfileError('; '.join(errors))
+
+    profiles = {}
+    for name, entry in data.items():
+        width, height = _parse_resolution(entry['max_resolution']) or (None, None)
+        profiles[name] = PlatformProfile(
+            platform=name,
+            max_video_bitrate_kbps=entry['max_video_bitrate_kbps'],
+            rendition=Rendition(
+                max_width=width,
+                max_height=height,
+                max_fps=entry['max_fps'],
+                video_bitrate_kbps=entry['video_bitrate_kbps'],
+                keyframe_seconds=entry['keyframe_seconds'],
+                preset=entry.get('preset', FFMPEG_PRESET)
+            )
+        )
+    return profiles
+
+_profiles: Optional[Dict[str, PlatformProfile]] = None
+
+def load_profiles(path: Optional[str] = None) -> Dict[str, PlatformProfile]:
+    """Read and validate the profile file; the default file is only read once."""
+    global _profiles
+    if path is None and _profiles is not None:
+        return _profiles
+    profile_file = path or profiles_path()
+    try:
+        with open(profile_file, 'r') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        raise ProfileError(f"{profile_file} not found")
+    except json.JSONDecodeError as e:
+        raise ProfileError(f"{profile_file} is not valid JSON: {str(e)}")
+    profiles = parse_profiles(data)
+    if path is None:
+        _profiles = profiles
+    return profiles
+
+def profile_for(platform: str) -> PlatformProfile:
+    """Profile of a platform, falling back to the default profile."""
+    profiles = load_profiles()
+    return profiles.get(platform, profiles[PLATFORM_PROFILE_DEFAULT])
+
+def save_presets(presets: Dict[str, str], path: Optional[str] = None) -> None:
+    """
+    Set the preset of each given platform in the profile file.
+
+    Every other field, and every other platform, is written back as it
+    was. The result is validated before anything is written.
+    """
+    global _profiles
+    profile_file = path or profiles_path()
+    with open(profile_file, 'r') as f:
+        data = json.load(f)
+    for platform, preset in presets.items():
+        data[platform]['preset'] = preset
+    parse_profiles(data)
+    partial_file = f"{profile_file}.tmp"
+    with open(partial_file, 'w') as f:
+        json.dump(data, f, indent=4)
+        f.write('\n')
+    os.replace(partial_file, profile_file)
+    if path is None:
+        _profiles = None
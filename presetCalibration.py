@@ -0,0 +1,233 @@
+import argparse
+import dataclasses
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from typing import (
+    Optional,
+    List,
+    Dict
+)
+import ffmpeg
+import streamForward
+from streamBenchmark import render_source
+from harnessTools import read_progress, reap, format_optional
+from forwardTelemetry import ProgressWindow
+from platformProfiles import Rendition, load_profiles, save_presets
+from constants import (
+    BENCHMARK_SOURCE_SIZE, BENCHMARK_SOURCE_FPS, CALIBRATION_PRESETS,
+    CALIBRATION_MIN_SPEED, CALIBRATION_SECONDS, CALIBRATION_ENCODES, STREAM_MODE
+)
+
+@dataclass
+class PresetRun:
+    """Measurements of one preset encoding one rendition, several times at once"""
+    rendition: Rendition
+    preset: str
+    encodes: int
+    cores: int
+    speeds: List[Optional[float]]
+    cpu_seconds: float
+    media_seconds: float
+
+    @property
+    def min_speed(self) -> Optional[float]:
+        """Sustained speed of the slowest encode, None if one never reported progress."""
+        if not self.speeds or None in self.speeds:
+            return None
+        return min(self.speeds)
+
+    @property
+    def cpu_per_encode(self) -> Optional[float]:
+        """Cores one encode keeps busy at real time."""
+        if not self.media_seconds:
+            return None
+        return self.cpu_seconds / self.media_seconds
+
+    @property
+    def headroom(self) -> Optional[float]:
+        """Share of the encoding cores left idle with every encode at real time."""
+        if self.cpu_per_encode is None:
+            return None
+        return 1 - self.encodes * self.cpu_per_encode / self.cores
+
+    @property
+    def sustainable(self) -> bool:
+        return self.min_speed is not None and self.min_speed >= CALIBRATION_MIN_SPEED
+
+def profile_renditions() -> Dict[Rendition, List[str]]:
+    """Platforms of each distinct rendition in the profiles, ignoring their presets."""
+    groups: Dict[Rendition, List[str]] = {}
+    for name, profile in load_profiles().items():
+        rendition = dataclasses.replace(profile.rendition, preset=CALIBRATION_PRESETS[0])
+        groups.setdefault(rendition, []).append(name)
+    return groups
+
+def _source_size(rendition: Rendition) -> str:
+    """Landscape source size, turned upright for portrait renditions."""
+    width, _, height = BENCHMARK_SOURCE_SIZE.partition('x')
+    if rendition.max_width and rendition.max_height and rendition.max_height > rendition.max_width:
+        return f"{height}x{width}"
+    return BENCHMARK_SOURCE_SIZE
+
+def _speed(window: ProgressWindow, started_at: float) -> Optional[float]:
+    """Output time over wall time since the encode started."""
+    sample = window.latest
+    if sample is None or not sample.out_time_us:
+        return None
+    return sample.out_time_us / 1e6 / (sample.received_at - started_at)
+
+def run_preset(source_path: str, rendition: Rendition, preset: str, encodes: int,
+               seconds: float = CALIBRATION_SECONDS) -> PresetRun:
+    """
+    Encode the source with a preset, encodes times at once, for seconds.
+
+    Each encode runs under the same core budget and thread count a
+    forwarder would get, and reads the file as fast as it can. The run
+    ends when any encode reaches the end of the source, so the others
+    never get the cores it frees.
+    """
+    rendition = dataclasses.replace(rendition, preset=preset)
+    budget = streamForward.plan_cpu_budget([1] * encodes)
+    sink_dir = tempfile.mkdtemp(prefix='restream-calibration-')
+    processes = []
+    windows = []
+    readers = []
+    started_at = time.monotonic()
+    try:
+        for i, (cpus, threads) in enumerate(budget):
+            stream = streamForward.build_single_output(
+                STREAM_MODE, sink_dir, f"{i}.flv", rendition=rendition,
+                input_url=source_path, threads=threads
+            ).global_args('-progress', 'pipe:1', '-nostats', '-loglevel', 'error')
+            process = subprocess.Popen(ffmpeg.compile(stream, overwrite_output=True),
+                                       stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                       stderr=subprocess.DEVNULL)
+            if os.name == 'posix':
+                streamForward.limit_process(process.pid, cpus)
+            window = ProgressWindow()
+            reader = threading.Thread(target=read_progress, args=(process, window), daemon=True)
+            reader.start()
+            processes.append(process)
+            windows.append(window)
+            readers.append(reader)
+
+        while (time.monotonic() - started_at < seconds
+               and all(reader.is_alive() for reader in readers)):
+            time.sleep(0.1)
+        speeds = [_speed(window, started_at) for window in windows]
+    finally:
+        for process in processes:
+            process.terminate()
+        usage = [reap(process) for process in processes]
+        shutil.rmtree(sink_dir, ignore_errors=True)
+
+    media_seconds = sum(window.latest.out_time_us / 1e6 for window in windows
+                        if window.latest and window.latest.out_time_us)
+    return PresetRun(
+        rendition=rendition,
+        preset=preset,
+        encodes=encodes,
+        cores=len(set().union(*(cpus for cpus, _ in budget))),
+        speeds=speeds,
+        cpu_seconds=sum(u.cpu_seconds for u in usage),
+        media_seconds=media_seconds
+    )
+
+def calibrate_rendition(source_path: str, rendition: Rendition, encodes: int,
+                        seconds: float = CALIBRATION_SECONDS) -> List[PresetRun]:
+    """
+    Try presets from the fastest on, stopping at the first that cannot keep up.
+
+    Slower presets only cost more, so nothing after a failing preset is tried.
+    """
+    runs = []
+    for preset in CALIBRATION_PRESETS:
+        print(f"  {preset}...", end=' ', flush=True)
+        run = run_preset(source_path, rendition, preset, encodes, seconds)
+        print(format_optional(run.min_speed, '{:.2f}x'))
+        runs.append(run)
+        if not run.sustainable:
+            break
+    return runs
+
+def best_preset(runs: List[PresetRun]) -> str:
+    """Slowest sustainable preset, or the fastest one when none keeps up."""
+    sustainable = [run.preset for run in runs if run.sustainable]
+    return sustainable[-1] if sustainable else CALIBRATION_PRESETS[0]
+
+def print_runs(runs: List[PresetRun]) -> None:
+    print(f"{'Rendition':<20}{'Preset':<11}{'Encodes':>8}{'Min speed':>11}"
+          f"{'Cores/encode':>14}{'Headroom':>10}")
+    for run in runs:
+        print(f"{run.rendition.name:<20}{run.preset:<11}{run.encodes:>8}"
+              f"{format_optional(run.min_speed, '{:.2f}x'):>11}"
+              f"{format_optional(run.cpu_per_encode, '{:.2f}'):>14}"
+              f"{format_optional(run.headroom, '{:.0%}'):>10}")
+
+def main(argv: Optional[List[str]] = None):
+    """
+    Find the slowest x264 preset this machine sustains for every profile rendition.
+    Usage: python streamForward.py calibrate [--encodes N] [--seconds 10] [--fps 30] [--dry-run]
+    """
+    parser = argparse.ArgumentParser(prog='streamForward.py calibrate',
+                                     description="Calibrate encoder presets for this machine")
+    parser.add_argument('--encodes', type=int, default=CALIBRATION_ENCODES,
+                        help="Concurrent encodes, one per distinct rendition by default")
+    parser.add_argument('--seconds', type=float, default=CALIBRATION_SECONDS,
+                        help="Seconds each preset is measured for")
+    parser.add_argument('--fps', type=int, default=BENCHMARK_SOURCE_FPS,
+                        help="Frame rate of the synthetic source, as OBS sends it")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="Report the presets without writing them to the profiles")
+    args = parser.parse_args(argv)
+
+    groups = profile_renditions()
+    encodes = args.encodes or len(groups)
+    if encodes < 1:
+        print("--encodes must be at least 1")
+        sys.exit(1)
+
+    work_dir = tempfile.mkdtemp(prefix='restream-calibration-')
+    presets = {}
+    runs = []
+    try:
+        sources = {}
+        for rendition, platforms in groups.items():
+            size = _source_size(rendition)
+            if size not in sources:
+                print(f"Rendering {size} synthetic source...")
+                sources[size] = os.path.join(work_dir, f"source-{size}.flv")
+                # Longer than any encode runs for, even at high speeds
+                render_source(sources[size], args.seconds * 4, size, args.fps)
+            print(f"Calibrating {rendition.name} ({', '.join(platforms)}) with {encodes} encode(s):")
+            rendition_runs = calibrate_rendition(sources[size], rendition, encodes, args.seconds)
+            runs += rendition_runs
+            preset = best_preset(rendition_runs)
+            if not any(run.sustainable for run in rendition_runs):
+                print(f"  Even {preset} stays below {CALIBRATION_MIN_SPEED:g}x; "
+                      f"use fewer encodes or lower this rendition")
+            presets.update(dict.fromkeys(platforms, preset))
+    except ffmpeg.Error as e:
+        print(f"FFmpeg error occurred: {e.stderr.decode() if e.stderr else str(e)}")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        print("\nCalibration interrupted by user")
+        return
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print()
+    print_runs(runs)
+    print()
+    for platform, preset in presets.items():
+        print(f"{platform}: {preset}")
+    if args.dry_run:
+        return
+    save_presets(presets)
+    print("Presets written to the platform profiles")
@@ -0,0 +1,95 @@
+import argparse
+import glob
+import os
+import sys
+import tempfile
+import time
+from typing import List
+import ffmpeg
+from streamForward import ForwardJob
+from constants import (
+    FORWARD_MODE_REPLAY, REPLAY_PLATFORM, REPLAY_BUFFER_DIR,
+    REPLAY_EXPORT_DIR, REPLAY_EXPORT_MINUTES, STREAM_MODE
+)
+
+def replay_job(orientation: str, buffer_dir: str = REPLAY_BUFFER_DIR) -> ForwardJob:
+    """Job that records an orientation's input into the replay ring."""
+    os.makedirs(buffer_dir, exist_ok=True)
+    return ForwardJob(orientation, [], FORWARD_MODE_REPLAY, label=f"{orientation}:{REPLAY_PLATFORM}",
+                      output_path=os.path.join(buffer_dir, f"{orientation}-%03d.flv"))
+
+def list_segments(orientation: str, buffer_dir: str = REPLAY_BUFFER_DIR) -> List[str]:
+    """Segments of an orientation's ring, oldest first."""
+    paths = glob.glob(os.path.join(glob.escape(buffer_dir), f"{orientation}-*.flv"))
+    return sorted(paths, key=os.path.getmtime)
+
+def recent_segments(orientation: str, seconds: float,
+                    buffer_dir: str = REPLAY_BUFFER_DIR) -> List[str]:
+    """
+    Segments holding the last seconds of the recording.
+
+    A segment's modification time is when its last packet was written,
+    so every segment still being written to within the window is kept,
+    including the one the window starts in.
+    """
+    cutoff = time.time() - seconds
+    return [path for path in list_segments(orientation, buffer_dir)
+            if os.path.getmtime(path) >= cutoff]
+
+def _concat_line(path: str) -> str:
+    escaped = os.path.abspath(path).replace("'", "'\\''")
+    return f"file '{escaped}'\n"
+
+def export_replay(orientation: str = STREAM_MODE, minutes: float = REPLAY_EXPORT_MINUTES,
+                  output_dir: str = REPLAY_EXPORT_DIR,
+                  buffer_dir: str = REPLAY_BUFFER_DIR) -> str:
+    """
+    Stitch the last minutes of the replay ring into an mp4 and return its path.
+
+    The segments are concatenated with stream copy, so exporting takes
+    about as long as copying the files. Raises FileNotFoundError when
+    nothing has been recorded in that window.
+    """
+    segments = recent_segments(orientation, minutes * 60, buffer_dir)
+    if not segments:
+        raise FileNotFoundError(f"No {orientation} replay segments in {buffer_dir} "
+                                f"from the last {minutes:g} minutes")
+
+    os.makedirs(output_dir, exist_ok=True)
+    output_path = os.path.join(output_dir, f"{orientation}-{time.strftime('%Y%m%d-%H%M%S')}.mp4")
+    with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as concat_list:
+        concat_list.writelines(_concat_line(path) for path in segments)
+    try:
+        (
+            ffmpeg.input(concat_list.name, f='concat', safe=0)
+            .output(output_path, c='copy', movflags='+faststart')
+            .run(quiet=True, overwrite_output=True)
+        )
+    finally:
+        os.remove(concat_list.name)
+    return output_path
+
+def main():
+    """
+    Save the last minutes of the replay buffer as an mp4.
+    Usage: python replayBuffer.py [--minutes 2] [--orientation landscape]
+    """
+    parser = argparse.ArgumentParser(description="Export a clip from the replay buffer")
+    parser.add_argument('--minutes', type=float, default=REPLAY_EXPORT_MINUTES)
+    parser.add_argument('--orientation', default=STREAM_MODE)
+    parser.add_argument('--buffer-dir', default=REPLAY_BUFFER_DIR)
+    parser.add_argument('--output-dir', default=REPLAY_EXPORT_DIR)
+    args = parser.parse_args()
+
+    try:
+        path = export_replay(args.orientation, args.minutes, args.output_dir, args.buffer_dir)
+    except FileNotFoundError as e:
+        print(str(e))
+        sys.exit(1)
+    except ffmpeg.Error as e:
+        print(f"FFmpeg error occurred: {e.stderr.decode() if e.stderr else str(e)}")
+        sys.exit(1)
+    print(f"Saved {path}")
+
+if __name__ == "__main__":
+    main()
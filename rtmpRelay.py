@@ -0,0 +1,662 @@
+import asyncio
+import logging
+import os
+import struct
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import (
+    Optional,
+    List,
+    Dict,
+    Any,
+    Tuple
+)
+from constants import (
+    RTMP_LOCAL_PORT, RTMP_RELAY_HOST, RELAY_CHUNK_SIZE, RELAY_WINDOW_ACK_SIZE,
+    RELAY_SUBSCRIBER_QUEUE, RELAY_GOP_CACHE_MESSAGES, RELAY_KEYFRAME_HISTORY
+)
+
+logger = logging.getLogger(__name__)
+
+HANDSHAKE_SIZE = 1536
+DEFAULT_CHUNK_SIZE = 128
+EXTENDED_TIMESTAMP = 0xFFFFFF
+
+# Message types
+MSG_SET_CHUNK_SIZE = 1
+MSG_ABORT = 2
+MSG_ACK = 3
+MSG_USER_CONTROL = 4
+MSG_WINDOW_ACK_SIZE = 5
+MSG_SET_PEER_BANDWIDTH = 6
+MSG_AUDIO = 8
+MSG_VIDEO = 9
+MSG_AMF3_COMMAND = 17
+MSG_AMF0_DATA = 18
+MSG_AMF0_COMMAND = 20
+
+# Chunk stream ids used when sending
+CSID_CONTROL = 2
+CSID_COMMAND = 3
+CSID_AUDIO = 4
+CSID_DATA = 5
+CSID_VIDEO = 6
+
+# User control events
+EVENT_STREAM_BEGIN = 0
+EVENT_STREAM_EOF = 1
+EVENT_PING_REQUEST = 6
+EVENT_PING_RESPONSE = 7
+
+MEDIA_STREAM_ID = 1
+
+# AMF0 markers
+AMF_NUMBER = 0
+AMF_BOOLEAN = 1
+AMF_STRING = 2
+AMF_OBJECT = 3
+AMF_NULL = 5
+AMF_UNDEFINED = 6
+AMF_ECMA_ARRAY = 8
+AMF_OBJECT_END = 9
+AMF_STRICT_ARRAY = 10
+AMF_DATE = 11
+AMF_LONG_STRING = 12
+
+SET_DATA_FRAME = b'\x02\x00\x0d@setDataFrame'
+
+def amf_encode(*values) -> bytes:
+    """Encode values as a sequence of AMF0 values."""
+    return b''.join(_amf_encode_value(value) for value in values)
+
+def _amf_encode_key(key: str) -> bytes:
+    data = key.encode()
+    return struct.pack('>H', len(data)) + data
+
+def _amf_encode_value(value) -> bytes:
+    if value is None:
+        return bytes([AMF_NULL])
+    if isinstance(value, bool):
+        return bytes([AMF_BOOLEAN, value])
+    if isinstance(value, (int, float)):
+        return bytes([AMF_NUMBER]) + struct.pack('>d', value)
+    if isinstance(value, str):
+        data = value.encode()
+        if len(data) > 0xFFFF:
+            return bytes([AMF_LONG_STRING]) + struct.pack('>I', len(data)) + data
+        return bytes([AMF_STRING]) + struct.pack('>H', len(data)) + data
+    if isinstance(value, dict):
+        body = b''.join(_amf_encode_key(k) + _amf_encode_value(v) for k, v in value.items())
+        return bytes([AMF_OBJECT]) + body + b'\x00\x00' + bytes([AMF_OBJECT_END])
+    raise TypeError(f"Cannot encode {type(value).__name__} as AMF0")
+
+def amf_decode(data: bytes) -> List[Any]:
+    """Decode every AMF0 value in data."""
+    values = []
+    offset = 0
+    while offset < len(data):
+        value, offset = _amf_decode_value(data, offset)
+        values.append(value)
+    return values
+
+def _amf_decode_properties(data: bytes, offset: int) -> Tuple[Dict[str, Any], int]:
+    properties = {}
+    while offset + 3 <= len(data):
+        length = struct.unpack_from('>H', data, offset)[0]
+        offset += 2
+        if length == 0 and data[offset] == AMF_OBJECT_END:
+            return properties, offset + 1
+        key = data[offset:offset + length].decode(errors='replace')
+        properties[key], offset = _amf_decode_value(data, offset + length)
+    return properties, len(data)
+
+def _amf_decode_value(data: bytes, offset: int) -> Tuple[Any, int]:
+    marker = data[offset]
+    offset += 1
+    if marker == AMF_NUMBER:
+        return struct.unpack_from('>d', data, offset)[0], offset + 8
+    if marker == AMF_BOOLEAN:
+        return bool(data[offset]), offset + 1
+    if marker == AMF_STRING:
+        length = struct.unpack_from('>H', data, offset)[0]
+        return data[offset + 2:offset + 2 + length].decode(errors='replace'), offset + 2 + length
+    if marker == AMF_LONG_STRING:
+        length = struct.unpack_from('>I', data, offset)[0]
+        return data[offset + 4:offset + 4 + length].decode(errors='replace'), offset + 4 + length
+    if marker == AMF_OBJECT:
+        return _amf_decode_properties(data, offset)
+    if marker == AMF_ECMA_ARRAY:
+        return _amf_decode_properties(data, offset + 4)
+    if marker == AMF_STRICT_ARRAY:
+        count = struct.unpack_from('>I', data, offset)[0]
+        offset += 4
+        items = []
+        for _ in range(count):
+            item, offset = _amf_decode_value(data, offset)
+            items.append(item)
+        return items, offset
+    if marker == AMF_DATE:
+        return struct.unpack_from('>d', data, offset)[0], offset + 10
+    if marker in (AMF_NULL, AMF_UNDEFINED):
+        return None, offset
+    raise ValueError(f"Unsupported AMF0 marker {marker}")
+
+@dataclass
+class RtmpMessage:
+    """One RTMP message; the payload is shared by every subscriber it is sent to"""
+    type_id: int
+    timestamp: int
+    payload: bytes
+    stream_id: int = MEDIA_STREAM_ID
+
+    @property
+    def is_video_keyframe(self) -> bool:
+        # Frame type is the high nibble; enhanced RTMP sets the top bit
+        return self.type_id == MSG_VIDEO and (self.payload[0] >> 4) & 0x07 == 1
+
+    @property
+    def is_sequence_header(self) -> bool:
+        """AVC/HEVC/AV1 decoder configuration or AAC AudioSpecificConfig."""
+        if len(self.payload) < 2:
+            return False
+        first = self.payload[0]
+        if self.type_id == MSG_VIDEO:
+            if first & 0x80:
+                return first & 0x0F == 0
+            return first & 0x0F == 7 and self.payload[1] == 0
+        if self.type_id == MSG_AUDIO:
+            return first >> 4 == 10 and self.payload[1] == 0
+        return False
+
+@dataclass
+class _ChunkState:
+    """Header fields of the last chunk seen on one incoming chunk stream"""
+    timestamp: int = 0
+    timestamp_field: int = 0
+    length: int = 0
+    type_id: int = 0
+    stream_id: int = 0
+    extended: bool = False
+    buffer: bytearray = field(default_factory=bytearray)
+
+class Subscriber:
+    """A playing client with its own bounded queue of messages to send"""
+
+    def __init__(self, session: 'RtmpSession', size: int = RELAY_SUBSCRIBER_QUEUE):
+        self.session = session
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=size)
+        self.sent = 0
+        self.dropped = 0
+        self.waiting_for_keyframe = True
+
+    def offer(self, message: RtmpMessage) -> None:
+        """Queue a message without ever blocking the publisher."""
+        if message.type_id in (MSG_AUDIO, MSG_VIDEO) and not message.is_sequence_header:
+            if self.waiting_for_keyframe:
+                if not message.is_video_keyframe:
+                    return
+                self.waiting_for_keyframe = False
+        if self.queue.full():
+            # Skip this consumer ahead to the next keyframe rather than
+            # making the publisher or the other forwarders wait for it
+            while not self.queue.empty():
+                self.queue.get_nowait()
+                self.dropped += 1
+            self.dropped += 1
+            self.waiting_for_keyframe = True
+            return
+        self.queue.put_nowait(message)
+
+class RelayStream:
+    """
+    One published stream and the clients playing it.
+
+    A second publisher does not get rejected: it takes over at its first
+    keyframe and the previous one is disconnected, so a publisher can be
+    replaced (an OBS reconnect, a re-encode at another bitrate) without
+    the players noticing. Timestamps are offset on every change of
+    publisher so players always see them advance.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.publisher: Optional['RtmpSession'] = None
+        self.pending: Optional['RtmpSession'] = None
+        self.metadata: Optional[RtmpMessage] = None
+        self.video_header: Optional[RtmpMessage] = None
+        self.audio_header: Optional[RtmpMessage] = None
+        self.gop: List[RtmpMessage] = []
+        self.subscribers: List[Subscriber] = []
+        self.messages = 0
+        self.bytes = 0
+        self.video_frames = 0
+        self.handovers = 0
+        self.published_at: Optional[float] = None  # Monotonic time the current publisher took over
+        self.last_timestamp: Optional[int] = None
+        self.received_at: Optional[float] = None  # Monotonic time of the last relayed message
+        self._offset: Optional[int] = None
+        self._pending_headers: List[RtmpMessage] = []
+        self._keyframe_intervals: deque = deque(maxlen=RELAY_KEYFRAME_HISTORY)
+        self._last_keyframe: Optional[int] = None
+
+    @property
+    def keyframe_seconds(self) -> Optional[float]:
+        """Longest recent gap between the publisher's keyframes, None until two were seen."""
+        if not self._keyframe_intervals:
+            return None
+        return max(self._keyframe_intervals) / 1000
+
+    def _reset_keyframes(self) -> None:
+        self._keyframe_intervals.clear()
+        self._last_keyframe = None
+
+    def receive(self, session: 'RtmpSession', message: RtmpMessage) -> None:
+        """Accept a message from the publisher or the publisher waiting to take over."""
+        if session is self.pending:
+            if not self._take_over(message):
+                return
+        elif session is not self.publisher:
+            return
+        self._relay(message)
+
+    def _take_over(self, message: RtmpMessage) -> bool:
+        """Hold a pending publisher's headers until its first keyframe, then switch to it."""
+        if message.type_id == MSG_AMF0_DATA or message.is_sequence_header:
+            self._pending_headers.append(message)
+            return False
+        if not message.is_video_keyframe:
+            return False
+
+        previous = self.publisher
+        self.publisher, self.pending = self.pending, None
+        self.published_at = time.monotonic()
+        self.handovers += 1
+        self._offset = None
+        self.gop = []
+        self._reset_keyframes()
+        headers, self._pending_headers = self._pending_headers, []
+        for header in headers:
+            self._relay(header)
+        if previous:
+            previous.writer.close()
+        logger.info(f"Publisher of {self.name} handed over to {self.publisher.peer}")
+        return True
+
+    def _relay(self, message: RtmpMessage) -> None:
+        """Hand a message from the publisher to every subscriber by reference."""
+        is_media = message.type_id in (MSG_AUDIO, MSG_VIDEO) and not message.is_sequence_header
+        if self._offset is None and not is_media:
+            # Metadata and sequence headers carry timestamp 0; the offset waits for real media
+            message.timestamp = self.last_timestamp or 0
+        else:
+            if self._offset is None:
+                # Continue right after whatever the players saw last
+                self._offset = 0 if self.last_timestamp is None else self.last_timestamp + 1 - message.timestamp
+            message.timestamp = max(0, message.timestamp + self._offset)
+        if self.last_timestamp is None or message.timestamp > self.last_timestamp:
+            self.last_timestamp = message.timestamp
+        self.messages += 1
+        self.bytes += len(message.payload)
+        self.received_at = time.monotonic()
+        if message.type_id == MSG_AMF0_DATA:
+            self.metadata = message
+        elif message.is_sequence_header:
+            if message.type_id == MSG_VIDEO:
+                self.video_header = message
+            else:
+                self.audio_header = message
+        elif message.type_id in (MSG_AUDIO, MSG_VIDEO):
+            if message.type_id == MSG_VIDEO:
+                self.video_frames += 1
+            if message.is_video_keyframe:
+                self.gop = []
+                if self._last_keyframe is not None and message.timestamp > self._last_keyframe:
+                    self._keyframe_intervals.append(message.timestamp - self._last_keyframe)
+                self._last_keyframe = message.timestamp
+            if len(self.gop) < RELAY_GOP_CACHE_MESSAGES:
+                self.gop.append(message)
+        for subscriber in self.subscribers:
+            subscriber.offer(message)
+
+    def subscribe(self, subscriber: Subscriber) -> None:
+        """Start a subscriber from the stream headers and the current GOP."""
+        self.subscribers.append(subscriber)
+        for message in (self.metadata, self.video_header, self.audio_header, *self.gop):
+            if message:
+                subscriber.offer(message)
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        if subscriber in self.subscribers:
+            self.subscribers.remove(subscriber)
+
+    def unpublish(self) -> None:
+        """Forget the publisher and everything cached from it."""
+        self.publisher = None
+        self.published_at = None
+        self._offset = None
+        self.metadata = self.video_header = self.audio_header = None
+        self.gop = []
+        self._reset_keyframes()
+        for subscriber in self.subscribers:
+            subscriber.waiting_for_keyframe = True
+
+class RtmpSession:
+    """One client connection, either publishing or playing"""
+
+    def __init__(self, relay: 'RtmpRelay', reader: asyncio.StreamReader,
+                 writer: asyncio.StreamWriter):
+        self.relay = relay
+        self.reader = reader
+        self.writer = writer
+        self.app = ''
+        self.query = ''  # Whatever followed '?' in the published or played name
+        self.stream: Optional[RelayStream] = None
+        self.subscriber: Optional[Subscriber] = None
+        self.in_chunk_size = DEFAULT_CHUNK_SIZE
+        self.out_chunk_size = DEFAULT_CHUNK_SIZE
+        self.chunks: Dict[int, _ChunkState] = {}
+        self.received = 0
+        self.acked = 0
+        self.peer_window: Optional[int] = None
+        self.sender: Optional[asyncio.Task] = None
+
+    @property
+    def peer(self) -> str:
+        return str(self.writer.get_extra_info('peername'))
+
+    async def _read(self, count: int) -> bytes:
+        data = await self.reader.readexactly(count)
+        self.received += count
+        return data
+
+    async def handshake(self) -> None:
+        """Simple (non-digest) handshake: S1 carries a zero version so clients skip validation."""
+        c0c1 = await self._read(1 + HANDSHAKE_SIZE)
+        s1 = bytes(8) + os.urandom(HANDSHAKE_SIZE - 8)
+        self.writer.write(b'\x03' + s1 + c0c1[1:])
+        await self.writer.drain()
+        await self._read(HANDSHAKE_SIZE)
+
+    async def read_message(self) -> RtmpMessage:
+        """Reassemble the next complete message from the chunk stream."""
+        while True:
+            first = (await self._read(1))[0]
+            fmt, csid = first >> 6, first & 0x3F
+            if csid == 0:
+                csid = 64 + (await self._read(1))[0]
+            elif csid == 1:
+                extra = await self._read(2)
+                csid = 64 + extra[0] + extra[1] * 256
+            state = self.chunks.setdefault(csid, _ChunkState())
+            starts_message = not state.buffer
+
+            if fmt < 3:
+                header = await self._read((11, 7, 3)[fmt])
+                timestamp_field = int.from_bytes(header[0:3], 'big')
+                if fmt < 2:
+                    state.length = int.from_bytes(header[3:6], 'big')
+                    state.type_id = header[6]
+                if fmt == 0:
+                    state.stream_id = int.from_bytes(header[7:11], 'little')
+                state.extended = timestamp_field == EXTENDED_TIMESTAMP
+                if state.extended:
+                    timestamp_field = int.from_bytes(await self._read(4), 'big')
+                state.timestamp_field = timestamp_field
+                # Type 0 carries an absolute timestamp, types 1 and 2 a delta
+                state.timestamp = timestamp_field if fmt == 0 else state.timestamp + timestamp_field
+            else:
+                if state.extended:
+                    await self._read(4)
+                if starts_message:
+                    state.timestamp += state.timestamp_field
+
+            remaining = state.length - len(state.buffer)
+            size = min(self.in_chunk_size, remaining)
+            if starts_message and size == state.length:
+                # Whole message in one chunk: keep the bytes without copying them
+                payload = await self._read(size)
+            else:
+                state.buffer += await self._read(size)
+                if len(state.buffer) < state.length:
+                    continue
+                payload = bytes(state.buffer)
+                state.buffer = bytearray()
+
+            await self._acknowledge()
+            return RtmpMessage(state.type_id, state.timestamp, payload, state.stream_id)
+
+    async def _acknowledge(self) -> None:
+        """Send an acknowledgement each time the peer's window is used up."""
+        if self.peer_window and self.received - self.acked >= self.peer_window:
+            self.acked = self.received
+            self.send(CSID_CONTROL, MSG_ACK, 0, 0, struct.pack('>I', self.received & 0xFFFFFFFF))
+            await self.writer.drain()
+
+    def send(self, csid: int, type_id: int, stream_id: int, timestamp: int, payload: bytes) -> None:
+        """Write one message, chunked with memoryview slices of its payload."""
+        view = memoryview(payload)
+        extended = timestamp >= EXTENDED_TIMESTAMP
+        extended_bytes = struct.pack('>I', timestamp & 0xFFFFFFFF) if extended else b''
+        header = (
+            bytes([csid])
+            + min(timestamp, EXTENDED_TIMESTAMP).to_bytes(3, 'big')
+            + len(payload).to_bytes(3, 'big')
+            + bytes([type_id])
+            + struct.pack('<I', stream_id)
+            + extended_bytes
+        )
+        parts = [header, view[:self.out_chunk_size]]
+        continuation = bytes([0xC0 | csid]) + extended_bytes
+        for offset in range(self.out_chunk_size, len(payload), self.out_chunk_size):
+            parts.append(continuation)
+            parts.append(view[offset:offset + self.out_chunk_size])
+        self.writer.writelines(parts)
+
+    def _send_control(self, type_id: int, payload: bytes) -> None:
+        self.send(CSID_CONTROL, type_id, 0, 0, payload)
+
+    def _send_user_control(self, event: int, value: int) -> None:
+        self.send(CSID_CONTROL, MSG_USER_CONTROL, 0, 0, struct.pack('>HI', event, value))
+
+    def _send_command(self, *values, stream_id: int = 0) -> None:
+        self.send(CSID_COMMAND, MSG_AMF0_COMMAND, stream_id, 0, amf_encode(*values))
+
+    def _send_status(self, code: str, description: str, level: str = 'status') -> None:
+        self._send_command('onStatus', 0, None,
+                           {'level': level, 'code': code, 'description': description},
+                           stream_id=MEDIA_STREAM_ID)
+
+    async def run(self) -> None:
+        """Serve the connection until the client leaves."""
+        await self.handshake()
+        while True:
+            message = await self.read_message()
+            if message.type_id in (MSG_AUDIO, MSG_VIDEO, MSG_AMF0_DATA):
+                self._on_media(message)
+            elif message.type_id in (MSG_AMF0_COMMAND, MSG_AMF3_COMMAND):
+                payload = message.payload
+                if message.type_id == MSG_AMF3_COMMAND:
+                    payload = payload[1:]
+                await self._on_command(amf_decode(payload))
+            else:
+                await self._on_control(message)
+
+    async def _on_control(self, message: RtmpMessage) -> None:
+        payload = message.payload
+        if message.type_id == MSG_SET_CHUNK_SIZE:
+            self.in_chunk_size = struct.unpack('>I', payload[:4])[0] & 0x7FFFFFFF
+        elif message.type_id == MSG_WINDOW_ACK_SIZE:
+            self.peer_window = struct.unpack('>I', payload[:4])[0]
+        elif message.type_id == MSG_ABORT:
+            csid = struct.unpack('>I', payload[:4])[0]
+            if csid in self.chunks:
+                self.chunks[csid].buffer = bytearray()
+        elif message.type_id == MSG_USER_CONTROL:
+            event = struct.unpack('>H', payload[:2])[0]
+            if event == EVENT_PING_REQUEST:
+                self._send_user_control(EVENT_PING_RESPONSE, struct.unpack('>I', payload[2:6])[0])
+                await self.writer.drain()
+
+    def _on_media(self, message: RtmpMessage) -> None:
+        if not self.stream:
+            return
+        if message.type_id == MSG_AMF0_DATA and message.payload.startswith(SET_DATA_FRAME):
+            # Players expect plain onMetaData, not the publisher's @setDataFrame wrapper
+            message.payload = message.payload[len(SET_DATA_FRAME):]
+        self.stream.receive(self, message)
+
+    async def _on_command(self, values: List[Any]) -> None:
+        if not values:
+            return
+        name = values[0]
+        transaction = values[1] if len(values) > 1 else 0
+        args = values[3:]
+
+        if name == 'connect':
+            command = values[2] if len(values) > 2 and isinstance(values[2], dict) else {}
+            self.app = str(command.get('app', '')).strip('/')
+            self._send_control(MSG_WINDOW_ACK_SIZE, struct.pack('>I', RELAY_WINDOW_ACK_SIZE))
+            self._send_control(MSG_SET_PEER_BANDWIDTH, struct.pack('>IB', RELAY_WINDOW_ACK_SIZE, 2))
+            self._send_control(MSG_SET_CHUNK_SIZE, struct.pack('>I', RELAY_CHUNK_SIZE))
+            self.out_chunk_size = RELAY_CHUNK_SIZE
+            self._send_command('_result', transaction,
+                               {'fmsVer': 'FMS/3,0,1,123', 'capabilities': 31},
+                               {'level': 'status', 'code': 'NetConnection.Connect.Success',
+                                'description': 'Connection succeeded.', 'objectEncoding': 0})
+        elif name == 'createStream':
+            self._send_command('_result', transaction, None, MEDIA_STREAM_ID)
+        elif name == 'publish' and args:
+            self._publish(str(args[0]))
+        elif name == 'play' and args:
+            self._play(str(args[0]))
+        elif name in ('FCUnpublish', 'deleteStream', 'closeStream'):
+            self.close_stream()
+        await self.writer.drain()
+
+    def _stream_name(self, name: str) -> str:
+        # Drop any ?query (e.g. a key) so publishers and players meet on the path
+        return f"{self.app}/{name.split('?', 1)[0]}"
+
+    def _publish(self, name: str) -> None:
+        stream = self.relay.stream(self._stream_name(name))
+        self.query = name.partition('?')[2]
+        if stream.publisher:
+            if stream.pending:
+                stream.pending.writer.close()
+            stream.pending = self
+            stream._pending_headers = []
+            logger.info(f"Publisher {self.peer} takes over {stream.name} at its first keyframe")
+        else:
+            stream.publisher = self
+            stream.published_at = time.monotonic()
+            stream._reset_keyframes()
+            logger.info(f"Publishing {stream.name} from {self.peer}")
+        self.stream = stream
+        self._send_user_control(EVENT_STREAM_BEGIN, MEDIA_STREAM_ID)
+        self._send_status('NetStream.Publish.Start', f"{stream.name} is now published")
+
+    def _play(self, name: str) -> None:
+        stream = self.relay.stream(self._stream_name(name))
+        self.stream = stream
+        self.subscriber = Subscriber(self)
+        self._send_user_control(EVENT_STREAM_BEGIN, MEDIA_STREAM_ID)
+        self._send_status('NetStream.Play.Reset', f"Playing and resetting {stream.name}")
+        self._send_status('NetStream.Play.Start', f"Started playing {stream.name}")
+        stream.subscribe(self.subscriber)
+        self.sender = asyncio.create_task(self._send_queued(self.subscriber))
+        logger.info(f"Playing {stream.name} to {self.peer}")
+
+    async def _send_queued(self, subscriber: Subscriber) -> None:
+        """Write queued messages; only this subscriber waits on its socket."""
+        csids = {MSG_AUDIO: CSID_AUDIO, MSG_VIDEO: CSID_VIDEO, MSG_AMF0_DATA: CSID_DATA}
+        while True:
+            message = await subscriber.queue.get()
+            self.send(csids[message.type_id], message.type_id, MEDIA_STREAM_ID,
+                      message.timestamp, message.payload)
+            subscriber.sent += 1
+            await self.writer.drain()
+
+    def close_stream(self) -> None:
+        """Leave the stream this session published or played."""
+        if self.sender:
+            self.sender.cancel()
+            self.sender = None
+        if self.stream:
+            if self.stream.publisher is self:
+                logger.info(f"Unpublished {self.stream.name}")
+                self.stream.unpublish()
+            elif self.stream.pending is self:
+                self.stream.pending = None
+                self.stream._pending_headers = []
+            if self.subscriber:
+                self.stream.unsubscribe(self.subscriber)
+        self.stream = None
+        self.subscriber = None
+
+class RtmpRelay:
+    """RTMP ingest server that relays each published stream to its players"""
+
+    def __init__(self, host: str = RTMP_RELAY_HOST, port: int = int(RTMP_LOCAL_PORT)):
+        self.host = host
+        self.port = port
+        self.streams: Dict[str, RelayStream] = {}
+        self.sessions: List[RtmpSession] = []
+        self.server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        """Start listening; raises OSError if the port is already taken."""
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        logger.info(f"RTMP relay listening on {self.host}:{self.port}")
+
+    async def stop(self) -> None:
+        """Stop listening and drop every connection."""
+        if not self.server:
+            return
+        self.server.close()
+        for session in list(self.sessions):
+            session.close_stream()
+            session.writer.close()
+        await self.server.wait_closed()
+        self.server = None
+
+    def url(self, name: str) -> str:
+        """URL local ffmpeg processes use to publish or play a stream."""
+        host = '127.0.0.1' if self.host in ('localhost', '0.0.0.0') else self.host
+        return f"rtmp://{host}:{self.port}/{name}"
+
+    def stream(self, name: str) -> RelayStream:
+        if name not in self.streams:
+            self.streams[name] = RelayStream(name)
+        return self.streams[name]
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        session = RtmpSession(self, reader, writer)
+        self.sessions.append(session)
+        try:
+            await session.run()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except Exception as e:
+            logger.error(f"RTMP session {session.peer} failed: {str(e)}")
+        finally:
+            session.close_stream()
+            self.sessions.remove(session)
+            writer.close()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-stream publisher state and per-subscriber queue depth and drops."""
+        return {
+            name: {
+                'publishing': stream.publisher is not None,
+                'handovers': stream.handovers,
+                'messages': stream.messages,
+                'bytes': stream.bytes,
+                'subscribers': [
+                    {'peer': s.session.peer, 'queued': s.queue.qsize(),
+                     'sent': s.sent, 'dropped': s.dropped}
+                    for s in stream.subscribers
+                ],
+            }
+            for name, stream in self.streams.items()
+        }
@@ -0,0 +1,226 @@
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import (
+    Optional,
+    List,
+    Dict
+)
+import ffmpeg
+import streamForward
+from streamForward import Destination
+from forwardTelemetry import ProgressWindow
+from harnessTools import ProcessUsage, spawn, read_progress, reap, format_optional
+from constants import (
+    FORWARD_MODE_SINGLE, FORWARD_MODE_TEE, VIDEO_CODEC, AUDIO_CODEC,
+    AUDIO_BITRATE, BENCHMARK_DURATION_SECONDS,
+    BENCHMARK_MAX_DESTINATIONS, BENCHMARK_PLATFORM, BENCHMARK_SOURCE_SIZE,
+    BENCHMARK_SOURCE_FPS, BENCHMARK_SOURCE_BITRATE, BENCHMARK_STANDIN_PORT,
+    BENCHMARK_STANDIN_STARTUP, BENCHMARK_SINK_POLL_INTERVAL
+)
+
+FLV_AUDIO_TAG = 8
+FLV_VIDEO_TAG = 9
+FLV_SCAN_BYTES = 65536
+
+@dataclass
+class BenchmarkResult:
+    """Measurements of one mode at one destination count"""
+    mode: str
+    destinations: int
+    processes: int
+    duration: float
+    usage: List[ProcessUsage]
+    speeds: List[Optional[float]]
+    first_packet: Dict[str, Optional[float]] = field(default_factory=dict)
+
+    @property
+    def cpu_per_destination(self) -> float:
+        return sum(u.cpu_seconds for u in self.usage) / self.destinations
+
+    @property
+    def cpu_percent_per_destination(self) -> float:
+        """Share of one core each destination costs."""
+        return 100 * self.cpu_per_destination / self.duration
+
+    @property
+    def rss_mb(self) -> float:
+        """Peak resident memory of all forwarders added together."""
+        return sum(u.max_rss_kb for u in self.usage) / 1024
+
+    @property
+    def min_speed(self) -> Optional[float]:
+        """Sustained speed of the slowest forwarder."""
+        speeds = [s for s in self.speeds if s is not None]
+        return min(speeds) if speeds else None
+
+    @property
+    def max_first_packet(self) -> Optional[float]:
+        """Latency of the last destination to receive media, None if one never did."""
+        latencies = list(self.first_packet.values())
+        if not latencies or None in latencies:
+            return None
+        return max(latencies)
+
+def render_source(path: str, duration: float, size: str = BENCHMARK_SOURCE_SIZE,
+                  fps: int = BENCHMARK_SOURCE_FPS) -> None:
+    """Encode a synthetic test pattern with a tone, similar to what OBS publishes."""
+    video = ffmpeg.input(f"testsrc2=size={size}:rate={fps}", f='lavfi', t=duration)
+    audio = ffmpeg.input("sine=frequency=440:sample_rate=48000", f='lavfi', t=duration)
+    ffmpeg.output(
+        video, audio, path,
+        vcodec=VIDEO_CODEC,
+        preset='veryfast',
+        g=fps * 2,
+        video_bitrate=BENCHMARK_SOURCE_BITRATE,
+        pix_fmt='yuv420p',
+        acodec=AUDIO_CODEC,
+        audio_bitrate=AUDIO_BITRATE,
+        format='flv'
+    ).run(quiet=True, overwrite_output=True)
+
+def start_standin(source_path: str, url: str) -> subprocess.Popen:
+    """
+    Serve the synthetic source at a local RTMP URL in real time.
+
+    ffmpeg's RTMP listener accepts a single client, so every forwarder
+    gets a stand-in of its own; stream copy keeps their CPU negligible.
+    """
+    stream = ffmpeg.input(source_path, re=None, stream_loop=-1)
+    return spawn(ffmpeg.output(stream, url, c='copy', format='flv', listen=1))
+
+def has_media_tag(path: str) -> bool:
+    """Whether an FLV file already holds an audio or video packet."""
+    try:
+        with open(path, 'rb') as f:
+            data = f.read(FLV_SCAN_BYTES)
+    except FileNotFoundError:
+        return False
+    if len(data) < 9 or data[:3] != b'FLV':
+        return False
+
+    # Skip the file header and the first PreviousTagSize, then walk tags
+    offset = int.from_bytes(data[5:9], 'big') + 4
+    while offset + 11 <= len(data):
+        if data[offset] & 0x1f in (FLV_AUDIO_TAG, FLV_VIDEO_TAG):
+            return True
+        offset += 11 + int.from_bytes(data[offset + 1:offset + 4], 'big') + 4
+    return False
+
+def run_benchmark(source_path: str, mode: str, count: int,
+                  duration: float = BENCHMARK_DURATION_SECONDS,
+                  platform: str = BENCHMARK_PLATFORM) -> BenchmarkResult:
+    """Forward the synthetic source to count local sinks in the given mode."""
+    sink_dir = tempfile.mkdtemp(prefix='restream-sinks-')
+    destinations = [Destination(platform, 'landscape', sink_dir, f"{platform}-{i}.flv")
+                    for i in range(count)]
+    jobs = streamForward.plan_jobs(destinations, mode)
+
+    standins = []
+    for port, job in enumerate(jobs, BENCHMARK_STANDIN_PORT):
+        job.input_url = f"rtmp://127.0.0.1:{port}/live/{job.orientation}"
+        standins.append(start_standin(source_path, job.input_url))
+    time.sleep(BENCHMARK_STANDIN_STARTUP)
+
+    forwarders = []
+    windows = []
+    first_packet = {d.output_url: None for d in destinations}
+    started_at = time.monotonic()
+    try:
+        for job in jobs:
+            process = subprocess.Popen(streamForward.job_command(job), stdin=subprocess.DEVNULL,
+                                       stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+            window = ProgressWindow()
+            threading.Thread(target=read_progress, args=(process, window), daemon=True).start()
+            forwarders.append(process)
+            windows.append(window)
+
+        # Watch the sinks for their first media packet for the whole run
+        while time.monotonic() - started_at < duration:
+            for path, latency in first_packet.items():
+                if latency is None and has_media_tag(path):
+                    first_packet[path] = time.monotonic() - started_at
+            time.sleep(BENCHMARK_SINK_POLL_INTERVAL)
+    finally:
+        for process in forwarders:
+            process.terminate()
+        usage = [reap(process) for process in forwarders]
+        for standin in standins:
+            standin.kill()
+            standin.wait()
+        shutil.rmtree(sink_dir, ignore_errors=True)
+
+    return BenchmarkResult(
+        mode=mode,
+        destinations=count,
+        processes=len(jobs),
+        duration=time.monotonic() - started_at,
+        usage=usage,
+        speeds=[window.average_speed() for window in windows],
+        first_packet=first_packet
+    )
+
+def print_results(results: List[BenchmarkResult]) -> None:
+    """Print one row per run."""
+    print(f"{'Mode':<8}{'Dests':>6}{'Procs':>6}{'CPU s/dest':>12}{'CPU %/dest':>12}"
+          f"{'RSS MB':>9}{'Speed':>8}{'First pkt s':>13}")
+    for r in results:
+        print(f"{r.mode:<8}{r.destinations:>6}{r.processes:>6}"
+              f"{r.cpu_per_destination:>12.2f}{r.cpu_percent_per_destination:>12.1f}"
+              f"{r.rss_mb:>9.1f}{format_optional(r.min_speed, '{:.2f}x'):>8}"
+              f"{format_optional(r.max_first_packet, '{:.2f}'):>13}")
+
+def main():
+    """
+    Benchmark stream forwarding against local sinks, no platform needed.
+    Usage: python streamBenchmark.py [--modes single,tee] [--max 6] [--duration 30]
+    """
+    parser = argparse.ArgumentParser(description="Offline restream benchmark")
+    parser.add_argument('--modes', default=f"{FORWARD_MODE_SINGLE},{FORWARD_MODE_TEE}",
+                        help="Comma separated forwarding modes to compare")
+    parser.add_argument('--min', type=int, default=1, help="Fewest destinations")
+    parser.add_argument('--max', type=int, default=BENCHMARK_MAX_DESTINATIONS,
+                        help="Most destinations")
+    parser.add_argument('--duration', type=float, default=BENCHMARK_DURATION_SECONDS,
+                        help="Seconds to forward per run")
+    parser.add_argument('--platform', default=BENCHMARK_PLATFORM,
+                        help="Platform whose rendition every destination gets")
+    args = parser.parse_args()
+
+    modes = [mode.strip() for mode in args.modes.split(',') if mode.strip()]
+    for mode in modes:
+        if mode not in (FORWARD_MODE_SINGLE, FORWARD_MODE_TEE):
+            print(f"Unknown forwarding mode: {mode}")
+            sys.exit(1)
+
+    work_dir = tempfile.mkdtemp(prefix='restream-bench-')
+    source_path = os.path.join(work_dir, 'source.flv')
+    try:
+        print("Rendering synthetic source...")
+        # Looped by the stand-ins, so a short clip is enough
+        render_source(source_path, min(args.duration, 10))
+
+        results = []
+        for mode in modes:
+            for count in range(args.min, args.max + 1):
+                print(f"Benchmarking {mode} mode with {count} destination(s)...")
+                results.append(run_benchmark(source_path, mode, count,
+                                             args.duration, args.platform))
+        print()
+        print_results(results)
+    except ffmpeg.Error as e:
+        print(f"FFmpeg error occurred: {e.stderr.decode() if e.stderr else str(e)}")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        print("\nBenchmark interrupted by user")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
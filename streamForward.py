@@ -1,12 +1,306 @@
+import os
 import sys
+import math
 import ffmpeg
 import subprocess
+from dataclasses import dataclass
+from platformProfiles import Rendition, profile_for
 from constants import (
-    FFMPEG_PRESET, FFMPEG_CRF, VIDEO_BITRATE, AUDIO_BITRATE,
-    VIDEO_CODEC, RTMP_LOCAL_PORT, PORTRAIT, AUDIO_CODEC
+    FFMPEG_CRF, AUDIO_BITRATE,
+    VIDEO_CODEC, RTMP_LOCAL_PORT, PORTRAIT, AUDIO_CODEC,
+    FORWARD_MODE, FORWARD_MODE_TEE, TEE_SLAVE_OPTIONS, RTMPS_PREFIX,
+    PROBE_TIMEOUT_US, PASSTHROUGH_VIDEO_CODECS,
+    PASSTHROUGH_AUDIO_CODECS, PASSTHROUGH_VIDEO_PROFILES,
+    RENDITION_COPY, PLATFORM_PROFILE_DEFAULT, DERIVE_PORTRAIT, DERIVED_PORTRAIT_SOURCE,
+    PORTRAIT_CROP_WIDTH, PORTRAIT_MODE, LATENCY_PROFILE, LATENCY_PROFILES,
+    FORWARD_MODE_REPLAY, REPLAY_SEGMENT_SECONDS, REPLAY_BUFFER_SECONDS,
+    OBS_RESERVED_CORES, FORWARDER_NICE, FORWARDER_SCHED_BATCH
 )
 
-def create_ffmpeg_stream(orientation: str, url: str, key: str) -> subprocess.Popen | None:
+@dataclass
+class Destination:
+    """A restream target resolved by one of the platform setup modules"""
+    platform: str
+    orientation: str
+    url: str
+    key: str
+
+    @property
+    def output_url(self) -> str:
+        """Full RTMP URL including the stream key"""
+        url = self.url if self.url.endswith('/') else self.url + '/'
+        return f"{url}{self.key}"
+
+@dataclass
+class SourceInfo:
+    """Codec details of the local input as reported by ffprobe"""
+    video_codec: str
+    video_profile: str
+    video_bitrate: int | None
+    audio_codec: str | None
+    width: int | None = None
+    height: int | None = None
+    fps: float | None = None
+    keyframe_seconds: float | None = None  # Measured by the relay; ffprobe cannot tell
+
+def _input_url(orientation: str) -> str:
+    """Local nginx-rtmp application the given orientation is published to."""
+    return f"rtmp://localhost:{RTMP_LOCAL_PORT}/live/{orientation}"
+
+def is_derived(destination: Destination) -> bool:
+    """Whether a destination is cropped out of the landscape input."""
+    return DERIVE_PORTRAIT and destination.orientation.lower() == PORTRAIT_MODE
+
+def input_orientation(destination: Destination) -> str:
+    """Local application a destination's forwarder reads from."""
+    return DERIVED_PORTRAIT_SOURCE if is_derived(destination) else destination.orientation
+
+def _input(input_url: str, latency: str = LATENCY_PROFILE):
+    """Open the local flv input with the latency profile's demuxer flags."""
+    return ffmpeg.input(input_url, f='flv', **LATENCY_PROFILES[latency]['input'])
+
+def _muxer_options(latency: str = LATENCY_PROFILE) -> dict:
+    """Output buffering settings of a latency profile."""
+    return LATENCY_PROFILES[latency]['muxer']
+
+def _encoder_options(rendition: Rendition,
+                     latency: str = LATENCY_PROFILE,
+                     video_bitrate: int | None = None,
+                     threads: int | None = None) -> dict:
+    """
+    Encoder settings shared by every forwarding mode.
+
+    video_bitrate (kbps) replaces the rendition's bitrate and cap, which
+    is how the adaptive bitrate controller steps a destination. threads
+    sizes the encoder to the cores the CPU budget gave it.
+    """
+    bitrate = video_bitrate or rendition.video_bitrate_kbps
+    options = {
+        'vcodec': VIDEO_CODEC,
+        'acodec': AUDIO_CODEC,
+        'preset': rendition.preset,
+        'crf': FFMPEG_CRF,
+        # Cap the CRF encode so a rendition never exceeds its bitrate
+        'video_bitrate': f"{bitrate}k",
+        'maxrate': f"{bitrate}k",
+        'bufsize': f"{bitrate * 2}k",
+        'audio_bitrate': AUDIO_BITRATE,
+        # Keyframes on the platform's interval whatever the source frame rate
+        'force_key_frames': f"expr:gte(t,n_forced*{rendition.keyframe_seconds})",
+    }
+    if threads:
+        options['threads'] = threads
+    options.update(LATENCY_PROFILES[latency]['encoder'])
+    return options
+
+def rendition_for(platform: str) -> Rendition:
+    """Rendition a platform receives when its stream is re-encoded."""
+    return profile_for(platform).rendition
+
+def _apply_rendition(video, rendition: Rendition, crop_portrait: bool = False):
+    """Add the crop, fps and scale filters for a rendition, never upscaling."""
+    if crop_portrait:
+        video = video.filter('crop', w=PORTRAIT_CROP_WIDTH, h='ih')
+    if rendition.max_fps:
+        video = video.filter('fps', fps=f"min(source_fps,{rendition.max_fps})")
+    if rendition.max_height:
+        video = video.filter('scale', w=f"min({rendition.max_width},iw)",
+                             h=f"min({rendition.max_height},ih)",
+                             force_original_aspect_ratio='decrease', force_divisible_by=2)
+    return video
+
+def _escape_tee_url(url: str) -> str:
+    """Escape characters the tee muxer treats as slave separators."""
+    for char in ('\\', '|', '[', ']'):
+        url = url.replace(char, '\\' + char)
+    return url
+
+def _tee_slave_options(url: str) -> str:
+    """
+    Slave options for one tee destination.
+
+    Unlike a plain output, tee slaves get no tls_verify by default, so
+    rtmps slaves ask for it to check the ingest's certificate as the
+    single-process path does. Plain rtmp slaves must not get it: tee
+    fails on options the slave's protocol does not consume.
+    """
+    if url.startswith(RTMPS_PREFIX):
+        return f"{TEE_SLAVE_OPTIONS}:tls_verify=1"
+    return TEE_SLAVE_OPTIONS
+
+def _tee_target(destinations: list[Destination]) -> str:
+    """Build the tee muxer output spec, one flv slave per destination."""
+    return '|'.join(
+        f"[{_tee_slave_options(d.output_url)}]{_escape_tee_url(d.output_url)}"
+        for d in destinations
+    )
+
+def _probe_fps(video: dict) -> float | None:
+    """Frame rate of the video stream from ffprobe's 'num/den' rates."""
+    for field in ('avg_frame_rate', 'r_frame_rate'):
+        num, _, den = str(video.get(field, '')).partition('/')
+        try:
+            if float(num) > 0 and float(den or 1) > 0:
+                return float(num) / float(den or 1)
+        except ValueError:
+            continue
+    return None
+
+def _probe_video_bitrate(video: dict, fmt: dict) -> int | None:
+    """Read the video bitrate from the stream, or from the flv onMetaData tags."""
+    if video.get('bit_rate'):
+        return int(video['bit_rate'])
+    # OBS announces its configured rate (in kbps) through onMetaData
+    data_rate = fmt.get('tags', {}).get('videodatarate')
+    if data_rate:
+        return int(float(data_rate) * 1000)
+    return None
+
+def probe_input(orientation: str) -> SourceInfo | None:
+    """
+    Probe the local input for an orientation.
+
+    Returns None when nothing is being published yet or ffprobe fails,
+    in which case callers should re-encode.
+    """
+    try:
+        info = ffmpeg.probe(_input_url(orientation), rw_timeout=PROBE_TIMEOUT_US)
+    except ffmpeg.Error as e:
+        print(f"Could not probe {orientation} input: {e.stderr.decode() if e.stderr else str(e)}")
+        return None
+    except Exception as e:
+        print(f"Could not probe {orientation} input: {str(e)}")
+        return None
+
+    streams = info.get('streams', [])
+    video = next((s for s in streams if s.get('codec_type') == 'video'), None)
+    audio = next((s for s in streams if s.get('codec_type') == 'audio'), None)
+    if not video:
+        return None
+
+    return SourceInfo(
+        video_codec=video.get('codec_name', ''),
+        video_profile=video.get('profile', ''),
+        video_bitrate=_probe_video_bitrate(video, info.get('format', {})),
+        audio_codec=audio.get('codec_name') if audio else None,
+        width=video.get('width'),
+        height=video.get('height'),
+        fps=_probe_fps(video)
+    )
+
+def passthrough_blockers(source: SourceInfo | None, platform: str) -> list[str]:
+    """
+    Every reason the source cannot be stream-copied to a platform.
+
+    The source has to meet each cap of the platform's profile: bitrate,
+    resolution, frame rate and keyframe interval. A bitrate, size or
+    frame rate ffprobe did not report cannot be checked, so it blocks;
+    the keyframe interval is only known through the relay and is
+    checked where it was measured.
+    """
+    if source is None:
+        return ["input not probed"]
+    profile = profile_for(platform)
+    rendition = profile.rendition
+    blockers = []
+    if (source.video_codec not in PASSTHROUGH_VIDEO_CODECS
+            or source.video_profile not in PASSTHROUGH_VIDEO_PROFILES
+            or source.audio_codec not in PASSTHROUGH_AUDIO_CODECS):
+        blockers.append(f"{source.video_codec} {source.video_profile}/{source.audio_codec} not copyable")
+    if source.video_bitrate is None:
+        blockers.append("unknown bitrate")
+    elif source.video_bitrate > profile.max_video_bitrate_kbps * 1000:
+        blockers.append(f"{source.video_bitrate // 1000}k over {profile.max_video_bitrate_kbps}k")
+    if rendition.max_width and rendition.max_height:
+        if not (source.width and source.height):
+            blockers.append("unknown resolution")
+        elif source.width > rendition.max_width or source.height > rendition.max_height:
+            blockers.append(f"{source.width}x{source.height} over {rendition.max_width}x{rendition.max_height}")
+    if rendition.max_fps:
+        if not source.fps:
+            blockers.append("unknown frame rate")
+        # Allow for 29.97 and the like under a 30 cap
+        elif source.fps > rendition.max_fps + 0.5:
+            blockers.append(f"{source.fps:g}fps over {rendition.max_fps}fps")
+    # One frame of slack for timestamp rounding
+    frame = 1 / source.fps if source.fps else 0
+    if source.keyframe_seconds and source.keyframe_seconds > rendition.keyframe_seconds + frame:
+        blockers.append(f"{source.keyframe_seconds:g}s keyframes over {rendition.keyframe_seconds:g}s")
+    return blockers
+
+def can_passthrough(source: SourceInfo | None, platform: str) -> bool:
+    """Check whether the source can be stream-copied to a platform as-is."""
+    return not passthrough_blockers(source, platform)
+
+def _run(stream) -> subprocess.Popen:
+    """
+    Start a compiled ffmpeg graph without blocking.
+
+    Output is left on the terminal; piping it without anyone reading
+    would block ffmpeg once the pipe fills up.
+    """
+    return ffmpeg.run_async(
+        stream,
+        overwrite_output=True
+    )
+
+def build_single_output(orientation: str, url: str, key: str,
+                        passthrough: bool = False,
+                        rendition: Rendition | None = None,
+                        crop_portrait: bool = False,
+                        input_url: str | None = None,
+                        latency: str = LATENCY_PROFILE,
+                        video_bitrate: int | None = None,
+                        threads: int | None = None):
+    """
+    Build the graph for forwarding to a single destination.
+
+    Args:
+        orientation: Stream orientation ('PORTRAIT' or 'LANDSCAPE')
+        url: RTMP URL
+        key: Stream key
+        passthrough: Copy the input packets instead of re-encoding
+        rendition: Rendition to encode when not passing through, the
+            default profile's if None
+        crop_portrait: Crop a portrait frame out of a landscape input
+        input_url: Read from this URL instead of the local application
+        latency: Latency profile to encode and mux with
+        video_bitrate: Bitrate cap in kbps overriding the rendition's
+        threads: Encoder thread count, None for ffmpeg's default
+    """
+    # Ensure URL ends with /
+    if not url.endswith('/'):
+        url += '/'
+
+    # Build input/output URLs
+    input_url = input_url or _input_url(orientation)
+    output_url = f"{url}{key}"
+
+    # Create stream with input options
+    stream = _input(input_url, latency)
+
+    # Add output options
+    if passthrough:
+        video = stream.video
+        codec_options = {'c': 'copy'}
+    else:
+        rendition = rendition or rendition_for(PLATFORM_PROFILE_DEFAULT)
+        video = _apply_rendition(stream.video, rendition, crop_portrait)
+        codec_options = _encoder_options(rendition, latency, video_bitrate, threads)
+    return ffmpeg.output(
+        video,
+        stream.audio,
+        output_url,
+        **codec_options,
+        **_muxer_options(latency),
+        format='flv',
+        tls_verify=1
+    )
+
+def create_ffmpeg_stream(orientation: str, url: str, key: str,
+                         passthrough: bool = False,
+                         rendition: Rendition | None = None,
+                         crop_portrait: bool = False) -> subprocess.Popen | None:
     """
     Create FFmpeg stream using ffmpeg-python library.
 
@@ -14,45 +308,16 @@ def create_ffmpeg_stream(orientation: str, url: str, key: str) -> subprocess.Pop
         orientation: Stream orientation ('PORTRAIT' or 'LANDSCAPE')
         url: RTMP URL
         key: Stream key
+        passthrough: Copy the input packets instead of re-encoding
+        rendition: Rendition to encode when not passing through
+        crop_portrait: Crop a portrait frame out of a landscape input
     """
     try:
-        # Ensure URL ends with /
-        if not url.endswith('/'):
-            url += '/'
-
-        # Build input/output URLs
-        input_url = f"rtmp://localhost:{RTMP_LOCAL_PORT}/live/{orientation}"
-        output_url = f"{url}{key}"
-
-        # Create stream with input options
-        stream = ffmpeg.input(
-            input_url,
-            f='flv'  # Input format
-        )
-
-        # Add output options
-        stream = ffmpeg.output(
-            stream,
-            output_url,
-            vcodec=VIDEO_CODEC,
-            acodec=AUDIO_CODEC,
-            preset=FFMPEG_PRESET,
-            crf=FFMPEG_CRF,
-            video_bitrate=VIDEO_BITRATE,
-            audio_bitrate=AUDIO_BITRATE,
-            format='flv',
-            tls_verify=1
-        )
-
-        # Run the stream (non-blocking)
-        process = ffmpeg.run_async(
-            stream,
-            quiet=True,
-            overwrite_output=True
-        )
-
-        # Keep the process reference
-        return process
+        stream = build_single_output(orientation, url, key, passthrough,
+                                     rendition, crop_portrait)
+
+        # Run the stream (non-blocking) and keep the process reference
+        return _run(stream)
 
     except ffmpeg.Error as e:
         print(f"FFmpeg error occurred: {e.stderr.decode() if e.stderr else str(e)}")
@@ -61,6 +326,291 @@ def create_ffmpeg_stream(orientation: str, url: str, key: str) -> subprocess.Pop
         print(f"An error occurred: {str(e)}")
         sys.exit(1)
 
+def plan_renditions(destinations: list[Destination],
+                    source: SourceInfo | None = None) -> dict[tuple[str, bool], list[Destination]]:
+    """
+    Group destinations by the encode they receive.
+
+    Keys are (rendition, crop_portrait) pairs; stream-copied destinations
+    are grouped under (RENDITION_COPY, False). Derived portrait
+    destinations always need their own encode.
+    """
+    plan = {}
+    for destination in destinations:
+        derived = is_derived(destination)
+        if not derived and can_passthrough(source, destination.platform):
+            key = (RENDITION_COPY, False)
+        else:
+            key = (rendition_for(destination.platform), derived)
+        plan.setdefault(key, []).append(destination)
+    return plan
+
+def _split_video(video, count: int) -> list:
+    """Split one decoded video stream into count branches."""
+    if count == 1:
+        return [video]
+    split = video.filter_multi_output('split', count)
+    return [split.stream(i) for i in range(count)]
+
+def build_tee_output(orientation: str, destinations: list[Destination],
+                     source: SourceInfo | None = None,
+                     input_url: str | None = None,
+                     latency: str = LATENCY_PROFILE,
+                     threads: int | None = None):
+    """
+    Build a single-encode graph that fans out to several destinations.
+
+    The local input is decoded once and split into one encoder per
+    rendition; the tee muxer then copies each rendition's packets to
+    every destination mapped to it. Each slave uses onfail=ignore so a
+    dead ingest is dropped without stopping the rest. Destinations the
+    probed source already satisfies get a tee output that stream-copies
+    the input instead, and derived portrait destinations get a cropped
+    branch of the same decode.
+
+    Args:
+        orientation: Local application to read from
+        destinations: Destinations reading from that application
+        source: Probe result for the input, if available
+        input_url: Read from this URL instead of the local application
+        latency: Latency profile to encode and mux with
+        threads: Thread count of each rendition's encoder
+    """
+    stream = _input(input_url or _input_url(orientation), latency)
+    plan = plan_renditions(destinations, source)
+
+    # tee needs explicit stream maps and global headers for flv slaves
+    outputs = []
+    copy_key = (RENDITION_COPY, False)
+    if copy_key in plan:
+        outputs.append(ffmpeg.output(
+            stream.video,
+            stream.audio,
+            _tee_target(plan.pop(copy_key)),
+            c='copy',
+            **_muxer_options(latency),
+            format='tee'
+        ))
+
+    branches = _split_video(stream.video, len(plan)) if plan else []
+    for branch, ((rendition, crop_portrait), group) in zip(branches, plan.items()):
+        outputs.append(ffmpeg.output(
+            _apply_rendition(branch, rendition, crop_portrait),
+            stream.audio,
+            _tee_target(group),
+            **_encoder_options(rendition, latency, threads=threads),
+            **_muxer_options(latency),
+            flags='+global_header',
+            format='tee'
+        ))
+    return ffmpeg.merge_outputs(*outputs)
+
+def build_replay_output(orientation: str, pattern: str,
+                        input_url: str | None = None,
+                        latency: str = LATENCY_PROFILE):
+    """
+    Build a graph that records the input into a ring of segments.
+
+    The packets are copied as published, so recording costs no encode.
+    segment_wrap reuses file numbers once REPLAY_BUFFER_SECONDS are on
+    disk, which keeps the ring at a fixed size.
+    """
+    stream = _input(input_url or _input_url(orientation), latency)
+    return ffmpeg.output(
+        stream.video,
+        stream.audio,
+        pattern,
+        c='copy',
+        format='segment',
+        segment_format='flv',
+        segment_time=REPLAY_SEGMENT_SECONDS,
+        segment_wrap=math.ceil(REPLAY_BUFFER_SECONDS / REPLAY_SEGMENT_SECONDS) + 1
+    )
+
+@dataclass
+class ForwardJob:
+    """The destinations served by one ffmpeg process"""
+    orientation: str
+    destinations: list[Destination]
+    mode: str = FORWARD_MODE
+    input_url: str | None = None  # Overrides the local application, e.g. for benchmarks
+    latency: str = LATENCY_PROFILE
+    video_bitrate: int | None = None  # kbps, set by the adaptive bitrate controller
+    copy: bool = False  # Always stream copy, e.g. pushing an encode out of the relay
+    label: str | None = None  # Status name for jobs not named after their destinations
+    cpus: list[int] | None = None  # Cores the process is pinned to by the CPU budget
+    threads: int | None = None  # Threads per encoder, matching its share of cpus
+    output_path: str | None = None  # File or segment pattern a recording job writes, not a destination
+
+    @property
+    def name(self) -> str:
+        """Short label for status output"""
+        if self.label:
+            return self.label
+        return f"{self.orientation}:{'+'.join(d.platform for d in self.destinations)}"
+
+def group_by_orientation(destinations: list[Destination]) -> dict[str, list[Destination]]:
+    """Group destinations by the local application they read from."""
+    groups = {}
+    for destination in destinations:
+        groups.setdefault(input_orientation(destination), []).append(destination)
+    return groups
+
+def plan_jobs(destinations: list[Destination], mode=FORWARD_MODE) -> list[ForwardJob]:
+    """
+    Split destinations into ffmpeg processes.
+
+    In tee mode one job is planned per orientation; otherwise each
+    destination gets its own job.
+    """
+    jobs = []
+    for orientation, group in group_by_orientation(destinations).items():
+        if mode == FORWARD_MODE_TEE:
+            jobs.append(ForwardJob(orientation, group, mode))
+        else:
+            jobs.extend(ForwardJob(orientation, [d], mode) for d in group)
+    return jobs
+
+def describe_plan(job: ForwardJob, source: SourceInfo | None) -> None:
+    """Print how each destination of a job is going to be served."""
+    if job.mode == FORWARD_MODE_REPLAY:
+        print(f"Recording {job.orientation} into the replay buffer ({REPLAY_BUFFER_SECONDS}s)")
+        return
+    for destination in job.destinations:
+        if is_derived(destination):
+            action = f"portrait crop {rendition_for(destination.platform)}"
+        elif can_passthrough(source, destination.platform):
+            action = "stream copy"
+        else:
+            reasons = ', '.join(passthrough_blockers(source, destination.platform))
+            action = f"re-encode {rendition_for(destination.platform)}: {reasons}"
+        print(f"Forwarding {job.orientation} to {destination.platform} ({action})")
+
+def build_job_output(job: ForwardJob, source: SourceInfo | None = None):
+    """Build the ffmpeg graph for a job in its forwarding mode."""
+    if job.mode == FORWARD_MODE_TEE:
+        return build_tee_output(job.orientation, job.destinations, source,
+                                job.input_url, job.latency, job.threads)
+    if job.mode == FORWARD_MODE_REPLAY:
+        return build_replay_output(job.orientation, job.output_path, job.input_url, job.latency)
+
+    destination = job.destinations[0]
+    derived = is_derived(destination)
+    return build_single_output(
+        job.orientation, destination.url, destination.key,
+        passthrough=job.copy or (not derived and can_passthrough(source, destination.platform)),
+        rendition=rendition_for(destination.platform),
+        crop_portrait=derived,
+        input_url=job.input_url,
+        latency=job.latency,
+        video_bitrate=job.video_bitrate,
+        threads=job.threads
+    )
+
+def count_encoders(job: ForwardJob, source: SourceInfo | None = None) -> int:
+    """Number of video encoders a job's process runs."""
+    if job.copy or job.mode == FORWARD_MODE_REPLAY:
+        return 0
+    if job.mode == FORWARD_MODE_TEE:
+        return len([key for key in plan_renditions(job.destinations, source) if key[0] != RENDITION_COPY])
+    destination = job.destinations[0]
+    return 1 if is_derived(destination) or not can_passthrough(source, destination.platform) else 0
+
+def usable_cpus() -> list[int]:
+    """Cores this program may run on, in order."""
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+def plan_cpu_budget(encoder_counts: list[int], cpus: list[int] | None = None,
+                    reserve: int = OBS_RESERVED_CORES) -> list[tuple[list[int], int]]:
+    """
+    Split the cores OBS does not need between encoding processes.
+
+    encoder_counts holds the number of encoders of each process. The
+    lowest `reserve` cores are left to OBS and the rest are dealt out
+    in contiguous runs, an equal share per encoder. Returns a (cpus,
+    threads per encoder) pair for every process; processes without an
+    encoder get the whole pool and no thread count. With more encoders
+    than cores, encoders share cores round robin with one thread each.
+    """
+    cpus = cpus if cpus is not None else usable_cpus()
+    # Never reserve every core, the forwarders have to run somewhere
+    pool = cpus[min(reserve, len(cpus) - 1):]
+    encoders = sum(encoder_counts)
+    budget = []
+    next_encoder = 0
+    for count in encoder_counts:
+        if count == 0:
+            budget.append((pool, None))
+            continue
+        if encoders <= len(pool):
+            share = len(pool) // encoders
+            # The first len(pool) % encoders encoders get one core more
+            extra = len(pool) % encoders
+            start = next_encoder * share + min(next_encoder, extra)
+            end = (next_encoder + count) * share + min(next_encoder + count, extra)
+            budget.append((pool[start:end], max(1, (end - start) // count)))
+        else:
+            assigned = {pool[(next_encoder + i) % len(pool)] for i in range(count)}
+            budget.append((sorted(assigned), 1))
+        next_encoder += count
+    return budget
+
+def _process_threads(pid: int) -> list[int]:
+    """Thread ids of a running process, just the pid where /proc is missing."""
+    try:
+        return [int(tid) for tid in os.listdir(f"/proc/{pid}/task")]
+    except OSError:
+        return [pid]
+
+def limit_process(pid: int, cpus: list[int] | None = None) -> None:
+    """
+    Pin a freshly started process to cpus and lower its priority below OBS.
+
+    Applied to every thread by id right after the spawn, since running
+    Python code between fork and exec (preexec_fn) can deadlock the
+    child while other threads of this program hold locks. ffmpeg is
+    still single-threaded that early, and the threads it starts later
+    inherit the limits. Limits the platform lacks are skipped.
+    """
+    niceness = None
+    if FORWARDER_NICE and hasattr(os, 'setpriority'):
+        niceness = min(19, os.getpriority(os.PRIO_PROCESS, 0) + FORWARDER_NICE)
+    for tid in _process_threads(pid):
+        try:
+            if cpus and hasattr(os, 'sched_setaffinity'):
+                os.sched_setaffinity(tid, cpus)
+            if FORWARDER_SCHED_BATCH and hasattr(os, 'SCHED_BATCH'):
+                os.sched_setscheduler(tid, os.SCHED_BATCH, os.sched_param(0))
+            if niceness is not None:
+                os.setpriority(os.PRIO_PROCESS, tid, niceness)
+        except OSError:
+            # The thread or process exited in the meantime
+            pass
+
+def set_process_affinity(pid: int, cpus: list[int]) -> None:
+    """Move every thread of a running process onto cpus."""
+    if not hasattr(os, 'sched_setaffinity'):
+        return
+    for tid in _process_threads(pid):
+        try:
+            os.sched_setaffinity(tid, cpus)
+        except OSError:
+            # The thread exited in the meantime
+            pass
+
+def job_command(job: ForwardJob, source: SourceInfo | None = None) -> list[str]:
+    """
+    Build the ffmpeg command line for a supervised job.
+
+    ffmpeg writes key=value progress blocks to stdout and its log to
+    stderr; whoever runs the command must drain both pipes.
+    """
+    stream = build_job_output(job, source).global_args(
+        '-progress', 'pipe:1', '-nostats')
+    return ffmpeg.compile(stream, overwrite_output=True)
+
 def forward_stream(orientation=PORTRAIT, url="", key="") -> subprocess.Popen | None:
     """Forward stream using FFmpeg with specified parameters."""
     return create_ffmpeg_stream(orientation, url, key)
@@ -69,10 +619,17 @@ def main():
     """
     Main function to start the stream forwarding.
     Usage: python streamForward.py [orientation] [url] [key]
+           python streamForward.py calibrate [--encodes N] [--seconds 10] [--dry-run]
     Default orientation is PORTRAIT if not specified
     """
     args = sys.argv[1:]
 
+    if args and args[0] == 'calibrate':
+        # Imported here, the calibration builds its encodes with this module
+        from presetCalibration import main as calibrate
+        calibrate(args[1:])
+        return
+
     if len(args) == 0:
         process = forward_stream()
     elif len(args) == 3:
@@ -0,0 +1,47 @@
+from bitrateController import BitrateController, OutputHealth
+from constants import ABR_MIN_KBPS, ABR_STEP_DOWN, ABR_STEP_UP_KBPS, ABR_STEP_UP_AFTER, ABR_COOLDOWN_SECONDS
+
+def health(**overrides) -> OutputHealth:
+    fields = dict(encode_speed=1.0, output_speed=1.0, queued=0, dropped_frames=0, dropped_messages=0)
+    fields.update(overrides)
+    return OutputHealth(**fields)
+
+def test_slow_encode_steps_down():
+    controller = BitrateController(6000, 6000)
+    assert controller.update(health(encode_speed=0.8), now=0) == int(6000 * ABR_STEP_DOWN)
+    assert controller.reason == 'encode speed 0.80x'
+
+def test_changes_wait_out_the_cooldown():
+    controller = BitrateController(6000, 6000)
+    controller.update(health(output_speed=0.5), now=0)
+    assert controller.update(health(output_speed=0.5), now=ABR_COOLDOWN_SECONDS - 1) is None
+    assert controller.update(health(output_speed=0.5), now=ABR_COOLDOWN_SECONDS) is not None
+    assert controller.changes == 2
+
+def test_new_drops_count_against_the_previous_observation():
+    controller = BitrateController(6000, 6000)
+    assert controller.update(health(dropped_frames=40), now=0) is None
+    assert controller.update(health(dropped_frames=40), now=1) is None
+    assert controller.update(health(dropped_frames=45), now=2) == int(6000 * ABR_STEP_DOWN)
+    assert controller.reason == '5 frames dropped'
+
+def test_growing_queue_is_congestion():
+    controller = BitrateController(6000, 6000)
+    controller.update(health(queued=100), now=0)
+    assert controller.congestion(health(queued=150)) == 'output queue growing (150 messages)'
+    assert controller.congestion(health(queued=90)) is None
+
+def test_clean_period_steps_up_to_the_ceiling():
+    controller = BitrateController(5000, 6000)
+    assert controller.update(health(), now=0) is None
+    assert controller.update(health(), now=ABR_STEP_UP_AFTER) == 5000 + ABR_STEP_UP_KBPS
+    now = ABR_STEP_UP_AFTER
+    for _ in range(5):
+        now += ABR_STEP_UP_AFTER + ABR_COOLDOWN_SECONDS
+        controller.update(health(), now=now)
+    assert controller.bitrate_kbps == 6000
+
+def test_never_steps_below_the_floor():
+    controller = BitrateController(ABR_MIN_KBPS, 6000)
+    assert controller.update(health(encode_speed=0.1), now=0) is None
+    assert controller.bitrate_kbps == ABR_MIN_KBPS
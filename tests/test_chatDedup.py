@@ -0,0 +1,31 @@
+from chatDedup import RecentIds
+
+def test_second_sighting_is_a_duplicate():
+    ids = RecentIds(capacity=10, window=60)
+    assert not ids.seen('a', now=0)
+    assert ids.seen('a', now=1)
+    assert ids.hits == 1
+
+def test_ids_expire_after_the_window():
+    ids = RecentIds(capacity=10, window=60)
+    ids.seen('a', now=0)
+    assert not ids.seen('a', now=61)
+    assert ids.expirations == 1
+
+def test_sighting_refreshes_the_window():
+    ids = RecentIds(capacity=10, window=60)
+    ids.seen('a', now=0)
+    ids.seen('a', now=50)
+    assert ids.seen('a', now=100)
+    assert ids.expirations == 0
+
+def test_capacity_evicts_the_least_recently_seen():
+    ids = RecentIds(capacity=2, window=60)
+    ids.seen('a', now=0)
+    ids.seen('b', now=1)
+    ids.seen('a', now=2)
+    ids.seen('c', now=3)
+    assert len(ids) == 2
+    assert ids.evictions == 1
+    assert ids.seen('a', now=4)
+    assert not ids.seen('b', now=5)
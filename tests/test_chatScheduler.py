@@ -0,0 +1,51 @@
+from chatScheduler import PollSchedule, retry_after
+from constants import CHAT_POLL_TARGET_MESSAGES, CHAT_POLL_RATE_LIMIT_COOLDOWN
+
+class TooManyRequests(Exception):
+    def __init__(self, headers=None):
+        super().__init__('429')
+        self.status = 429
+        self.response = type('Response', (), {'headers': headers or {}})()
+
+class PleaseWaitFewMinutes(Exception):
+    pass
+
+def test_retry_after():
+    assert retry_after(ValueError('boom')) is None
+    assert retry_after(TooManyRequests({'Retry-After': '90'})) == 90.0
+    assert retry_after(TooManyRequests()) == 0.0
+    assert retry_after(PleaseWaitFewMinutes()) == 0.0
+
+def test_quiet_chat_backs_off_to_the_maximum():
+    schedule = PollSchedule('kick', 2, 30)
+    now = 0
+    for _ in range(20):
+        interval = schedule.record_poll(0, now=now)
+        now += interval
+    assert interval == 30
+
+def test_busy_chat_polls_for_the_target_per_poll():
+    schedule = PollSchedule('kick', 1, 30)
+    schedule.record_poll(0, now=0)
+    # 20 messages in 10 seconds
+    interval = schedule.record_poll(20, now=10)
+    assert interval == CHAT_POLL_TARGET_MESSAGES / 2
+
+def test_backlog_of_only_new_messages_polls_at_the_minimum():
+    schedule = PollSchedule('instagram', 2, 30)
+    schedule.record_poll(0, now=0)
+    schedule.record_poll(0, now=5)
+    # Every message the poll returned was new, so some may have scrolled past
+    assert schedule.record_poll(20, returned=20, now=10) == 2
+
+def test_errors_back_off():
+    schedule = PollSchedule('kick', 2, 30)
+    assert schedule.record_error(ValueError('boom'), now=0) == 4
+    assert schedule.errors == 1
+
+def test_rate_limit_holds_through_the_cooldown():
+    schedule = PollSchedule('kick', 2, 30)
+    assert schedule.record_error(TooManyRequests({'Retry-After': '45'}), now=0) == 45
+    assert schedule.rate_limits == 1
+    assert schedule.record_poll(50, returned=50, now=CHAT_POLL_RATE_LIMIT_COOLDOWN - 1) == 45
+    assert schedule.record_poll(50, returned=50, now=CHAT_POLL_RATE_LIMIT_COOLDOWN + 1) == 2
@@ -0,0 +1,121 @@
+import asyncio
+import pytest
+from rtmpRelay import (
+    RtmpSession, RelayStream, RtmpMessage, amf_encode, amf_decode,
+    MSG_AUDIO, MSG_VIDEO, MSG_AMF0_DATA, MSG_AMF0_COMMAND, CSID_VIDEO, CSID_COMMAND,
+    EXTENDED_TIMESTAMP, MEDIA_STREAM_ID
+)
+
+KEYFRAME = bytes([0x17, 1, 0, 0, 0])
+INTER_FRAME = bytes([0x27, 1, 0, 0, 0])
+AVC_HEADER = bytes([0x17, 0, 0, 0, 0])
+AAC_FRAME = bytes([0xAF, 1])
+
+class FakeWriter:
+    def __init__(self):
+        self.data = bytearray()
+        self.closed = False
+
+    def write(self, data):
+        self.data += data
+
+    def writelines(self, parts):
+        for part in parts:
+            self.data += part
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def get_extra_info(self, name):
+        return ('127.0.0.1', 0)
+
+class FakePublisher:
+    def __init__(self):
+        self.writer = FakeWriter()
+        self.peer = 'publisher'
+
+def round_trip(messages, chunk_size=128):
+    """Chunk messages with one session and read them back with another."""
+    async def run():
+        writer = FakeWriter()
+        sender = RtmpSession(None, None, writer)
+        sender.out_chunk_size = chunk_size
+        for csid, type_id, timestamp, payload in messages:
+            sender.send(csid, type_id, MEDIA_STREAM_ID, timestamp, payload)
+        reader = asyncio.StreamReader()
+        reader.feed_data(bytes(writer.data))
+        reader.feed_eof()
+        receiver = RtmpSession(None, reader, FakeWriter())
+        receiver.in_chunk_size = chunk_size
+        return [await receiver.read_message() for _ in messages]
+    return asyncio.run(run())
+
+def test_amf_round_trip():
+    values = ['connect', 1.0, None, True, {'app': 'live', 'tcUrl': 'rtmp://127.0.0.1/live', 'n': 2.5}]
+    assert amf_decode(amf_encode(*values)) == values
+
+def test_amf_long_string():
+    text = 'x' * 70000
+    assert amf_decode(amf_encode(text)) == [text]
+
+def test_amf_rejects_unknown_types():
+    with pytest.raises(TypeError):
+        amf_encode(object())
+
+def test_chunks_reassemble_into_messages():
+    payload = bytes(range(256)) * 3
+    received = round_trip([(CSID_VIDEO, MSG_VIDEO, 40, payload),
+                           (CSID_COMMAND, MSG_AMF0_COMMAND, 0, amf_encode('play', 2.0, None))])
+    assert received[0].type_id == MSG_VIDEO
+    assert received[0].timestamp == 40
+    assert received[0].payload == payload
+    assert received[0].stream_id == MEDIA_STREAM_ID
+    assert amf_decode(received[1].payload) == ['play', 2.0, None]
+
+def test_extended_timestamp_on_every_chunk():
+    timestamp = EXTENDED_TIMESTAMP + 1000
+    payload = b'a' * 300
+    received = round_trip([(CSID_VIDEO, MSG_VIDEO, timestamp, payload)])
+    assert received[0].timestamp == timestamp
+    assert received[0].payload == payload
+
+def test_frame_classification():
+    assert RtmpMessage(MSG_VIDEO, 0, KEYFRAME).is_video_keyframe
+    assert not RtmpMessage(MSG_VIDEO, 0, INTER_FRAME).is_video_keyframe
+    assert RtmpMessage(MSG_VIDEO, 0, AVC_HEADER).is_sequence_header
+    assert RtmpMessage(MSG_AUDIO, 0, bytes([0xAF, 0])).is_sequence_header
+    assert not RtmpMessage(MSG_AUDIO, 0, AAC_FRAME).is_sequence_header
+
+def test_keyframe_interval_is_the_longest_recent_gap():
+    stream = RelayStream('live/landscape')
+    publisher = FakePublisher()
+    stream.publisher = publisher
+    assert stream.keyframe_seconds is None
+    for timestamp in (0, 2000, 6000, 8000):
+        stream.receive(publisher, RtmpMessage(MSG_VIDEO, timestamp, KEYFRAME))
+    assert stream.keyframe_seconds == 4.0
+
+def test_handover_continues_from_the_last_timestamp():
+    stream = RelayStream('live/landscape')
+    old, new = FakePublisher(), FakePublisher()
+    stream.publisher = old
+    for timestamp in (0, 33, 9000):
+        stream.receive(old, RtmpMessage(MSG_VIDEO, timestamp, KEYFRAME if timestamp == 0 else INTER_FRAME))
+
+    stream.pending = new
+    # Headers are held, and nothing switches over before the new publisher's keyframe
+    stream.receive(new, RtmpMessage(MSG_AMF0_DATA, 0, amf_encode('onMetaData')))
+    stream.receive(new, RtmpMessage(MSG_VIDEO, 0, AVC_HEADER))
+    stream.receive(new, RtmpMessage(MSG_VIDEO, 4960, INTER_FRAME))
+    assert stream.publisher is old
+
+    stream.receive(new, RtmpMessage(MSG_VIDEO, 5000, KEYFRAME))
+    stream.receive(new, RtmpMessage(MSG_AUDIO, 5010, AAC_FRAME))
+    assert stream.publisher is new
+    assert old.writer.closed
+    assert stream.metadata.timestamp == 9000
+    assert stream.video_header.timestamp == 9000
+    assert [message.timestamp for message in stream.gop] == [9001, 9011]
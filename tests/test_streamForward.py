@@ -0,0 +1,64 @@
+import streamForward
+from streamForward import (
+    Destination, SourceInfo, passthrough_blockers, can_passthrough, plan_renditions, rendition_for
+)
+from constants import RENDITION_COPY
+
+def source(**overrides) -> SourceInfo:
+    """A 720p30 H.264/AAC input at 2.5 Mbps with 2s keyframes, within Kick's caps."""
+    fields = dict(video_codec='h264', video_profile='High', video_bitrate=2_500_000, audio_codec='aac',
+                  width=1280, height=720, fps=30.0, keyframe_seconds=2.0)
+    fields.update(overrides)
+    return SourceInfo(**fields)
+
+def destination(platform: str, orientation: str = 'landscape') -> Destination:
+    return Destination(platform, orientation, f"rtmp://{platform}.invalid/app", 'key')
+
+def test_source_within_caps_is_copied():
+    assert passthrough_blockers(source(), 'kick') == []
+    assert can_passthrough(source(), 'kick')
+
+def test_unprobed_source_is_encoded():
+    assert not can_passthrough(None, 'kick')
+
+def test_every_cap_is_checked():
+    assert passthrough_blockers(source(video_codec='hevc'), 'kick')
+    assert passthrough_blockers(source(video_bitrate=9_000_000), 'kick')
+    assert passthrough_blockers(source(width=1920, height=1080), 'kick') == ['1920x1080 over 1280x720']
+    assert passthrough_blockers(source(fps=60.0), 'kick') == ['60fps over 30fps']
+    assert passthrough_blockers(source(keyframe_seconds=4.0), 'kick') == ['4s keyframes over 2s']
+
+def test_ntsc_rate_fits_a_whole_number_cap():
+    assert can_passthrough(source(fps=29.97), 'kick')
+
+def test_unreported_fields_block_except_the_keyframe_interval():
+    assert passthrough_blockers(source(video_bitrate=None), 'kick') == ['unknown bitrate']
+    assert passthrough_blockers(source(width=None, height=None), 'kick') == ['unknown resolution']
+    assert passthrough_blockers(source(fps=None), 'kick') == ['unknown frame rate']
+    assert can_passthrough(source(keyframe_seconds=None), 'kick')
+
+def test_uncapped_profile_only_checks_bitrate():
+    assert can_passthrough(source(width=3840, height=2160, fps=120.0), 'default')
+
+def test_probe_fps():
+    assert streamForward._probe_fps({'avg_frame_rate': '30000/1001'}) == 30000 / 1001
+    assert streamForward._probe_fps({'avg_frame_rate': '0/0', 'r_frame_rate': '25/1'}) == 25.0
+    assert streamForward._probe_fps({}) is None
+
+def test_plan_groups_destinations_by_encode():
+    destinations = [destination('kick'), destination('youtube'), destination('twitch')]
+    plan = plan_renditions(destinations, source(width=1920, height=1080, video_bitrate=5_000_000))
+    # YouTube and Twitch take 1080p at 5 Mbps as-is, Kick needs its 720p encode
+    assert plan[(RENDITION_COPY, False)] == destinations[1:]
+    assert plan[(rendition_for('kick'), False)] == destinations[:1]
+
+def test_plan_without_probe_encodes_everything():
+    plan = plan_renditions([destination('kick'), destination('youtube')], None)
+    assert (RENDITION_COPY, False) not in plan
+    assert sum(len(group) for group in plan.values()) == 2
+
+def test_derived_portrait_always_gets_its_own_encode(monkeypatch):
+    monkeypatch.setattr(streamForward, 'DERIVE_PORTRAIT', True)
+    portrait = destination('instagram', 'portrait')
+    plan = plan_renditions([portrait], source())
+    assert plan == {(rendition_for('instagram'), True): [portrait]}
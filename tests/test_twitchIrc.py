@@ -0,0 +1,46 @@
+from twitchIrc import IrcLineParser, parse_line, parse_tags
+
+PRIVMSG = ("@badges=moderator/1;display-name=Viewer;emotes=;id=abc-123;"
+           "tmi-sent-ts=1700000000000 :viewer!viewer@viewer.tmi.twitch.tv PRIVMSG #channel :hello there :)")
+
+def test_privmsg():
+    message = parse_line(PRIVMSG)
+    assert message.command == 'PRIVMSG'
+    assert message.params == ['#channel', 'hello there :)']
+    assert message.trailing == 'hello there :)'
+    assert message.nick == 'viewer'
+    assert message.tags['display-name'] == 'Viewer'
+    assert message.tags['emotes'] == ''
+    assert message.tags['tmi-sent-ts'] == '1700000000000'
+
+def test_tag_values_are_unescaped_and_keep_equals_signs():
+    tags = parse_tags(r"msg=a\sb\:c\\d\ne;reply=x=y;flag")
+    assert tags == {'msg': 'a b;c\\d\ne', 'reply': 'x=y', 'flag': ''}
+
+def test_server_message_without_prefix():
+    message = parse_line('PING :tmi.twitch.tv')
+    assert message.command == 'PING'
+    assert message.trailing == 'tmi.twitch.tv'
+    assert message.nick == ''
+
+def test_line_without_command():
+    assert parse_line(':tmi.twitch.tv') is None
+
+def test_frame_with_several_lines():
+    parser = IrcLineParser()
+    messages = parser.feed(f"{PRIVMSG}\r\nPING :tmi.twitch.tv\r\n")
+    assert [message.command for message in messages] == ['PRIVMSG', 'PING']
+    assert parser.lines == 2
+
+def test_line_split_across_frames():
+    parser = IrcLineParser()
+    assert parser.feed(PRIVMSG[:40]) == []
+    messages = parser.feed(PRIVMSG[40:] + '\r\n')
+    assert len(messages) == 1
+    assert messages[0].trailing == 'hello there :)'
+
+def test_overlong_partial_line_is_dropped():
+    parser = IrcLineParser(max_line=16)
+    assert parser.feed('x' * 32) == []
+    assert parser.discarded == 1
+    assert [message.command for message in parser.feed('PING :a\r\n')] == ['PING']
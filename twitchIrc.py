@@ -0,0 +1,254 @@
+import argparse
+import asyncio
+import json
+import logging
+import random
+import re
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import (
+    Optional,
+    List,
+    Dict,
+    Union
+)
+from constants import (
+    TWITCH_IRC_URL, TWITCH_IRC_MAX_LINE, IRC_BENCHMARK_MESSAGES,
+    IRC_BENCHMARK_ROUNDS, IRC_RECORD_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+# IRCv3 tag value escapes; a backslash before anything else just drops out
+TAG_ESCAPES = {':': ';', 's': ' ', '\\': '\\', 'r': '\r', 'n': '\n'}
+TAG_ESCAPE = re.compile(r'\\(.?)', re.DOTALL)
+
+@dataclass
+class IrcMessage:
+    """One IRC line, split into tags, prefix, command and parameters"""
+    command: str
+    params: List[str] = field(default_factory=list)
+    tags: Dict[str, str] = field(default_factory=dict)
+    prefix: Optional[str] = None
+
+    @property
+    def nick(self) -> str:
+        """Nickname part of the prefix, empty for server messages."""
+        if not self.prefix or '!' not in self.prefix:
+            return ''
+        return self.prefix.split('!', 1)[0]
+
+    @property
+    def trailing(self) -> str:
+        """Last parameter, the message text of a PRIVMSG."""
+        return self.params[-1] if self.params else ''
+
+def unescape_tag_value(value: str) -> str:
+    if '\\' not in value:
+        return value
+    return TAG_ESCAPE.sub(lambda match: TAG_ESCAPES.get(match.group(1), match.group(1)), value)
+
+def parse_tags(text: str) -> Dict[str, str]:
+    """
+    Tags section of a line, without the leading @.
+
+    Only the first = separates key and value, so values keep any =
+    they contain. A tag without a value maps to an empty string.
+    """
+    tags = {}
+    for item in text.split(';'):
+        key, _, value = item.partition('=')
+        if key:
+            tags[key] = unescape_tag_value(value)
+    return tags
+
+def parse_line(line: str) -> Optional[IrcMessage]:
+    """One IRC line without its line ending, None if it has no command."""
+    tags = {}
+    prefix = None
+    if line.startswith('@'):
+        tags_text, _, line = line[1:].partition(' ')
+        tags = parse_tags(tags_text)
+        line = line.lstrip(' ')
+    if line.startswith(':'):
+        prefix, _, line = line[1:].partition(' ')
+        line = line.lstrip(' ')
+    middle, separator, trailing = line.partition(' :')
+    params = middle.split()
+    if separator:
+        params.append(trailing)
+    if not params:
+        return None
+    return IrcMessage(command=params[0].upper(), params=params[1:], tags=tags, prefix=prefix)
+
+class IrcLineParser:
+    """
+    Turns websocket frames into IRC messages.
+
+    Twitch packs several lines into one frame when chat is busy, so every
+    line of a frame is parsed. A line cut across frames is kept until
+    the rest arrives.
+    """
+
+    def __init__(self, max_line: int = TWITCH_IRC_MAX_LINE):
+        self.max_line = max_line
+        self.lines = 0
+        self.discarded = 0  # Lines dropped for having no command or growing past max_line
+        self._partial = ''
+
+    def feed(self, frame: Union[str, bytes]) -> List[IrcMessage]:
+        """Every message completed by a frame, in order."""
+        if isinstance(frame, bytes):
+            frame = frame.decode('utf-8', errors='replace')
+        if self._partial:
+            frame = self._partial + frame
+        lines = frame.split('\n')
+        self._partial = lines.pop()
+        if len(self._partial) > self.max_line:
+            logger.warning(f"Dropping an IRC line longer than {self.max_line} characters")
+            self._partial = ''
+            self.discarded += 1
+
+        messages = []
+        for line in lines:
+            if line.endswith('\r'):
+                line = line[:-1]
+            if not line:
+                continue
+            self.lines += 1
+            message = parse_line(line)
+            if message is None:
+                self.discarded += 1
+                continue
+            messages.append(message)
+        return messages
+
+# Shapes of busy-channel traffic for the benchmark when no capture is given
+SAMPLE_WORDS = ['PogChamp', 'LUL', 'Kappa', 'gg', 'what', 'a', 'play', 'no', 'way', 'KEKW',
+                'clip', 'it', 'chat', 'is', 'this', 'real', 'OMEGALUL', 'lets', 'go', '=)']
+SAMPLE_BADGES = ['', 'subscriber/12', 'moderator/1,subscriber/24', 'vip/1', 'premium/1',
+                 'subscriber/3,bits/1000']
+
+def _sample_line(rng: random.Random, channel: str, index: int) -> str:
+    user = f"viewer{rng.randrange(5000)}"
+    text = ' '.join(rng.choice(SAMPLE_WORDS) for _ in range(rng.randint(1, 14)))
+    badges = rng.choice(SAMPLE_BADGES)
+    tags = (
+        f"badge-info=;badges={badges};color=#{rng.randrange(0xffffff):06X};display-name={user};"
+        f"emotes=;first-msg=0;flags=;id=6b0e{index:08x}-5c1e-4a6f-9a2c-7d3e0c5b{index % 9999:04d};"
+        f"mod={int('moderator' in badges)};room-id=12826;subscriber={int('subscriber' in badges)};"
+        f"tmi-sent-ts={1700000000000 + index * 7};turbo=0;user-id={rng.randrange(10 ** 9)};user-type="
+    )
+    if rng.random() < 0.1:
+        # Replies carry the parent message escaped, = and all
+        parent = ' '.join(rng.choice(SAMPLE_WORDS) for _ in range(6)).replace(' ', '\\s')
+        tags += f";reply-parent-display-name=streamer;reply-parent-msg-body={parent}\\:\\s1+1=2"
+    return f"@{tags} :{user}!{user}@{user}.tmi.twitch.tv PRIVMSG #{channel} :{text}\r\n"
+
+def sample_frames(count: int, channel: str = 'benchmark', seed: int = 1) -> List[str]:
+    """Synthetic frames of PRIVMSGs, batched up to 30 lines per frame like a busy channel."""
+    rng = random.Random(seed)
+    frames = []
+    index = 0
+    while index < count:
+        batch = min(count - index, rng.choice([1, 1, 2, 4, 8, 16, 30]))
+        frames.append(''.join(_sample_line(rng, channel, index + i) for i in range(batch)))
+        index += batch
+    return frames
+
+def load_capture(path: str) -> List[str]:
+    """Frames of a capture written by --record, one JSON string per line."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+async def record_capture(channel: str, path: str, seconds: float = IRC_RECORD_SECONDS) -> int:
+    """Save a channel's raw chat frames for seconds, anonymously. Returns the frame count."""
+    import websockets
+
+    frames = 0
+    deadline = time.monotonic() + seconds
+    async with websockets.connect(TWITCH_IRC_URL) as websocket:
+        await websocket.send("CAP REQ :twitch.tv/tags twitch.tv/commands")
+        await websocket.send("PASS SCHMOOPIIE")
+        await websocket.send("NICK justinfan123")
+        await websocket.send(f"JOIN #{channel.lower()}")
+        with open(path, 'w', encoding='utf-8') as f:
+            while (remaining := deadline - time.monotonic()) > 0:
+                try:
+                    frame = await asyncio.wait_for(websocket.recv(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                if frame.startswith('PING'):
+                    await websocket.send('PONG :tmi.twitch.tv')
+                f.write(json.dumps(frame) + '\n')
+                frames += 1
+    return frames
+
+def benchmark(frames: List[str], rounds: int = IRC_BENCHMARK_ROUNDS) -> Dict[str, float]:
+    """Parse every frame rounds times and report the fastest round."""
+    best = None
+    messages = 0
+    for _ in range(rounds):
+        parser = IrcLineParser()
+        started = time.perf_counter()
+        messages = 0
+        for frame in frames:
+            messages += len(parser.feed(frame))
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    characters = sum(len(frame) for frame in frames)
+    return {
+        'frames': len(frames),
+        'messages': messages,
+        'seconds': best,
+        'messages_per_second': messages / best if best else 0.0,
+        'mb_per_second': characters / best / 1e6 if best else 0.0,
+    }
+
+def main():
+    """
+    Measure Twitch IRC parse throughput, or record a channel to measure it on.
+    Usage: python twitchIrc.py [--capture frames.jsonl] [--record CHANNEL --seconds 60]
+    """
+    parser = argparse.ArgumentParser(description="Twitch IRC parser benchmark")
+    parser.add_argument('--capture', help="Frames recorded with --record; synthetic traffic otherwise")
+    parser.add_argument('--record', metavar='CHANNEL', help="Record a channel's chat into --capture")
+    parser.add_argument('--seconds', type=float, default=IRC_RECORD_SECONDS, help="Seconds to record")
+    parser.add_argument('--messages', type=int, default=IRC_BENCHMARK_MESSAGES,
+                        help="Synthetic messages to parse")
+    parser.add_argument('--rounds', type=int, default=IRC_BENCHMARK_ROUNDS)
+    args = parser.parse_args()
+
+    if args.record:
+        if not args.capture:
+            print("--record needs --capture to write to")
+            sys.exit(1)
+        try:
+            frames = asyncio.run(record_capture(args.record, args.capture, args.seconds))
+        except KeyboardInterrupt:
+            print("\nRecording interrupted by user")
+            return
+        except OSError as e:
+            print(f"Could not record #{args.record}: {str(e)}")
+            sys.exit(1)
+        print(f"Recorded {frames} frames into {args.capture}")
+        return
+
+    if args.capture:
+        try:
+            frames = load_capture(args.capture)
+        except (OSError, ValueError) as e:
+            print(f"Could not read {args.capture}: {str(e)}")
+            sys.exit(1)
+    else:
+        frames = sample_frames(args.messages)
+
+    result = benchmark(frames, max(1, args.rounds))
+    print(f"Frames:       {result['frames']}")
+    print(f"Messages:     {result['messages']} ({result['messages'] / max(1, result['frames']):.1f} per frame)")
+    print(f"Parse time:   {result['seconds'] * 1000:.1f} ms")
+    print(f"Throughput:   {result['messages_per_second']:,.0f} msgs/sec ({result['mb_per_second']:.1f} MB/s)")
+
+if __name__ == "__main__":
+    main()
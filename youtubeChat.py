@@ -0,0 +1,109 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import (
+    Optional,
+    AsyncIterator,
+    Callable,
+    Any
+)
+import pytchat
+from constants import (
+    YOUTUBE_CHAT_MIN_INTERVAL, YOUTUBE_CHAT_MAX_INTERVAL, YOUTUBE_CHAT_ERROR_BACKOFF
+)
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class PollStats:
+    """How long YouTube took to answer chat polls and what it returned"""
+    polls: int = 0
+    errors: int = 0
+    messages: int = 0
+    last_latency: Optional[float] = None  # Seconds the latest poll's request took
+    max_latency: float = 0.0
+    total_latency: float = 0.0
+    interval: Optional[float] = None  # Seconds until the next poll, as YouTube suggested
+
+    @property
+    def mean_latency(self) -> Optional[float]:
+        return self.total_latency / self.polls if self.polls else None
+
+    def describe(self) -> str:
+        if not self.polls:
+            return f"no polls, {self.errors} errors"
+        return (f"{self.polls} polls, {self.messages} messages, {self.errors} errors, "
+                f"latency {self.mean_latency * 1000:.0f}ms mean {self.max_latency * 1000:.0f}ms max, "
+                f"interval {self.interval or 0:.1f}s")
+
+class YouTubeChatPoller:
+    """
+    Reads a YouTube live chat without blocking the event loop.
+
+    pytchat's requests run in a worker thread. The chat object carries
+    YouTube's continuation from one poll to the next, and each response
+    says how long to wait before asking again (timeoutMs), which is
+    followed within YOUTUBE_CHAT_MIN_INTERVAL and YOUTUBE_CHAT_MAX_INTERVAL.
+    Items are handed out as soon as a poll returns them, rather than
+    paced out by pytchat's sync_items().
+    """
+
+    def __init__(self, video_id: str):
+        self.video_id = video_id
+        self.stats = PollStats()
+        self._chat = None
+
+    def _create(self):
+        # Not interruptable: pytchat would install a SIGINT handler, which only the main thread may do
+        return pytchat.create(video_id=self.video_id, interruptable=False)
+
+    def _fetch(self):
+        return self._chat.get()
+
+    def _next_interval(self, chatdata: Any) -> float:
+        suggested = getattr(chatdata, 'interval', None)
+        if not suggested:
+            return YOUTUBE_CHAT_MAX_INTERVAL
+        return min(YOUTUBE_CHAT_MAX_INTERVAL, max(YOUTUBE_CHAT_MIN_INTERVAL, float(suggested)))
+
+    async def items(self, running: Callable[[], bool]) -> AsyncIterator[Any]:
+        """pytchat chat items, as they are fetched, until the chat ends or running() is false."""
+        self._chat = await asyncio.to_thread(self._create)
+        try:
+            while running() and self._chat.is_alive():
+                started = time.monotonic()
+                try:
+                    chatdata = await asyncio.to_thread(self._fetch)
+                except Exception as e:
+                    self.stats.errors += 1
+                    logger.error(f"Error polling YouTube chat: {str(e)}")
+                    await asyncio.sleep(YOUTUBE_CHAT_ERROR_BACKOFF)
+                    continue
+
+                fetched = time.monotonic()
+                latency = fetched - started
+                items = list(getattr(chatdata, 'items', []))
+                stats = self.stats
+                stats.polls += 1
+                stats.messages += len(items)
+                stats.last_latency = latency
+                stats.max_latency = max(stats.max_latency, latency)
+                stats.total_latency += latency
+                stats.interval = self._next_interval(chatdata)
+                logger.debug(f"YouTube chat poll took {latency * 1000:.0f}ms, "
+                             f"{len(items)} messages, next in {stats.interval:.1f}s")
+
+                for item in items:
+                    yield item
+
+                # The wait runs from the response, not from when the items were handed out
+                await asyncio.sleep(max(0.0, fetched + stats.interval - time.monotonic()))
+
+            if not self._chat.is_alive():
+                try:
+                    self._chat.raise_for_status()
+                except Exception as e:
+                    logger.info(f"YouTube chat ended: {str(e)}")
+        finally:
+            self._chat.terminate()
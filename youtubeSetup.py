@@ -4,6 +4,7 @@ from google.oauth2.credentials import Credentials
 from datetime import datetime, timezone, timedelta
 import webbrowser
 from difflib import get_close_matches
+import streamForward
 from constants import *
 
 IS_PORTRAIT = False
@@ -84,6 +85,7 @@ def create_stream_key(youtube, title):
 
         return {
             'key': response['cdn']['ingestionInfo']['streamName'],
+            'url': response['cdn']['ingestionInfo']['ingestionAddress'],
             'id': response['id']
         }
     except Exception as e:
@@ -94,6 +96,7 @@ def _process_stream_item(item):
     """Process a single stream item from YouTube API response."""
     return {
         'key': item['cdn']['ingestionInfo']['streamName'],
+        'url': item['cdn']['ingestionInfo']['ingestionAddress'],
         'id': item['id']
     }
 
@@ -294,16 +297,22 @@ def _select_category(yt_client, game=None):
         time.sleep(1)
 
 def setup_youtube_streams(creds, title, game=None):
-    """Set up YouTube live streams."""
+    """
+    Set up YouTube live streams.
+
+    Returns the chat URLs and, for restreaming, a destination per
+    stream built from its selected key.
+    """
     global IS_PORTRAIT
     streams_to_setup = _get_stream_clients(creds)
     chat_urls = []
+    destinations = []
     broadcast_ids = []
     used_stream_keys = set()  # Track which keys have been used
 
     # Get all initial setup inputs early
     if not streams_to_setup:
-        return []
+        return [], []
     _, first_client = streams_to_setup[0]
 
     # Get category
@@ -330,7 +339,7 @@ def setup_youtube_streams(creds, title, game=None):
 
     # Get all existing stream keys once using the first client
     if not streams_to_setup:
-        return []
+        return [], []
 
     _, first_client = streams_to_setup[0]
     existing_keys = get_existing_stream_keys(first_client)
@@ -411,6 +420,9 @@ def setup_youtube_streams(creds, title, game=None):
             if result:
                 chat_urls.append(result['chat_url'])
                 broadcast_ids.append(result['broadcast_id'])
+                orientation = PORTRAIT_MODE if stream_type == PLATFORM_YOUTUBE_PORTRAIT else STREAM_MODE
+                destinations.append(streamForward.Destination(
+                    stream_type, orientation, selected_key['url'], selected_key['key']))
 
         except Exception as e:
             print(f"Error setting up YouTube stream: {str(e)}")
@@ -419,4 +431,4 @@ def setup_youtube_streams(creds, title, game=None):
     for i, url in enumerate(chat_urls):
         print(f"Stream {i + 1} chat URL: {url}")
 
-    return chat_urls
+    return chat_urls, destinations